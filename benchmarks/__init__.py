@@ -0,0 +1,18 @@
+# -----------------------------------------
+# Ovens Lovin's – benchmarks
+# -----------------------------------------
+#
+# Stand-alone scripts (bench_*.py) measure one code path each against a
+# copy of recipes.db. The load suite measures the whole API on synthetic
+# catalogs of any size:
+#
+#   python -m benchmarks.catalog --recipes 100000 --users 2000
+#       build (or reuse) a seeded synthetic catalog under benchmarks/.data/
+#
+#   python -m benchmarks.load --recipes 100000 --mode inprocess
+#   python -m benchmarks.load --recipes 100000 --mode uvicorn --workers 4
+#       p50 / p95 / p99 and requests/sec per endpoint; results are saved
+#       as JSON in benchmarks/results/
+#
+#   python -m benchmarks.compare OLD.json NEW.json
+#       per-endpoint deltas between two saved runs (e.g. two commits)
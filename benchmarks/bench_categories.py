@@ -0,0 +1,102 @@
+# -----------------------------------------
+# Ovens Lovin's – category classifier benchmark
+# -----------------------------------------
+#
+# Titles/sec for the old auto_category() (up to nine substring scans per
+# title, word lists rebuilt per call) against the compiled
+# categories.Classifier, one title at a time and through classify_many().
+# Titles are the recipes.json ones plus synthetic catalog titles
+# (benchmarks/catalog.py). Also lists titles the two disagree on, which
+# are the substring false positives ("Graham" -> Pork, "Piece" -> Dessert)
+# and the new compound / plural keywords.
+#
+#   python benchmarks/bench_categories.py [--titles 100000] [--runs 5]
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.catalog import Generator  # noqa: E402
+from categories import classifier  # noqa: E402
+
+
+def legacy_auto_category(title: str) -> str:
+    """categories.auto_category() before the compiled classifier."""
+    t = (title or "").lower()
+
+    if any(word in t for word in ["salad"]):
+        return "Salad"
+    if any(word in t for word in ["soup", "stew", "chowder", "broth"]):
+        return "Soups & Stews"
+    if any(word in t for word in ["pasta", "spaghetti", "noodle", "lasagna"]):
+        return "Pasta"
+    if "chicken" in t:
+        return "Chicken"
+    if any(word in t for word in ["beef", "steak", "burger"]):
+        return "Beef"
+    if any(word in t for word in ["pork", "ham", "bacon"]):
+        return "Pork"
+    if any(word in t for word in ["fish", "salmon", "shrimp", "prawn", "crab"]):
+        return "Seafood"
+    if any(word in t for word in ["cake", "cookie", "brownie", "pie", "tart", "crumble", "dessert"]):
+        return "Dessert"
+    if any(word in t for word in ["sandwich", "wrap", "taco", "quesadilla"]):
+        return "Handhelds"
+
+    return "Other"
+
+
+def make_titles(count: int) -> list:
+    with open(ROOT / "recipes.json", encoding="utf-8") as f:
+        real = [record["title"] for record in json.load(f) if record.get("title")]
+    gen = Generator(seed=1)
+    synthetic = [gen.title()[0] for _ in range(max(0, count - len(real)))]
+    return (real + synthetic)[:count]
+
+
+def best_of(runs: int, func) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the recipe category classifier.")
+    parser.add_argument("--titles", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--examples", type=int, default=15, help="disagreements to show")
+    args = parser.parse_args()
+
+    titles = make_titles(args.titles)
+    print(f"{len(titles):,} titles, best of {args.runs}")
+    runs = [
+        ("legacy auto_category", lambda: [legacy_auto_category(t) for t in titles]),
+        ("Classifier.classify", lambda: [classifier.classify(t) for t in titles]),
+        ("Classifier.classify_many", lambda: classifier.classify_many(titles)),
+    ]
+    baseline = None
+    for label, func in runs:
+        seconds = best_of(args.runs, func)
+        baseline = baseline or seconds
+        print(f"  {label:<26} {len(titles) / seconds:12,.0f} titles/s   {baseline / seconds:5.1f}x")
+
+    differ = {}
+    for title in dict.fromkeys(titles):
+        old, new = legacy_auto_category(title), classifier.classify(title)
+        if old != new:
+            differ[title] = (old, new)
+    print(f"\n{len(differ):,} distinct titles classified differently")
+    for title, (old, new) in list(differ.items())[:args.examples]:
+        print(f"  {old:>14} -> {new:<14} {title}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# -----------------------------------------
+# Ovens Lovin's – importer benchmark
+# -----------------------------------------
+#
+# Builds an N-recipe NDJSON file from recipes.json (titles numbered so each
+# record is distinct), imports it into a throwaway copy of recipes.db, then
+# times re-importing the unchanged file: once through the whole-file
+# fingerprint, once (--full) through the per-record content hashes.
+#
+#   python benchmarks/bench_import.py [--recipes 100000] [--batch-size 500]
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def write_ndjson(path: Path, count: int):
+    with open(ROOT / "recipes.json", encoding="utf-8") as f:
+        source = json.load(f)
+    with open(path, "w", encoding="utf-8") as out:
+        for i in range(count):
+            record = dict(source[i % len(source)])
+            record["title"] = f"{record['title']} #{i}"
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recipes", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp())
+    try:
+        db_path = workdir / "recipes.db"
+        shutil.copy(ROOT / "recipes.db", db_path)
+        # db.py reads the path at import time
+        os.environ["RECIPES_DB_PATH"] = str(db_path)
+        sys.path.insert(0, str(ROOT))
+        from import_recipes import import_recipes
+        from migrations import migrate
+        from db import get_write_conn
+
+        with get_write_conn() as conn:
+            migrate(conn)
+
+        data = workdir / "recipes.ndjson"
+        write_ndjson(data, args.recipes)
+        print(f"{args.recipes:,} recipes, {data.stat().st_size / 1e6:.1f} MB")
+
+        runs = [
+            ("first import", {}),
+            ("re-import (unchanged)", {}),
+            ("re-import --full", {"full": True}),
+        ]
+        for label, options in runs:
+            start = time.perf_counter()
+            stats = import_recipes(data, batch_size=args.batch_size, **options)
+            seconds = time.perf_counter() - start
+            print(
+                f"  {label:<22} {seconds:8.2f} s   {stats['read'] / seconds:>10,.0f} recipes/sec   "
+                f"imported {stats['imported']:,}  unchanged {stats['unchanged']:,}"
+            )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# -----------------------------------------
+# Ovens Lovin's – /recipes serialization benchmark
+# -----------------------------------------
+#
+# Requests/sec for the full /recipes list (all fields) on a scratch copy
+# of recipes.db, grown to --recipes rows:
+#
+#   RecipeOut per row     the old path: one Pydantic model per row, then
+#                         FastAPI's validation + jsonable_encoder
+#   dicts + encoder       plain dicts, still through jsonable_encoder
+#   fast path, cold       rows -> dicts -> JSON bytes (FastJSONResponse /
+#                         serialize_payload), catalog cache disabled
+#   fast path, warm       the same, served from the catalog cache
+#
+# The fast path is run with orjson (if installed) and the stdlib encoder.
+#
+#   python benchmarks/bench_serialization.py [--recipes 2000] [--requests 200]
+
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def grow(path: Path, count: int):
+    """Copy existing recipes (with their ingredient links) until there are `count`."""
+    conn = sqlite3.connect(path)
+    have = conn.execute("SELECT count(*) FROM recipes").fetchone()[0]
+    originals = [row[0] for row in conn.execute("SELECT id FROM recipes ORDER BY id")]
+    for n in range(count - have):
+        source = originals[n % len(originals)]
+        cur = conn.execute(
+            """
+            INSERT INTO recipes (title, slug, meal_type, category, source_type, is_budget_friendly,
+                                 base_recipe_id, prep_instructions, cook_instructions)
+            SELECT title || ' #' || ?, slug || '-copy-' || ?, meal_type, category, source_type,
+                   is_budget_friendly, base_recipe_id, prep_instructions, cook_instructions
+            FROM recipes WHERE id = ?
+            """,
+            (n, n, source),
+        )
+        conn.execute(
+            """
+            INSERT INTO recipe_ingredients (recipe_id, ingredient_id, quantity, unit)
+            SELECT ?, ingredient_id, quantity, unit FROM recipe_ingredients WHERE recipe_id = ?
+            """,
+            (cur.lastrowid, source),
+        )
+    conn.commit()
+    conn.close()
+
+
+def legacy_app():
+    """/recipes as it was built before the fast path."""
+    from fastapi import FastAPI
+
+    from categories import auto_category
+    from db import get_conn
+    from main import RecipeOut
+
+    app = FastAPI()
+
+    def rows():
+        with get_conn() as conn:
+            return conn.execute("SELECT * FROM recipes ORDER BY id").fetchall()
+
+    @app.get("/models")
+    def models():
+        return [
+            RecipeOut(
+                id=r["id"],
+                title=r["title"],
+                meal_type=r["meal_type"],
+                category=r["category"] or auto_category(r["title"]),
+                source_type=r["source_type"],
+                is_budget_friendly=bool(r["is_budget_friendly"]),
+                base_recipe_id=r["base_recipe_id"],
+                prep_instructions=r["prep_instructions"],
+                cook_instructions=r["cook_instructions"],
+                source_url=r["source_url"],
+            )
+            for r in rows()
+        ]
+
+    @app.get("/dicts")
+    def dicts():
+        return [
+            {
+                "id": r["id"],
+                "title": r["title"],
+                "meal_type": r["meal_type"],
+                "category": r["category"] or auto_category(r["title"]),
+                "source_type": r["source_type"],
+                "is_budget_friendly": bool(r["is_budget_friendly"]),
+                "base_recipe_id": r["base_recipe_id"],
+                "prep_instructions": r["prep_instructions"],
+                "cook_instructions": r["cook_instructions"],
+                "is_favorite": False,
+                "linked_budget": None,
+                "linked_chef": None,
+                "ingredients": [],
+                "source_url": r["source_url"],
+            }
+            for r in rows()
+        ]
+
+    return app
+
+
+def rate(client, url, requests):
+    client.get(url)  # warm up
+    start = time.perf_counter()
+    for _ in range(requests):
+        response = client.get(url)
+    seconds = time.perf_counter() - start
+    assert response.status_code == 200, response.text
+    return requests / seconds, len(response.content)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recipes", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp())
+    try:
+        db_path = workdir / "recipes.db"
+        shutil.copy(ROOT / "recipes.db", db_path)
+        grow(db_path, args.recipes)
+        # db.py reads the path at import time
+        os.environ["RECIPES_DB_PATH"] = str(db_path)
+        sys.path.insert(0, str(ROOT))
+        warnings.simplefilter("ignore")
+
+        import fastjson
+        import main as app_module
+        from catalog_cache import catalog_cache
+        from fastapi.testclient import TestClient
+
+        # The lifespan hook brings the copied database up to date
+        with TestClient(app_module.app) as client:
+            legacy = TestClient(legacy_app())
+            size = catalog_cache.size
+
+            print(f"/recipes, {args.recipes:,} recipes, {args.requests} requests each")
+            runs = [("RecipeOut per row", legacy, "/models", None), ("dicts + encoder", legacy, "/dicts", None)]
+            encoders = [("orjson", fastjson.orjson), ("stdlib json", None)] if fastjson.orjson else [("stdlib json", None)]
+            for name, module in encoders:
+                runs.append((f"fast path, cold ({name})", client, "/recipes", (module, 0)))
+                runs.append((f"fast path, warm ({name})", client, "/recipes", (module, size)))
+
+            for label, target, url, setup in runs:
+                if setup:
+                    fastjson.orjson, catalog_cache.size = setup
+                    catalog_cache._entries.clear()
+                per_sec, body = rate(target, url, args.requests)
+                print(f"  {label:<30} {per_sec:8.1f} req/s   {body / 1e3:8.1f} KB")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
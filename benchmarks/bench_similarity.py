@@ -0,0 +1,134 @@
+# -----------------------------------------
+# Ovens Lovin's – similar-recipes benchmark
+# -----------------------------------------
+#
+# On a synthetic catalog (benchmarks/catalog.py), for a sample of
+# recipes:
+#
+#   lsh           similarity.similar(): MinHash signatures + LSH buckets
+#   exact         Jaccard similarity against every other recipe (O(N) per
+#                 query, O(N^2) for all of them), from in-memory sets
+#
+# Reports signature build rate, query latency for both and recall@k of
+# the LSH results: a result counts as a hit if its exact Jaccard
+# similarity is at least that of the exact k-th best.
+#
+#   python benchmarks/bench_similarity.py [--recipes 20000] [--queries 200] [--k 10]
+#   python benchmarks/bench_similarity.py --db recipes.db      (the real catalog)
+
+import argparse
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import similarity  # noqa: E402
+from benchmarks.catalog import ensure_catalog  # noqa: E402
+from db import SQL_FUNCTIONS  # noqa: E402
+from migrations import migrate  # noqa: E402
+from pantry import STAPLES  # noqa: E402
+
+
+def ingredient_sets(conn) -> dict:
+    rows = conn.execute(
+        f"""
+        SELECT ri.recipe_id, ri.canonical_id FROM recipe_ingredients ri
+        WHERE ri.canonical_id IS NOT NULL AND ri.canonical_id NOT IN (
+            SELECT id FROM canonical_ingredients WHERE name IN ({",".join("?" * len(STAPLES))}))
+        """,
+        sorted(STAPLES),
+    )
+    sets = {}
+    for recipe_id, canonical_id in rows:
+        sets.setdefault(recipe_id, set()).add(canonical_id)
+    return sets
+
+
+def exact_top(sets, recipe_id, k) -> list:
+    mine = sets[recipe_id]
+    scores = [
+        (len(mine & other) / len(mine | other), other_id)
+        for other_id, other in sets.items()
+        if other_id != recipe_id
+    ]
+    scores.sort(key=lambda item: (-item[0], item[1]))
+    return scores[:k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MinHash/LSH similar-recipe lookups.")
+    parser.add_argument("--recipes", type=int, default=20_000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--db", help="use (a copy of) this database instead of a synthetic catalog")
+    args = parser.parse_args()
+
+    catalog = Path(args.db) if args.db else ensure_catalog(args.recipes, args.users)
+    workdir = Path(tempfile.mkdtemp())
+    try:
+        db_path = workdir / "recipes.db"
+        shutil.copy(catalog, db_path)
+        conn = sqlite3.connect(db_path, isolation_level="IMMEDIATE")
+        conn.row_factory = sqlite3.Row
+        for name, (num_params, func) in SQL_FUNCTIONS.items():
+            conn.create_function(name, num_params, func, deterministic=True)
+        migrate(conn)
+
+        start = time.perf_counter()
+        built = similarity.backfill(conn, rebuild=True)
+        conn.commit()
+        seconds = time.perf_counter() - start
+        print(
+            f"{built:,} recipes: signatures + buckets in {seconds:.2f}s ({built / seconds:,.0f}/s), "
+            f"{similarity.NUM_PERM} values, {similarity.BANDS} bands x {similarity.ROWS} rows"
+        )
+
+        sets = ingredient_sets(conn)
+        sample = random.Random(1).sample(sorted(sets), min(args.queries, len(sets)))
+
+        lsh_times, exact_times, recalls, found = [], [], [], []
+        for recipe_id in sample:
+            t0 = time.perf_counter()
+            results = similarity.similar(conn, recipe_id, args.k)
+            t1 = time.perf_counter()
+            exact = exact_top(sets, recipe_id, args.k)
+            t2 = time.perf_counter()
+            lsh_times.append((t1 - t0) * 1000)
+            exact_times.append((t2 - t1) * 1000)
+            found.append(len(results))
+
+            relevant = [score for score, _ in exact if score > 0]
+            if relevant:
+                kth = relevant[-1]
+                mine = sets[recipe_id]
+                hits = sum(
+                    1 for r in results
+                    if len(mine & sets[r["id"]]) / len(mine | sets[r["id"]]) >= kth
+                )
+                recalls.append(hits / len(relevant))
+
+        lsh_times.sort()
+        print(f"\n{len(sample)} queries, top {args.k}")
+        print(
+            f"  lsh     p50 {statistics.median(lsh_times):8.3f} ms   "
+            f"p99 {lsh_times[int(len(lsh_times) * 0.99) - 1]:8.3f} ms   "
+            f"{statistics.mean(found):.1f} results on average"
+        )
+        print(f"  exact   p50 {statistics.median(exact_times):8.3f} ms   (one recipe against all {len(sets):,})")
+        if recalls:
+            print(f"  recall@{args.k} {statistics.mean(recalls):.3f}")
+        conn.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# -----------------------------------------
+# Ovens Lovin's – startup benchmark
+# -----------------------------------------
+#
+# Cold-start time of what each process pays before doing any work: wall
+# clock of a fresh interpreter per sample (nothing already imported):
+#
+#   import main         module import + create_app(); what a uvicorn
+#                       worker spawn costs before its lifespan hook
+#   main + startup      the same plus the lifespan hook (schema check)
+#   import_recipes      the CLI importer's imports
+#   migrations          `python migrations.py`'s imports
+#
+# Interpreter start-up alone ("python -c pass") is the floor every row
+# includes. Runs against a throwaway copy of recipes.db:
+#
+#   python benchmarks/bench_startup.py [--runs 15] [--importtime]
+#
+# --importtime lists the slowest modules behind `import main`.
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+TARGETS = [
+    ("python -c pass", "pass"),
+    ("import main", "import main"),
+    (
+        "main + startup",
+        "import asyncio, main\n"
+        "async def _start():\n"
+        "    async with main.app.router.lifespan_context(main.app):\n"
+        "        pass\n"
+        "asyncio.run(_start())",
+    ),
+    ("import_recipes", "import import_recipes"),
+    ("migrations", "import migrations"),
+]
+
+
+def sample(body: str, env: dict) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", body], cwd=ROOT, env=env, capture_output=True, check=True)
+    return time.perf_counter() - start
+
+
+def importtime(env: dict, top: int = 15):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        # "import time: <self us> | <cumulative us> | <indented name>"
+        fields = line.removeprefix("import time:").split("|")
+        if len(fields) == 3 and fields[0].strip().isdigit():
+            rows.append((int(fields[1]), int(fields[0]), fields[2].strip()))
+    print("\nslowest imports behind `import main` (cumulative / self, ms):")
+    for cumulative, self_time, name in sorted(rows, reverse=True)[:top]:
+        print(f"  {cumulative / 1000:8.1f} {self_time / 1000:8.1f}   {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start time of the app and CLI tools.")
+    parser.add_argument("--runs", type=int, default=15)
+    parser.add_argument("--importtime", action="store_true", help="list the slowest imports")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp())
+    try:
+        db_path = workdir / "recipes.db"
+        shutil.copy(ROOT / "recipes.db", db_path)
+        env = dict(os.environ, RECIPES_DB_PATH=str(db_path), UPLOAD_DIR=str(workdir / "uploads"))
+        # Migrate the copy once, so every sample is the usual warm-schema start
+        sample(TARGETS[2][1], env)
+
+        print(f"cold start, {args.runs} fresh interpreters each (ms)")
+        print(f"  {'':<18} {'min':>8} {'median':>8} {'max':>8}")
+        for label, body in TARGETS:
+            times = [sample(body, env) * 1000 for _ in range(args.runs)]
+            print(f"  {label:<18} {min(times):8.1f} {statistics.median(times):8.1f} {max(times):8.1f}")
+        if args.importtime:
+            importtime(env)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+# -----------------------------------------
+# Ovens Lovin's – write path benchmark
+# -----------------------------------------
+#
+# Statements per request and latency for the two heaviest write paths,
+# before (one round of statements per ingredient) and after (set-based):
+#
+#   create recipe       ingredients.link_ingredients()
+#   recipe -> grocery   grocery.add_recipe()
+#
+# Runs against a throwaway copy of recipes.db:
+#
+#   python benchmarks/bench_write_paths.py [--ingredients 40] [--runs 200]
+
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import grocery  # noqa: E402
+import ingredients  # noqa: E402
+from db import SQL_FUNCTIONS  # noqa: E402
+from migrations import migrate  # noqa: E402
+
+
+# -----------------------------------------
+# BEFORE: the per-row versions these paths replaced
+# -----------------------------------------
+
+def legacy_link_ingredients(conn, recipe_id, items):
+    items = [(name.strip(), quantity, unit) for name, quantity, unit in items if name and name.strip()]
+    parsed = [ingredients.parse_link(name, quantity, unit) for name, quantity, unit in items]
+    ids = ingredients.canonical_ids(conn, [p.name for p in parsed])
+    for (name, quantity, unit), p in zip(items, parsed):
+        canonical_id = ids.get(p.name)
+        conn.execute(
+            "INSERT OR IGNORE INTO ingredients (name, canonical_id) VALUES (?, ?)",
+            (name, canonical_id),
+        )
+        row = conn.execute("SELECT id FROM ingredients WHERE name = ?", (name,)).fetchone()
+        conn.execute(
+            """
+            INSERT INTO recipe_ingredients
+                (recipe_id, ingredient_id, quantity, unit,
+                 canonical_id, amount, amount_max, std_unit, prep_note)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (recipe_id, row["id"], quantity, unit,
+             canonical_id, p.quantity, p.quantity_max, p.unit, p.note),
+        )
+
+
+def legacy_add_recipe(conn, user_id, recipe_id):
+    rows = conn.execute(
+        """
+        SELECT c.id AS canonical_id, c.name AS canonical, i.name,
+               ri.quantity, ri.unit, ri.amount, ri.amount_max, ri.std_unit
+        FROM recipe_ingredients ri
+        JOIN ingredients i ON i.id = ri.ingredient_id
+        LEFT JOIN canonical_ingredients c ON c.id = ri.canonical_id
+        WHERE ri.recipe_id = ?
+        """,
+        (recipe_id,),
+    ).fetchall()
+    for r in rows:
+        amount = r["amount_max"] if r["amount_max"] is not None else r["amount"]
+        dimension, base_amount = grocery.to_base(amount, r["std_unit"])
+        grocery._merge(
+            conn, user_id, recipe_id,
+            r["canonical"] or r["name"], r["canonical_id"], dimension, base_amount,
+            metric=r["std_unit"] in grocery.METRIC_UNITS,
+            quantity=r["quantity"], unit=r["unit"],
+        )
+
+
+# -----------------------------------------
+# HARNESS
+# -----------------------------------------
+
+def open_copy(source: Path):
+    """(connection, path) for a scratch copy of `source`."""
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    src = sqlite3.connect(source)
+    conn = sqlite3.connect(path, isolation_level="IMMEDIATE")
+    src.backup(conn)
+    src.close()
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    for name, (num_params, func) in SQL_FUNCTIONS.items():
+        conn.create_function(name, num_params, func, deterministic=True)
+    migrate(conn)
+    return conn, path
+
+
+def sample_items(conn, count):
+    # Real ingredient lines, some of them new to the database
+    rows = conn.execute(
+        "SELECT name FROM ingredients ORDER BY random() LIMIT ?", (count // 2,)
+    ).fetchall()
+    items = [(r["name"], None, None) for r in rows]
+    while len(items) < count:
+        items.append((f"{len(items)} tbsp bench spice no. {len(items)}", None, None))
+    return items
+
+
+def measure(conn, label, setup, run, runs):
+    statements = []
+    conn.set_trace_callback(statements.append)
+    setup(0)
+    run(0)
+    conn.rollback()
+    conn.set_trace_callback(None)
+    measured = []
+    for sql in statements:
+        # Only what the code sends: not trigger bodies ("-- ..."), FTS5's
+        # own shadow-table statements ('main'.'recipes_fts_...'), the
+        # re-trace SQLite does when a statement steps again after a nested
+        # virtual-table write, or BEGIN/COMMIT bookkeeping. executemany()
+        # counts once per row.
+        if sql.startswith(("--", "BEGIN", "COMMIT", "ROLLBACK")) or "'main'." in sql:
+            continue
+        if measured and measured[-1] == sql:
+            continue
+        measured.append(sql)
+    count = len(measured)
+
+    timings = []
+    for i in range(runs):
+        setup(i)
+        start = time.perf_counter()
+        run(i)
+        conn.commit()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    print(
+        f"  {label:<8} {count:>5} statements   "
+        f"median {statistics.median(timings):7.3f} ms   "
+        f"p95 {timings[int(len(timings) * 0.95) - 1]:7.3f} ms"
+    )
+
+
+def bench_create_recipe(conn, items, runs):
+    print(f"create recipe ({len(items)} ingredients)")
+    for label, link in (("before", legacy_link_ingredients), ("after", ingredients.link_ingredients)):
+        recipe_ids = []
+
+        def setup(_i):
+            cur = conn.execute(
+                "INSERT INTO recipes (title, meal_type, source_type) VALUES ('Bench recipe', 'dinner', 'custom')"
+            )
+            recipe_ids.append(cur.lastrowid)
+
+        def run(_i):
+            link(conn, recipe_ids[-1], items)
+
+        measure(conn, label, setup, run, runs)
+
+
+def bench_grocery(conn, recipe_id, runs):
+    total = conn.execute(
+        "SELECT count(*) FROM recipe_ingredients WHERE recipe_id = ?", (recipe_id,)
+    ).fetchone()[0]
+    print(f"recipe -> grocery list ({total} ingredients)")
+    for label, add in (("before", legacy_add_recipe), ("after", grocery.add_recipe)):
+        def run(i):
+            # Fresh user every run, so both versions start from an empty list
+            add(conn, f"bench-{label}-{i}", recipe_id)
+
+        measure(conn, label, lambda _i: None, run, runs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--db", default=str(ROOT / "recipes.db"))
+    parser.add_argument("--ingredients", type=int, default=40)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    conn, path = open_copy(Path(args.db))
+    try:
+        items = sample_items(conn, args.ingredients)
+        bench_create_recipe(conn, items, args.runs)
+
+        recipe_id = conn.execute(
+            """
+            SELECT recipe_id FROM recipe_ingredients
+            GROUP BY recipe_id ORDER BY count(*) DESC LIMIT 1
+            """
+        ).fetchone()[0]
+        bench_grocery(conn, recipe_id, args.runs)
+    finally:
+        conn.close()
+        for suffix in ("", "-wal", "-shm"):
+            Path(path + suffix).unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    main()
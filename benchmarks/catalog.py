@@ -0,0 +1,277 @@
+# -----------------------------------------
+# Ovens Lovin's – synthetic catalog generator
+# -----------------------------------------
+#
+# Builds a seeded, reproducible recipes database of any size for the load
+# suite (benchmarks/load.py):
+#
+#   recipes       titles from word lists; meal types, chef / budget / custom
+#                 sources (budget versions link to a chef recipe) in fixed
+#                 proportions; 3-8 sentences of instructions
+#   ingredients   lines drawn from the real recipes.json corpus, so common
+#                 ingredients (olive oil, garlic, salt) dominate the way
+#                 they do in practice; ~15% are varied (other quantity, a
+#                 modifier) to give the long tail a big catalog has.
+#                 Lines-per-recipe follows the corpus too.
+#   users         favorites per user roughly geometric (mean ~12), picked
+#                 by a Zipf-like popularity; about half the users have a
+#                 grocery list built from 1-4 recipes
+#
+# Everything is written through the app's own code (migrations, recipe
+# pipeline, grocery.add_recipe), so indexes, FTS, triggers and parsed
+# ingredient columns are exactly what production has. The same arguments
+# always give the same catalog, and a finished one is reused:
+#
+#   python -m benchmarks.catalog [--recipes 100000] [--users 2000] [--seed 1] [--force]
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import grocery  # noqa: E402
+from db import SQL_FUNCTIONS  # noqa: E402
+from migrations import migrate  # noqa: E402
+from recipe_pipeline import clean_ingredients, create_recipe  # noqa: E402
+import similarity  # noqa: E402
+
+DATA_DIR = Path(os.getenv("BENCH_DATA_DIR") or Path(__file__).resolve().parent / ".data")
+GENERATOR_VERSION = 1
+COMMIT_EVERY = 2000
+
+ADJECTIVES = [
+    "Crispy", "Smoky", "Spicy", "Creamy", "Roasted", "Grilled", "Slow-Cooked", "Honey-Glazed",
+    "Garlic", "Lemon", "Herb-Crusted", "Braised", "Pan-Seared", "Sticky", "Zesty", "Rustic",
+    "Golden", "Charred", "Sweet and Sour", "Peppered", "Miso", "Chipotle", "Tandoori", "Buttery",
+]
+MAINS = [
+    "Chicken", "Beef", "Pork", "Lamb", "Salmon", "Cod", "Shrimp", "Tofu", "Mushroom", "Halloumi",
+    "Chickpea", "Lentil", "Aubergine", "Cauliflower", "Duck", "Turkey", "Sausage", "Scallop",
+    "Sweet Potato", "Squash", "Egg", "Pancake", "Chocolate", "Apple", "Banana", "Berry",
+]
+DISHES = [
+    "Tacos", "Curry", "Stew", "Risotto", "Pasta", "Salad", "Burger", "Pie", "Traybake", "Soup",
+    "Stir-Fry", "Skewers", "Flatbread", "Bowl", "Gratin", "Frittata", "Wellington", "Tart",
+    "Noodles", "Sandwich", "Casserole", "Crumble", "Pudding", "Wrap",
+]
+SIDES = [
+    "Herb Salsa", "Garlic Mash", "Charred Greens", "Pickled Onions", "Crispy Potatoes",
+    "Lemon Yogurt", "Chilli Oil", "Toasted Seeds", "Slaw", "Rice", "Gravy", "Pesto",
+]
+MODIFIERS = ["fresh", "organic", "smoked", "toasted", "finely chopped", "roughly chopped", "frozen", "ground"]
+QUANTITIES = ["1", "2", "3", "4", "1/2", "1/4", "3/4", "1 1/2", "6", "8", "100", "200", "250"]
+STEPS = [
+    "Preheat the oven to 200C.",
+    "Season the {main} generously with salt and pepper.",
+    "Heat a large pan over medium-high heat and add a splash of oil.",
+    "Sear the {main} until golden on all sides, about 4 minutes.",
+    "Add the onion and garlic and cook until soft and fragrant.",
+    "Stir in the spices and cook for another minute.",
+    "Pour in the stock, bring to a simmer and cook for 20 minutes.",
+    "Transfer to the oven and roast until cooked through.",
+    "Meanwhile, prepare the {side}.",
+    "Taste and adjust the seasoning.",
+    "Rest for 5 minutes before slicing.",
+    "Serve the {dish} hot, scattered with fresh herbs.",
+    "Spoon over the sauce and finish with a squeeze of lemon.",
+    "Toss everything together and divide between plates.",
+]
+MEAL_TYPES = [("Dinner", 40), ("Lunch", 20), ("Breakfast", 12), ("Dessert", 13), ("Snack", 5), (None, 10)]
+SOURCES = [("chef", 55), ("budget", 25), ("custom", 20)]
+
+
+def catalog_path(recipes: int, users: int, seed: int) -> Path:
+    return DATA_DIR / f"catalog-{recipes}r-{users}u-s{seed}.db"
+
+
+def search_terms() -> list:
+    """Words that occur in generated titles, for search load."""
+    return [w.lower() for w in ADJECTIVES[:8] + MAINS + DISHES]
+
+
+def _weighted(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+
+class Generator:
+    def __init__(self, seed: int):
+        self.rng = random.Random(seed)
+        with open(ROOT / "recipes.json", encoding="utf-8") as f:
+            corpus = json.load(f)
+        # Every line keeps its multiplicity, so frequent ingredients stay frequent
+        self.lines = []
+        self.line_counts = []
+        for record in corpus:
+            lines = [name for name, _, _ in clean_ingredients(record.get("ingredients"))]
+            if lines:
+                self.lines.extend(lines)
+                self.line_counts.append(len(lines))
+
+    def title(self) -> tuple:
+        rng = self.rng
+        main, dish, side = rng.choice(MAINS), rng.choice(DISHES), rng.choice(SIDES)
+        title = f"{rng.choice(ADJECTIVES)} {main} {dish}"
+        if rng.random() < 0.5:
+            title += f" with {side}"
+        return title, main.lower(), dish.lower(), side.lower()
+
+    def ingredient_line(self) -> str:
+        rng = self.rng
+        line = rng.choice(self.lines)
+        if rng.random() < 0.15:
+            words = line.split(" ", 1)
+            if words[0][:1].isdigit() and len(words) == 2:
+                line = f"{rng.choice(QUANTITIES)} {words[1]}"
+            else:
+                line = f"{rng.choice(MODIFIERS)} {line}"
+        return line
+
+    def recipe(self) -> dict:
+        rng = self.rng
+        title, main, dish, side = self.title()
+        lines = list(dict.fromkeys(self.ingredient_line() for _ in range(rng.choice(self.line_counts))))
+        steps = rng.sample(STEPS, rng.randint(3, 8))
+        return {
+            "title": title,
+            "meal_type": _weighted(rng, MEAL_TYPES),
+            "source": _weighted(rng, SOURCES),
+            "instructions": "\n".join(s.format(main=main, dish=dish, side=side) for s in steps),
+            "ingredients": lines,
+        }
+
+    def popular(self, ids: list) -> int:
+        """A recipe id, Zipf-like: a few recipes get most of the attention."""
+        rank = int(self.rng.paretovariate(1.1)) - 1
+        return ids[rank % len(ids)]
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, isolation_level="IMMEDIATE")
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode = WAL")
+    # A half-written catalog is thrown away anyway
+    conn.execute("PRAGMA synchronous = OFF")
+    for name, (num_params, func) in SQL_FUNCTIONS.items():
+        conn.create_function(name, num_params, func, deterministic=True)
+    return conn
+
+
+def generate(path: Path, recipes: int, users: int, seed: int, log=print) -> Path:
+    gen = Generator(seed)
+    rng = gen.rng
+    tmp = path.with_suffix(".partial")
+    for stale in (tmp, Path(f"{tmp}-wal"), Path(f"{tmp}-shm")):
+        stale.unlink(missing_ok=True)
+    tmp.parent.mkdir(parents=True, exist_ok=True)
+
+    conn = _connect(tmp)
+    migrate(conn)
+    start = time.perf_counter()
+
+    chef_ids = []
+    for n in range(recipes):
+        r = gen.recipe()
+        budget = r["source"] == "budget" and bool(chef_ids)
+        recipe_id = create_recipe(
+            conn,
+            r["title"],
+            meal_type=r["meal_type"],
+            source_type="budget" if budget else ("custom" if r["source"] == "custom" else "chef"),
+            is_budget_friendly=budget,
+            base_recipe_id=rng.choice(chef_ids) if budget else None,
+            prep_instructions=r["instructions"],
+            ingredients=r["ingredients"],
+        )
+        if not budget and r["source"] == "chef":
+            chef_ids.append(recipe_id)
+        if (n + 1) % COMMIT_EVERY == 0:
+            conn.commit()
+            rate = (n + 1) / (time.perf_counter() - start)
+            log(f"  {n + 1:>10,} recipes   {rate:8,.0f}/s")
+    conn.commit()
+    recipe_seconds = time.perf_counter() - start
+
+    ids = [row[0] for row in conn.execute("SELECT id FROM recipes ORDER BY id")]
+    rng.shuffle(ids)  # popularity is independent of insertion order
+    favorites = 0
+    for u in range(users):
+        user_id = f"user-{u:05d}"
+        wanted = {gen.popular(ids) for _ in range(min(200, int(rng.expovariate(1 / 12)) + 1))}
+        conn.executemany(
+            "INSERT OR IGNORE INTO user_favorites (user_id, recipe_id) VALUES (?, ?)",
+            [(user_id, recipe_id) for recipe_id in wanted],
+        )
+        favorites += len(wanted)
+        if rng.random() < 0.5:
+            for _ in range(rng.randint(1, 4)):
+                grocery.add_recipe(conn, user_id, gen.popular(ids))
+        if (u + 1) % 500 == 0:
+            conn.commit()
+    similarity.refresh(conn)
+    conn.commit()
+
+    meta = {
+        "generator_version": GENERATOR_VERSION,
+        "recipes": recipes,
+        "users": users,
+        "seed": seed,
+        "favorites": favorites,
+        "grocery_items": conn.execute("SELECT count(*) FROM grocery_items").fetchone()[0],
+        "ingredients": conn.execute("SELECT count(*) FROM ingredients").fetchone()[0],
+        "recipe_ingredients": conn.execute("SELECT count(*) FROM recipe_ingredients").fetchone()[0],
+        "recipes_per_second": round(recipes / recipe_seconds, 1) if recipe_seconds else None,
+        "seconds": round(time.perf_counter() - start, 1),
+    }
+    conn.execute("CREATE TABLE bench_catalog (key TEXT PRIMARY KEY, value)")
+    conn.executemany("INSERT INTO bench_catalog VALUES (?, ?)", meta.items())
+    conn.commit()
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.execute("ANALYZE")
+    conn.close()
+    tmp.replace(path)
+    return path
+
+
+def catalog_info(path: Path) -> dict:
+    conn = sqlite3.connect(path)
+    try:
+        return dict(conn.execute("SELECT key, value FROM bench_catalog").fetchall())
+    except sqlite3.OperationalError:
+        return {}
+    finally:
+        conn.close()
+
+
+def ensure_catalog(recipes: int, users: int, seed: int = 1, force: bool = False, log=print) -> Path:
+    """Path to the catalog for these arguments, generating it if needed."""
+    path = catalog_path(recipes, users, seed)
+    if path.exists() and not force and catalog_info(path).get("generator_version") == GENERATOR_VERSION:
+        return path
+    log(f"Generating {recipes:,} recipes / {users:,} users (seed {seed}) -> {path}")
+    return generate(path, recipes, users, seed, log=log)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a synthetic recipes database.")
+    parser.add_argument("--recipes", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--force", action="store_true", help="regenerate even if it exists")
+    args = parser.parse_args()
+
+    path = ensure_catalog(args.recipes, args.users, args.seed, force=args.force)
+    for key, value in catalog_info(path).items():
+        print(f"  {key:<20} {value}")
+    print(path)
+
+
+if __name__ == "__main__":
+    main()
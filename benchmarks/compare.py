@@ -0,0 +1,100 @@
+# -----------------------------------------
+# Ovens Lovin's – compare two load-test runs
+# -----------------------------------------
+#
+# Per-endpoint deltas between two results saved by benchmarks/load.py,
+# e.g. the same catalog and settings on two commits. Warns when the runs
+# are not comparable (different catalog, settings or machine) and exits 1
+# if any endpoint regressed by more than --threshold percent.
+#
+#   python -m benchmarks.compare OLD.json NEW.json [--threshold 10]
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# (key, label, higher is better)
+METRICS = (
+    ("requests_per_second", "req/s", True),
+    ("p50_ms", "p50 ms", False),
+    ("p95_ms", "p95 ms", False),
+    ("p99_ms", "p99 ms", False),
+)
+
+
+def load(path) -> dict:
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def mismatches(old: dict, new: dict) -> list:
+    warnings = []
+    for section, keys in (
+        ("catalog", ("generator_version", "recipes", "users", "seed")),
+        ("settings", ("mode", "workers", "concurrency", "duration", "warmup", "seed")),
+        ("environment", ("python", "sqlite", "platform", "cpus", "orjson")),
+    ):
+        for key in keys:
+            a, b = old.get(section, {}).get(key), new.get(section, {}).get(key)
+            if a != b:
+                warnings.append(f"{section}.{key} differs: {a} -> {b}")
+    return warnings
+
+
+def change(old_value, new_value):
+    if not old_value or new_value is None:
+        return None
+    return (new_value - old_value) / old_value * 100
+
+
+def compare(old: dict, new: dict, threshold: float) -> tuple:
+    """(table lines, regressions)"""
+    lines, regressions = [], []
+    header = f"{'endpoint':<24}" + "".join(f"{label:>26}" for _, label, _ in METRICS)
+    lines += [header, "-" * len(header)]
+    for name in list(dict.fromkeys([*old["endpoints"], *new["endpoints"]])):
+        a, b = old["endpoints"].get(name), new["endpoints"].get(name)
+        if a is None or b is None:
+            lines.append(f"{name:<24}  only in {'new' if a is None else 'old'} run")
+            continue
+        cells = []
+        for key, label, higher_is_better in METRICS:
+            pct = change(a.get(key), b.get(key))
+            cell = f"{a.get(key) or 0:.1f} -> {b.get(key) or 0:.1f}"
+            if pct is not None:
+                cell += f" ({pct:+.1f}%)"
+                worse = -pct if higher_is_better else pct
+                if worse > threshold:
+                    regressions.append(f"{name} {label} {pct:+.1f}%")
+                    cell += " !"
+            cells.append(f"{cell:>26}")
+        if b.get("errors"):
+            cells.append(f"  errors {a.get('errors', 0)} -> {b['errors']}")
+        lines.append(f"{name:<24}" + "".join(cells))
+    return lines, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two saved load-test runs.")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10, help="regression limit in percent")
+    args = parser.parse_args()
+
+    old, new = load(args.old), load(args.new)
+    for run, label in ((old, "old"), (new, "new")):
+        git = run.get("git", {})
+        print(f"{label}: {git.get('commit') or '?'}{' (dirty)' if git.get('dirty') else ''}  {run.get('timestamp', '')}")
+    for warning in mismatches(old, new):
+        print(f"warning: {warning}")
+    print()
+
+    lines, regressions = compare(old, new, args.threshold)
+    print("\n".join(lines))
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold:g}%: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+# -----------------------------------------
+# Ovens Lovin's – API load test
+# -----------------------------------------
+#
+# Drives the API with N concurrent clients, one endpoint at a time, on a
+# scratch copy of a synthetic catalog (benchmarks/catalog.py), and reports
+# p50 / p95 / p99 latency and requests/sec per endpoint:
+#
+#   --mode inprocess   main.app through httpx's ASGI transport: no sockets,
+#                      the app's own threadpool; shows the code's cost
+#   --mode uvicorn     a real `uvicorn main:app --workers N` on localhost;
+#                      shows what a deployment gets (HTTP, processes)
+#
+# Every run is saved as JSON (commit, environment, catalog, settings and
+# per-endpoint numbers) in benchmarks/results/; compare two with
+# `python -m benchmarks.compare`.
+#
+#   python -m benchmarks.load [--recipes 100000] [--users 2000] [--mode inprocess]
+#                             [--concurrency 16] [--duration 10] [--endpoints a,b]
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+# -----------------------------------------
+# ENDPOINTS
+# -----------------------------------------
+
+class Context:
+    """What requests are built from: id range, user ids, search words."""
+
+    def __init__(self, db_path: Path, users: int, terms: list):
+        conn = sqlite3.connect(db_path)
+        self.max_id = conn.execute("SELECT max(id) FROM recipes").fetchone()[0]
+        conn.close()
+        self.users = max(users, 1)
+        self.terms = terms
+
+    def user(self, rng) -> dict:
+        return {"X-User-Id": f"user-{rng.randrange(self.users):05d}"}
+
+    def recipe_id(self, rng) -> int:
+        return rng.randint(1, self.max_id)
+
+
+# name -> (method, build(ctx, rng) -> (path, headers)); reads unless noted
+ENDPOINTS = {
+    "list_recipes": ("GET", lambda ctx, rng: (f"/recipes?limit=50&cursor={ctx.recipe_id(rng)}", {})),
+    "list_recipes_filtered": ("GET", lambda ctx, rng: (
+        f"/recipes?meal_type={rng.choice(['Dinner', 'Lunch', 'Dessert'])}"
+        "&is_budget_friendly=true&limit=50&fields=id,title,category", {})),
+    # The whole catalog in one response: opt-in, it is huge at 1M recipes
+    "list_recipes_all": ("GET", lambda ctx, rng: ("/recipes", ctx.user(rng))),
+    "get_recipe": ("GET", lambda ctx, rng: (
+        f"/recipe/{ctx.recipe_id(rng)}?include=ingredients,images,base", ctx.user(rng))),
+    "search": ("GET", lambda ctx, rng: (f"/recipes/search?q={rng.choice(ctx.terms)}", {})),
+    "similar": ("GET", lambda ctx, rng: (f"/recipe/{ctx.recipe_id(rng)}/similar", {})),
+    "favorites": ("GET", lambda ctx, rng: ("/favorites", ctx.user(rng))),
+    "grocery_list": ("GET", lambda ctx, rng: ("/grocery/list", ctx.user(rng))),
+    # Write: merges a recipe into a user's list (one writer connection)
+    "add_grocery_from_recipe": ("POST", lambda ctx, rng: (
+        f"/grocery/add_from_recipe/{ctx.recipe_id(rng)}", ctx.user(rng))),
+}
+DEFAULT_ENDPOINTS = [name for name in ENDPOINTS if name != "list_recipes_all"]
+
+
+# -----------------------------------------
+# LOAD GENERATOR
+# -----------------------------------------
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+async def run_endpoint(client, name, ctx, concurrency, duration, warmup, seed) -> dict:
+    method, build = ENDPOINTS[name]
+    start = time.perf_counter()
+    measure_from = start + warmup
+    end = measure_from + duration
+    latencies, statuses, errors, body_bytes = [], {}, 0, 0
+
+    async def worker(n):
+        nonlocal errors, body_bytes
+        rng = random.Random(f"{seed}-{name}-{n}")
+        while True:
+            sent = time.perf_counter()
+            if sent >= end:
+                return
+            path, headers = build(ctx, rng)
+            try:
+                response = await client.request(method, path, headers=headers)
+                status = response.status_code
+                size = len(response.content)
+            except httpx.HTTPError:
+                status, size = "error", 0
+            done = time.perf_counter()
+            if sent >= measure_from:
+                latencies.append(done - sent)
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+                if status == "error" or status >= 500:
+                    errors += 1
+                body_bytes += size
+
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    elapsed = time.perf_counter() - measure_from
+    latencies.sort()
+    ms = [v * 1000 for v in latencies]
+    return {
+        "requests": len(ms),
+        "errors": errors,
+        "statuses": statuses,
+        "requests_per_second": round(len(ms) / elapsed, 1) if elapsed > 0 else None,
+        "p50_ms": _round(percentile(ms, 50)),
+        "p95_ms": _round(percentile(ms, 95)),
+        "p99_ms": _round(percentile(ms, 99)),
+        "mean_ms": _round(sum(ms) / len(ms)) if ms else None,
+        "max_ms": _round(ms[-1]) if ms else None,
+        "mean_bytes": round(body_bytes / len(ms)) if ms else None,
+    }
+
+
+def _round(value):
+    return None if value is None else round(value, 3)
+
+
+async def run_all(client, ctx, args, log) -> dict:
+    results = {}
+    for name in args.endpoints:
+        stats = await run_endpoint(
+            client, name, ctx, args.concurrency, args.duration, args.warmup, args.seed
+        )
+        results[name] = stats
+        log(
+            f"  {name:<24} {stats['requests_per_second'] or 0:9.1f} req/s   "
+            f"p50 {stats['p50_ms'] or 0:8.2f}   p95 {stats['p95_ms'] or 0:8.2f}   "
+            f"p99 {stats['p99_ms'] or 0:8.2f} ms   errors {stats['errors']}"
+        )
+    return results
+
+
+async def run_inprocess(db_path: Path, ctx, args, log) -> dict:
+    os.chdir(ROOT)  # static mounts are relative
+    import main
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            return await run_all(client, ctx, args, log)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def run_uvicorn(db_path: Path, ctx, args, log) -> dict:
+    port = _free_port()
+    env = dict(os.environ, RECIPES_DB_PATH=str(db_path))
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(args.workers), "--log-level", "warning", "--no-access-log",
+        ],
+        cwd=ROOT,
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            deadline = time.monotonic() + 60
+            while True:
+                if server.poll() is not None:
+                    raise RuntimeError("uvicorn exited during startup")
+                try:
+                    if (await client.get("/recipes?limit=1")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise RuntimeError("uvicorn did not become ready within 60s")
+                await asyncio.sleep(0.2)
+            return await run_all(client, ctx, args, log)
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+# -----------------------------------------
+# RESULTS
+# -----------------------------------------
+
+def git_commit() -> dict:
+    def git(*cmd):
+        return subprocess.run(["git", *cmd], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+
+    return {"commit": git("rev-parse", "HEAD") or None, "dirty": bool(git("status", "--porcelain", "-uno"))}
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "orjson": importlib.util.find_spec("orjson") is not None,
+    }
+
+
+def save(result: dict, out) -> Path:
+    if out:
+        path = Path(out)
+    else:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+        commit = (result["git"]["commit"] or "nogit")[:8]
+        catalog = result["catalog"]
+        path = RESULTS_DIR / f"{stamp}-{commit}-{result['settings']['mode']}-{catalog['recipes']}r.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(result, indent=2) + "\n", encoding="utf-8")
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the API on a synthetic catalog.")
+    parser.add_argument("--recipes", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--mode", choices=("inprocess", "uvicorn"), default="inprocess")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10, help="measured seconds per endpoint")
+    parser.add_argument("--warmup", type=float, default=2, help="unmeasured seconds per endpoint")
+    parser.add_argument("--endpoints", default=",".join(DEFAULT_ENDPOINTS),
+                        help=f"comma-separated, from: {', '.join(ENDPOINTS)}")
+    parser.add_argument("--out", help="result file (default: benchmarks/results/<time>-<commit>-...json)")
+    args = parser.parse_args()
+    args.endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    unknown = [e for e in args.endpoints if e not in ENDPOINTS]
+    if unknown:
+        parser.error(f"unknown endpoint(s): {', '.join(unknown)}")
+
+    # Writes during the run go to a scratch copy, so runs don't leak into
+    # each other. db.py reads RECIPES_DB_PATH once, when first imported
+    # (by the catalog generator or main), hence before the import below.
+    workdir = Path(tempfile.mkdtemp())
+    db_path = workdir / "recipes.db"
+    os.environ["RECIPES_DB_PATH"] = str(db_path)
+    from benchmarks.catalog import catalog_info, ensure_catalog, search_terms
+
+    catalog = ensure_catalog(args.recipes, args.users, args.seed)
+    try:
+        shutil.copy(catalog, db_path)
+        ctx = Context(db_path, args.users, search_terms())
+
+        print(
+            f"{args.mode}, {args.recipes:,} recipes, {args.users:,} users, "
+            f"concurrency {args.concurrency}, {args.duration:g}s per endpoint"
+            + (f", {args.workers} workers" if args.mode == "uvicorn" else "")
+        )
+        runner = run_inprocess if args.mode == "inprocess" else run_uvicorn
+        endpoints = asyncio.run(runner(db_path, ctx, args, print))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    result = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git": git_commit(),
+        "environment": environment(),
+        "catalog": catalog_info(catalog),
+        "settings": {
+            "mode": args.mode,
+            "workers": args.workers if args.mode == "uvicorn" else None,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "seed": args.seed,
+        },
+        "endpoints": endpoints,
+    }
+    print(save(result, args.out))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+# -----------------------------------------
+# Ovens Lovin's – in-process recipe catalog cache
+# -----------------------------------------
+#
+# /recipes pages and /recipe/{id} details are kept as ready-to-send JSON
+# bytes in a size-bounded LRU. The only per-user part, is_favorite, is a
+# hole in the payload filled in per request from the user's favorite set
+# (itself cached, keyed on that user's favorites counter).
+#
+# Staying correct across uvicorn workers and importer runs: every request
+# reads the shared "recipes" counter from data_versions (versions.py; it
+# already does so for its ETag). When the counter moved, the recipes
+# changed since the last check are read from change_log (changes.py) and
+# only their detail entries are dropped (and details embedding one of them
+# as base_recipe), plus every list page, since any change can move a
+# recipe in or out of a page. Both tables are written by
+# triggers, so create_recipe / delete_recipe / imports / sync scripts in
+# any process invalidate without knowing this cache exists.
+
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from changes import latest_seq
+from fastjson import dumps
+
+CACHE_SIZE = int(os.getenv("CATALOG_CACHE_SIZE", "512"))
+
+# Stand-in for is_favorite while serializing; one per recipe id
+_FLAG = "\x00is_favorite:{}\x00"
+_FLAG_RE = re.compile(rb'"\\u0000is_favorite:(\d+)\\u0000"')
+
+
+def serialize_payload(payload) -> list:
+    """
+    JSON for `payload` as a list of byte chunks and recipe ids; each id
+    marks where that recipe's is_favorite value goes (see favorite_flag()).
+    """
+    return split_payload(dumps(payload))
+
+
+def split_payload(body: bytes) -> list:
+    """serialize_payload() for JSON already encoded elsewhere (e.g. by SQLite)."""
+    parts = _FLAG_RE.split(body)
+    # split() alternates text, captured id, text, ...
+    return [int(p) if i % 2 else p for i, p in enumerate(parts)]
+
+
+def favorite_flag(recipe_id: int) -> str:
+    """Placeholder for a recipe's is_favorite in a payload passed to serialize_payload()."""
+    return _FLAG.format(recipe_id)
+
+
+def render_payload(parts, favorites) -> bytes:
+    return b"".join(
+        (b"true" if p in favorites else b"false") if isinstance(p, int) else p
+        for p in parts
+    )
+
+
+class CatalogCache:
+    def __init__(self, size: int = CACHE_SIZE):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None    # "recipes" counter the entries are valid for
+        self._seq = 0           # last change_log seq looked at
+        self._depends = {}      # key -> other recipe id the entry embeds
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    # ---- invalidation ----
+
+    def refresh(self, conn, version: int):
+        """Drop entries made stale by writes (from any process) since the last call."""
+        if version == self._version:
+            return
+        if self._version is None:
+            # First request in this process: nothing cached yet, so only
+            # where change_log stands matters
+            seq = latest_seq(conn)
+            with self._lock:
+                if self._version is None:
+                    self._version, self._seq = version, seq
+            return
+        rows = conn.execute(
+            """
+            SELECT seq, entity_id FROM change_log
+            WHERE user_id = '' AND seq > ? AND entity = 'recipe'
+            ORDER BY seq
+            """,
+            (self._seq,),
+        ).fetchall()
+        with self._lock:
+            if self._version is not None and version < self._version:
+                # A slower request with an older snapshot; counters only grow
+                return
+            changed = {r["entity_id"] for r in rows}
+            # Detail keys are ("recipe", id, sections)
+            stale = [
+                k for k in self._entries
+                if k[0] == "list"
+                or (k[0] == "recipe" and (k[1] in changed or self._depends.get(k) in changed))
+            ]
+            for key in stale:
+                del self._entries[key]
+                self._depends.pop(key, None)
+            self._stats["invalidations"] += len(stale)
+            self._version = version
+            if rows:
+                self._seq = max(self._seq, rows[-1]["seq"])
+
+    # ---- entries ----
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return value
+
+    def put(self, key, value, version: int, depends_on: int = None):
+        """
+        Store an entry built after refresh(conn, version). Skipped if another
+        request has seen a newer version meanwhile: the entry may predate the
+        write that invalidation already ran for. `depends_on` is another
+        recipe whose changes also make the entry stale (its base recipe).
+        """
+        with self._lock:
+            if version == self._version:
+                self._store(key, value)
+                if depends_on is not None:
+                    self._depends[key] = depends_on
+
+    def _store(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            evicted, _ = self._entries.popitem(last=False)
+            self._depends.pop(evicted, None)
+            self._stats["evictions"] += 1
+
+    def favorites(self, conn, user_id: str, version: int) -> frozenset:
+        """The user's favorite recipe ids, re-read only when their counter moved."""
+        key = ("favorites", user_id)
+        cached = self.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        ids = frozenset(
+            row[0] for row in conn.execute("SELECT recipe_id FROM user_favorites WHERE user_id = ?", (user_id,))
+        )
+        # Labelled with the counter read before the ids: never newer than them
+        with self._lock:
+            self._store(key, (version, ids))
+        return ids
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else None,
+                "entries": len(self._entries),
+                "size": self.size,
+                "version": self._version,
+            }
+
+
+catalog_cache = CatalogCache()
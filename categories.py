@@ -0,0 +1,137 @@
+# -----------------------------------------
+# Ovens Lovin's – recipe categories
+# -----------------------------------------
+#
+# auto_category() guesses a category from a recipe title. It is used when
+# a recipe is written without one; stored rows never need it at read
+# time, because backfill() (migration 16, or `python categories.py`)
+# fills in every recipe whose category column was still NULL.
+#
+# Rules are a table of (priority, category, keywords). A Classifier
+# compiles all keywords into one regex, scans a title once and keeps the
+# match with the lowest priority number, so the result doesn't depend on
+# where in the title a keyword appears. Keywords match whole words, plus
+# a plural "s" / "es": "pie" matches "Apple Pies" but not "Piece",
+# "ham" matches "Ham Hock" but not "Graham Crackers".
+
+import re
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Iterable, List, Optional
+
+RULES = (
+    (10, "Salad", ("salad",)),
+    (20, "Soups & Stews", ("soup", "stew", "chowder", "broth")),
+    (30, "Pasta", ("pasta", "spaghetti", "noodle", "lasagna", "lasagne")),
+    (40, "Chicken", ("chicken",)),
+    (50, "Beef", ("beef", "steak", "burger", "hamburger", "cheeseburger")),
+    (60, "Pork", ("pork", "ham", "bacon")),
+    (70, "Seafood", ("fish", "fishcake", "salmon", "shrimp", "prawn", "crab")),
+    (80, "Dessert", ("cake", "cheesecake", "cupcake", "cookie", "brownie", "pie", "tart", "crumble", "dessert")),
+    (90, "Handhelds", ("sandwich", "wrap", "taco", "quesadilla")),
+)
+DEFAULT_CATEGORY = "Other"
+
+
+class Classifier:
+    """Title -> category for one rule table, compiled once."""
+
+    def __init__(self, rules: Iterable = RULES, default: str = DEFAULT_CATEGORY):
+        self.default = default
+        # keyword -> (priority, category); a keyword listed twice keeps its
+        # most important rule
+        self._rules = {}
+        for priority, category, keywords in sorted(rules, key=lambda rule: rule[0]):
+            for keyword in keywords:
+                self._rules.setdefault(keyword.lower(), (priority, category))
+        if self._rules:
+            # Longest first, so "cheesecake" wins over a shorter alternative
+            words = sorted(self._rules, key=len, reverse=True)
+            self._pattern = re.compile(r"\b(" + "|".join(map(re.escape, words)) + r")(?:e?s)?\b")
+        else:
+            self._pattern = None
+
+    def classify(self, title: Optional[str]) -> str:
+        if not title or self._pattern is None:
+            return self.default
+        best = None
+        for keyword in self._pattern.findall(title.lower()):
+            rule = self._rules[keyword]
+            if best is None or rule < best:
+                best = rule
+        return best[1] if best else self.default
+
+    def classify_many(self, titles: Iterable[Optional[str]]) -> List[str]:
+        """
+        classify() for many titles at once: one regex scan over all of
+        them joined together, so titles without a keyword (most of them)
+        cost no Python work beyond lower().
+        """
+        lowered = [(title or "").lower() for title in titles]
+        result = [self.default] * len(lowered)
+        if self._pattern is None or not lowered:
+            return result
+        starts = list(accumulate((len(t) + 1 for t in lowered[:-1]), initial=0))
+        best = {}
+        rules = self._rules
+        for match in self._pattern.finditer("\n".join(lowered)):
+            i = bisect_right(starts, match.start()) - 1
+            rule = rules[match.group(1)]
+            if i not in best or rule < best[i]:
+                best[i] = rule
+        for i, (_, category) in best.items():
+            result[i] = category
+        return result
+
+
+classifier = Classifier()
+
+
+def auto_category(title: str) -> str:
+    return classifier.classify(title)
+
+
+# -----------------------------------------
+# BACK-FILL
+# -----------------------------------------
+
+def backfill(conn, batch_size: int = 1000, dry_run: bool = False) -> dict:
+    """
+    Store a category for every recipe that has none. Returns
+    {category: count}. Safe to re-run; a caught-up database is one query.
+    """
+    counts = {}
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            "SELECT id, title FROM recipes WHERE category IS NULL AND id > ? ORDER BY id LIMIT ?",
+            (last_id, batch_size),
+        ).fetchall()
+        if not rows:
+            return counts
+        categories = classifier.classify_many(row[1] for row in rows)
+        for category in categories:
+            counts[category] = counts.get(category, 0) + 1
+        if not dry_run:
+            conn.executemany(
+                "UPDATE recipes SET category = ? WHERE id = ?",
+                [(category, row[0]) for category, row in zip(categories, rows)],
+            )
+        last_id = rows[-1][0]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from db import get_write_conn
+
+    parser = argparse.ArgumentParser(description="Store a category for recipes that have none.")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true", help="show what would be stored, write nothing")
+    args = parser.parse_args()
+
+    with get_write_conn() as conn:
+        counts = backfill(conn, batch_size=args.batch_size, dry_run=args.dry_run)
+    for category, count in sorted(counts.items(), key=lambda item: -item[1]):
+        print(f"  {count:>8}  {category}")
+    print(f"{'Would store' if args.dry_run else 'Stored'} {sum(counts.values())} categories")
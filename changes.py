@@ -0,0 +1,200 @@
+# -----------------------------------------
+# Ovens Lovin's – change log for delta sync
+# -----------------------------------------
+#
+# change_log keeps one row per changed entity, numbered by a global,
+# increasing seq:
+#
+#   entity     entity_id    user_id
+#   recipe     recipes.id   ''          (catalog, shared by everyone)
+#   favorite   recipe_id    user        (that user's favorites)
+#   grocery    item id      user        (that user's grocery list)
+#
+# Triggers write it, so every write path is covered. Each write deletes
+# the entity's previous row before adding the new one, so the log holds at
+# most one row per entity (deleted ones stay as tombstones) and a client
+# that is far behind still gets each entity once.
+#
+# A client keeps the highest seq it has applied as its cursor; GET
+# /sync?since=<cursor> returns the current state of every entity changed
+# after it. since=0 returns a full snapshot instead.
+
+from typing import Optional
+
+
+# user_id of catalog entries (SQL literal)
+SHARED = "''"
+
+# Changes per /sync page; the client keeps asking while "more" is true
+PAGE_SIZE = 1000
+
+
+def _log(entity, entity_id, user_id, op):
+    # Not REPLACE INTO: a trigger's conflict clause is overridden by the
+    # statement that fired it (INSERT OR IGNORE, an upsert's DO UPDATE), so
+    # the old row is deleted explicitly and the INSERT never conflicts.
+    return f"""
+        DELETE FROM change_log
+        WHERE entity = '{entity}' AND user_id = {user_id} AND entity_id = {entity_id};
+        INSERT INTO change_log (entity, user_id, entity_id, op)
+        VALUES ('{entity}', {user_id}, {entity_id}, '{op}');
+    """
+
+
+def _triggers(table, entity, entity_id, user_id):
+    new_id, old_id = entity_id.format(row="new"), entity_id.format(row="old")
+    new_user, old_user = user_id.format(row="new"), user_id.format(row="old")
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {table}_changes_ai AFTER INSERT ON {table} BEGIN"
+        f"{_log(entity, new_id, new_user, 'upsert')} END",
+        # An item moved between users is gone for one and new for the other
+        f"CREATE TRIGGER IF NOT EXISTS {table}_changes_au AFTER UPDATE ON {table} BEGIN"
+        f"{_log(entity, old_id, old_user, 'delete')}{_log(entity, new_id, new_user, 'upsert')} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_changes_ad AFTER DELETE ON {table} BEGIN"
+        f"{_log(entity, old_id, old_user, 'delete')} END",
+    ]
+
+
+def _touch_triggers(table, entity, entity_id):
+    # Rows that belong to an entity: any write counts as an update of it
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {table}_changes_{suffix} AFTER {event} ON {table} BEGIN"
+        f"{_log(entity, entity_id.format(row=row), SHARED, 'upsert')} END"
+        for suffix, event, row in (("ai", "INSERT", "new"), ("au", "UPDATE", "new"), ("ad", "DELETE", "old"))
+    ]
+
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS change_log (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        entity TEXT NOT NULL,
+        user_id TEXT NOT NULL,
+        entity_id INTEGER NOT NULL,
+        op TEXT NOT NULL,
+        UNIQUE (entity, user_id, entity_id)
+    )
+    """,
+    # /sync reads the shared ('') and one user's changes after a cursor
+    "CREATE INDEX IF NOT EXISTS idx_change_log_user_seq ON change_log (user_id, seq)",
+    *_triggers("recipes", "recipe", "{row}.id", SHARED),
+    # Ingredient and image edits change the recipe detail payload (catalog_cache.py)
+    *_touch_triggers("recipe_ingredients", "recipe", "{row}.recipe_id"),
+    *_touch_triggers("recipe_images", "recipe", "{row}.recipe_id"),
+    *_triggers("user_favorites", "favorite", "{row}.recipe_id", "coalesce({row}.user_id, '')"),
+    *_triggers("grocery_items", "grocery", "{row}.id", "coalesce({row}.user_id, '')"),
+]
+
+
+def ensure_schema(conn):
+    for statement in SCHEMA:
+        conn.execute(statement)
+
+
+# What the replica keeps per recipe: the fields the recipe list shows
+RECIPE_COLUMNS = "id, title, meal_type, category, source_type, is_budget_friendly"
+
+
+def _recipe_out(row) -> dict:
+    return {
+        "id": row["id"],
+        "title": row["title"],
+        "meal_type": row["meal_type"],
+        "category": row["category"],
+        "source_type": row["source_type"],
+        "is_budget_friendly": bool(row["is_budget_friendly"]),
+    }
+
+
+def _grocery_out(row) -> dict:
+    return {
+        "id": row["id"],
+        "ingredient_name": row["ingredient_name"],
+        "quantity": row["quantity"],
+        "unit": row["unit"],
+        "checked": bool(row["checked"]),
+    }
+
+
+def _in(ids) -> str:
+    return ", ".join("?" for _ in ids)
+
+
+def latest_seq(conn) -> int:
+    return conn.execute("SELECT coalesce(max(seq), 0) FROM change_log").fetchone()[0]
+
+
+def snapshot(conn, user_id) -> dict:
+    """Everything a fresh replica needs, with the cursor to continue from."""
+    cursor = latest_seq(conn)
+    recipes = conn.execute(f"SELECT {RECIPE_COLUMNS} FROM recipes ORDER BY id").fetchall()
+    favorites = conn.execute(
+        "SELECT recipe_id FROM user_favorites WHERE user_id = ? ORDER BY recipe_id", (user_id,)
+    ).fetchall()
+    grocery = conn.execute(
+        "SELECT id, ingredient_name, quantity, unit, checked FROM grocery_items WHERE user_id = ?",
+        (user_id,),
+    ).fetchall()
+    return {
+        "cursor": cursor,
+        "reset": True,
+        "more": False,
+        "recipes": {"upserted": [_recipe_out(r) for r in recipes], "deleted": []},
+        "favorites": {"added": [r["recipe_id"] for r in favorites], "removed": []},
+        "grocery": {"upserted": [_grocery_out(r) for r in grocery], "deleted": []},
+    }
+
+
+def changes_since(conn, user_id, since: Optional[int], limit: int = PAGE_SIZE) -> dict:
+    """
+    Entities changed after `since`, as their current rows (or ids, for
+    deletions). Run inside one read transaction so the rows match the
+    cursor returned.
+    """
+    if not since or since > latest_seq(conn):
+        # New client, or a cursor from another (restored / replaced) database
+        return snapshot(conn, user_id)
+
+    log = conn.execute(
+        """
+        SELECT seq, entity, entity_id, op FROM change_log
+        WHERE user_id IN ('', ?) AND seq > ?
+        ORDER BY seq
+        LIMIT ?
+        """,
+        (user_id, since, limit + 1),
+    ).fetchall()
+    more = len(log) > limit
+    log = log[:limit]
+
+    ids = {"recipe": ([], []), "favorite": ([], []), "grocery": ([], [])}
+    for row in log:
+        upserts, deletes = ids[row["entity"]]
+        (upserts if row["op"] == "upsert" else deletes).append(row["entity_id"])
+
+    recipe_ids, deleted_recipes = ids["recipe"]
+    recipes = conn.execute(
+        f"SELECT {RECIPE_COLUMNS} FROM recipes WHERE id IN ({_in(recipe_ids)})", recipe_ids
+    ).fetchall() if recipe_ids else []
+    # An ingredient row written after its recipe was deleted logs an upsert
+    found = {r["id"] for r in recipes}
+    deleted_recipes += [recipe_id for recipe_id in recipe_ids if recipe_id not in found]
+
+    item_ids, deleted_items = ids["grocery"]
+    items = conn.execute(
+        f"""
+        SELECT id, ingredient_name, quantity, unit, checked FROM grocery_items
+        WHERE user_id = ? AND id IN ({_in(item_ids)})
+        """,
+        [user_id, *item_ids],
+    ).fetchall() if item_ids else []
+
+    added, removed = ids["favorite"]
+    return {
+        "cursor": log[-1]["seq"] if log else since,
+        "reset": False,
+        "more": more,
+        "recipes": {"upserted": [_recipe_out(r) for r in recipes], "deleted": deleted_recipes},
+        "favorites": {"added": added, "removed": removed},
+        "grocery": {"upserted": [_grocery_out(r) for r in items], "deleted": deleted_items},
+    }
@@ -0,0 +1,374 @@
+# -----------------------------------------
+# Ovens Lovin's – SQLite connection layer
+# -----------------------------------------
+#
+# One place that owns every connection to recipes.db.
+#
+#   * Readers come from a bounded pool and are reused across requests.
+#   * All writes go through a single dedicated writer connection, guarded
+#     by a lock, so writers queue in-process instead of fighting over the
+#     SQLite file lock.
+#   * The database runs in WAL mode, so readers never block on the writer
+#     (and the writer never blocks readers).
+#
+# Usage:
+#
+#     with get_conn() as conn:            # read-only, pooled
+#         rows = conn.execute("SELECT ...").fetchall()
+#
+#     with get_write_conn() as conn:      # commits on success, rolls back on error
+#         conn.execute("INSERT ...")
+#
+# The old `conn = get_conn(); ...; conn.close()` style still works: close()
+# hands the connection back to the pool instead of closing it.
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+DB_PATH = Path(os.getenv("RECIPES_DB_PATH") or Path(__file__).parent / "recipes.db")
+
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+BUSY_TIMEOUT_MS = 5000
+
+# Applied to every connection. WAL itself is persistent and is switched on
+# once by the writer (see _open_writer).
+PRAGMAS = (
+    f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}",
+    "PRAGMA synchronous = NORMAL",       # safe with WAL, skips an fsync per commit
+    "PRAGMA cache_size = -16000",        # ~16 MB page cache per connection
+    "PRAGMA mmap_size = 134217728",      # 128 MB memory-mapped reads
+    "PRAGMA temp_store = MEMORY",
+)
+
+
+# Python functions exposed to SQL on every connection, e.g. grocery_quantity().
+# Register them before the first connection is opened.
+SQL_FUNCTIONS = {}
+
+
+def register_function(name: str, num_params: int, func):
+    SQL_FUNCTIONS[name] = (num_params, func)
+
+
+# Optional statement observer (metrics.py), called as
+#   observer(sql, params, seconds, total_seconds, new_statement)
+# for every execute / fetch on a pooled connection. None = no timing at all.
+_statement_observer = None
+
+
+def set_statement_observer(observer):
+    global _statement_observer
+    _statement_observer = observer
+
+
+class PoolTimeout(RuntimeError):
+    """Raised when no connection becomes free within POOL_TIMEOUT seconds."""
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    # Connections are handed between FastAPI's worker threads, never used
+    # by two threads at once, so the same-thread check can be relaxed.
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=BUSY_TIMEOUT_MS / 1000)
+    conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    for name, (num_params, func) in SQL_FUNCTIONS.items():
+        conn.create_function(name, num_params, func, deterministic=True)
+    return conn
+
+
+class TimedCursor:
+    """
+    sqlite3.Cursor proxy that reports time spent in execute and in fetching
+    rows (SQLite does most of a SELECT's work lazily, on fetch).
+    """
+
+    __slots__ = ("_cursor", "_sql", "_params", "_elapsed")
+
+    def __init__(self, cursor: sqlite3.Cursor):
+        self._cursor = cursor
+        self._sql = None
+        self._params = ()
+        self._elapsed = 0.0
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def _timed(self, new_statement, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            seconds = time.perf_counter() - start
+            self._elapsed += seconds
+            observer = _statement_observer
+            if observer is not None:
+                observer(self._sql, self._params, seconds, self._elapsed, new_statement)
+
+    def _run(self, sql, params, method, *args):
+        # params is only for the observer; None for executemany / scripts
+        self._sql, self._params, self._elapsed = sql, params, 0.0
+        self._timed(True, method, *args)
+        return self
+
+    def execute(self, sql, params=()):
+        return self._run(sql, params, self._cursor.execute, sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self._run(sql, None, self._cursor.executemany, sql, seq_of_params)
+
+    def executescript(self, script):
+        return self._run(script, None, self._cursor.executescript, script)
+
+    def fetchone(self):
+        return self._timed(False, self._cursor.fetchone)
+
+    def fetchmany(self, *args):
+        return self._timed(False, self._cursor.fetchmany, *args)
+
+    def fetchall(self):
+        return self._timed(False, self._cursor.fetchall)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self._timed(False, self._cursor.__next__)
+
+
+class PooledConnection:
+    """
+    Thin wrapper around a pooled sqlite3.Connection.
+
+    Behaves like the underlying connection (execute, cursor, commit, ...),
+    but close() returns it to its pool. Used as a context manager it
+    commits on success, rolls back on error and then releases itself.
+    """
+
+    __slots__ = ("_conn", "_release", "_released")
+
+    def __init__(self, conn: sqlite3.Connection, release):
+        self._conn = conn
+        self._release = release
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    @property
+    def raw(self) -> sqlite3.Connection:
+        return self._conn
+
+    # With a statement observer set, statements go through TimedCursor;
+    # otherwise straight to sqlite3.
+
+    def cursor(self):
+        cursor = self._conn.cursor()
+        return cursor if _statement_observer is None else TimedCursor(cursor)
+
+    def execute(self, sql, params=()):
+        if _statement_observer is None:
+            return self._conn.execute(sql, params)
+        return TimedCursor(self._conn.cursor()).execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        if _statement_observer is None:
+            return self._conn.executemany(sql, seq_of_params)
+        return TimedCursor(self._conn.cursor()).executemany(sql, seq_of_params)
+
+    def executescript(self, script):
+        if _statement_observer is None:
+            return self._conn.executescript(script)
+        return TimedCursor(self._conn.cursor()).executescript(script)
+
+    def close(self):
+        if self._released:
+            return
+        self._released = True
+        if self._conn.in_transaction:
+            self._conn.rollback()
+        self._release(self._conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self._conn.commit()
+            elif self._conn.in_transaction:
+                self._conn.rollback()
+        finally:
+            self.close()
+        return False
+
+
+class ConnectionPool:
+    """
+    Bounded pool of read connections plus one writer connection for a
+    single database file.
+    """
+
+    def __init__(self, path: Path, size: int = POOL_SIZE, timeout: float = POOL_TIMEOUT):
+        self.path = Path(path)
+        self.size = size
+        self.timeout = timeout
+
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._lock = threading.Lock()
+        self._created = 0
+
+        self._writer = None
+        self._writer_lock = threading.Lock()
+
+        self._stats = {
+            "reads": 0,
+            "writes": 0,
+            "read_wait_seconds": 0.0,
+            "write_wait_seconds": 0.0,
+            "timeouts": 0,
+        }
+
+    # ---- readers ----
+
+    def acquire(self) -> PooledConnection:
+        start = time.perf_counter()
+        conn = None
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                if self._created < self.size:
+                    self._created += 1
+                    conn = self._open_reader()
+
+        if conn is None:
+            try:
+                conn = self._idle.get(timeout=self.timeout)
+            except queue.Empty:
+                with self._lock:
+                    self._stats["timeouts"] += 1
+                raise PoolTimeout(f"No database connection free after {self.timeout}s")
+
+        with self._lock:
+            self._stats["reads"] += 1
+            self._stats["read_wait_seconds"] += time.perf_counter() - start
+        return PooledConnection(conn, self._idle.put_nowait)
+
+    def _open_reader(self) -> sqlite3.Connection:
+        try:
+            conn = _connect(self.path)
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+        # Readers must never take the write lock by accident.
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    # ---- writer ----
+
+    def acquire_writer(self) -> PooledConnection:
+        start = time.perf_counter()
+        if not self._writer_lock.acquire(timeout=self.timeout):
+            with self._lock:
+                self._stats["timeouts"] += 1
+            raise PoolTimeout(f"Writer connection busy for more than {self.timeout}s")
+
+        try:
+            if self._writer is None:
+                self._writer = self._open_writer()
+        except Exception:
+            self._writer_lock.release()
+            raise
+
+        with self._lock:
+            self._stats["writes"] += 1
+            self._stats["write_wait_seconds"] += time.perf_counter() - start
+        return PooledConnection(self._writer, lambda _conn: self._writer_lock.release())
+
+    def _open_writer(self) -> sqlite3.Connection:
+        conn = _connect(self.path)
+        conn.execute("PRAGMA journal_mode = WAL")
+        # The implicit transaction sqlite3 opens before the first write
+        # takes the write lock up front, so a request's statements run as
+        # one transaction that can't fail half-way on SQLITE_BUSY.
+        conn.isolation_level = "IMMEDIATE"
+        return conn
+
+    # ---- housekeeping ----
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            created = self._created
+        idle = self._idle.qsize()
+        stats.update(
+            {
+                "database": str(self.path),
+                "pool_size": self.size,
+                "readers_open": created,
+                "readers_idle": idle,
+                "readers_in_use": created - idle,
+                "writer_busy": self._writer_lock.locked(),
+            }
+        )
+        return stats
+
+    def close_all(self):
+        with self._lock:
+            while True:
+                try:
+                    self._idle.get_nowait().close()
+                except queue.Empty:
+                    break
+            self._created = 0
+        with self._writer_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+
+# -----------------------------------------
+# MODULE-LEVEL DEFAULT POOL
+# -----------------------------------------
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path=None) -> ConnectionPool:
+    path = Path(path or DB_PATH)
+    key = str(path.resolve())
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = ConnectionPool(path)
+    return pool
+
+
+def get_conn(path=None) -> PooledConnection:
+    """Pooled read-only connection."""
+    return get_pool(path).acquire()
+
+
+def get_write_conn(path=None) -> PooledConnection:
+    """The (single) writer connection. Hold it only for the write itself."""
+    return get_pool(path).acquire_writer()
+
+
+def pool_stats() -> list:
+    return [pool.stats() for pool in list(_pools.values())]
+
+
+def close_all():
+    for pool in list(_pools.values()):
+        pool.close_all()
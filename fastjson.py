@@ -0,0 +1,27 @@
+# -----------------------------------------
+# Ovens Lovin's – JSON encoding for hot responses
+# -----------------------------------------
+#
+# Endpoints that return many rows build plain dicts/lists straight from
+# sqlite3 rows and send them through main.FastJSONResponse, skipping
+# per-row Pydantic models and FastAPI's jsonable_encoder pass. Their
+# OpenAPI schema still comes from response_model / the route declaration.
+# No web framework imports here: catalog_cache and recipe_detail use
+# dumps() and are imported by the CLI tools too.
+#
+# orjson is used when installed (several times faster); otherwise the
+# stdlib encoder with the same settings as FastAPI's JSONResponse.
+
+import json
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def dumps(value) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
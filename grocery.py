@@ -0,0 +1,613 @@
+# -----------------------------------------
+# Ovens Lovin's – grocery list consolidation
+# -----------------------------------------
+#
+# grocery_items holds one row per (user, canonical ingredient, kind of
+# amount) – it *is* the aggregated list, so GET /grocery/list is a single
+# indexed scan. Adding "2 cloves garlic" and then "3 garlic cloves, minced"
+# gives one "garlic – 5 clove" row, and 1 tbsp + 1/2 cup of olive oil give
+# one row in cups.
+#
+#   grocery_items.canonical_id / dimension / base_amount   merge key + total
+#   grocery_item_sources (item_id, recipe_id, base_amount)  who added what
+#
+# base_amount is in the dimension's base unit (ml for volume, g for mass,
+# otherwise the unit itself: cloves, cans, plain counts). recipe_id 0 in
+# grocery_item_sources is "added by hand".
+#
+# A line with no amount ("olive oil", "salt, to taste") has nothing to add
+# up, so it joins whatever row the ingredient already has instead of
+# starting a second one; a row that so far only has amount-less sources
+# takes on the dimension of the first quantified line added to it. An
+# item's total is always the sum of its sources' amounts, NULL (no
+# quantity shown) when none of them has one.
+
+from db import register_function
+from ingredient_parser import format_quantity
+from ingredients import canonical_ids, parse_link
+
+
+MANUAL = 0
+
+# unit -> (dimension, size of one unit in the dimension's base unit)
+UNITS = {
+    "tsp": ("volume", 4.92892),
+    "tbsp": ("volume", 14.7868),
+    "cup": ("volume", 236.588),
+    "pint": ("volume", 473.176),
+    "quart": ("volume", 946.353),
+    "gallon": ("volume", 3785.41),
+    "ml": ("volume", 1.0),
+    "l": ("volume", 1000.0),
+    "g": ("mass", 1.0),
+    "kg": ("mass", 1000.0),
+    "oz": ("mass", 28.3495),
+    "lb": ("mass", 453.592),
+}
+
+METRIC_UNITS = {"ml", "l", "g", "kg"}
+
+# Best-fit display units, largest first: (unit, smallest amount shown in it)
+DISPLAY_UNITS = {
+    ("volume", False): [("cup", 59.147), ("tbsp", 14.7868), ("tsp", 0.0)],
+    ("volume", True): [("l", 1000.0), ("ml", 0.0)],
+    ("mass", False): [("lb", 453.592), ("oz", 0.0)],
+    ("mass", True): [("kg", 1000.0), ("g", 0.0)],
+}
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS grocery_item_sources (
+        item_id INTEGER NOT NULL,
+        recipe_id INTEGER NOT NULL,
+        base_amount REAL,
+        PRIMARY KEY (item_id, recipe_id)
+    )
+    """,
+]
+
+NEW_COLUMNS = [
+    ("canonical_id", "INTEGER"),
+    ("dimension", "TEXT"),
+    ("base_amount", "REAL"),
+]
+
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_grocery_items_user ON grocery_items (user_id, id)",
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_grocery_items_merge
+    ON grocery_items (user_id, canonical_id, dimension)
+    WHERE canonical_id IS NOT NULL
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_grocery_item_sources_recipe ON grocery_item_sources (recipe_id)",
+]
+
+
+def ensure_schema(conn):
+    for statement in SCHEMA:
+        conn.execute(statement)
+    existing = {row["name"] for row in conn.execute("PRAGMA table_info(grocery_items)")}
+    for column, kind in NEW_COLUMNS:
+        if column not in existing:
+            conn.execute(f"ALTER TABLE grocery_items ADD COLUMN {column} {kind}")
+    for statement in INDEXES:
+        conn.execute(statement)
+
+
+# -----------------------------------------
+# UNITS
+# -----------------------------------------
+
+def to_base(amount, unit):
+    """(dimension, amount in base unit). Unknown units are their own dimension."""
+    if unit in UNITS:
+        dimension, factor = UNITS[unit]
+        return dimension, (amount * factor if amount is not None else None)
+    return unit or "count", amount
+
+
+def display_amount(base_amount, dimension, metric=False):
+    """(quantity text, unit) for a stored total, e.g. 295.7 ml -> ("1 1/4", "cup")."""
+    if base_amount is None:
+        return None, (None if dimension == "count" else dimension)
+    choices = DISPLAY_UNITS.get((dimension, metric))
+    if not choices:
+        return format_quantity(base_amount), (None if dimension == "count" else dimension)
+    for unit, threshold in choices:
+        if base_amount >= threshold:
+            return format_quantity(base_amount / UNITS[unit][1]), unit
+    unit = choices[-1][0]
+    return format_quantity(base_amount / UNITS[unit][1]), unit
+
+
+def _display_for_row(base_amount, dimension, current_unit, index):
+    # Keep showing a row in the measuring system it is already in
+    metric = current_unit in METRIC_UNITS
+    return display_amount(base_amount, dimension, metric)[index]
+
+
+# Used by add_recipe() to refresh display text inside SQL
+register_function("grocery_quantity", 3, lambda b, d, u: _display_for_row(b, d, u, 0))
+register_function("grocery_unit", 3, lambda b, d, u: _display_for_row(b, d, u, 1))
+
+# std_unit -> dimension / base-unit factor, as SQL over recipe_ingredients
+_DIMENSION_SQL = (
+    "CASE ri.std_unit "
+    + " ".join(f"WHEN '{unit}' THEN '{dim}'" for unit, (dim, _) in UNITS.items())
+    + " ELSE COALESCE(ri.std_unit, 'count') END"
+)
+_BASE_AMOUNT_SQL = (
+    "COALESCE(ri.amount_max, ri.amount) * CASE ri.std_unit "
+    + " ".join(f"WHEN '{unit}' THEN {factor}" for unit, (_, factor) in UNITS.items())
+    + " ELSE 1.0 END"
+)
+
+
+# -----------------------------------------
+# WRITES
+# -----------------------------------------
+
+# An amount-less line's row: the one in its own dimension, else the oldest
+_TARGET_SQL = """
+    SELECT coalesce(
+        (SELECT g.id FROM grocery_items g
+         WHERE g.user_id = {user} AND g.canonical_id = {canonical} AND g.dimension = {dimension}),
+        (SELECT min(g.id) FROM grocery_items g
+         WHERE g.user_id = {user} AND g.canonical_id = {canonical})
+    ) AS id
+"""
+
+# A row with no quantified source yet takes the dimension of the first
+# quantified line (only when it is the ingredient's sole row, so the merge
+# index can't conflict)
+_ADOPT_SQL = """
+    UPDATE grocery_items SET dimension = {dimension}
+    WHERE user_id = {user} AND canonical_id IN ({canonical}) AND base_amount IS NULL
+      AND (SELECT count(*) FROM grocery_items g
+           WHERE g.user_id = grocery_items.user_id AND g.canonical_id = grocery_items.canonical_id) = 1
+"""
+
+
+def _merge(conn, user_id, recipe_id, name, canonical_id, dimension, base_amount, metric,
+           quantity=None, unit=None):
+    """Add one contribution to the user's list; returns the grocery item id."""
+    target = None
+    if canonical_id is not None and base_amount is None:
+        target = conn.execute(
+            _TARGET_SQL.format(user=":user", canonical=":canonical", dimension=":dimension"),
+            {"user": user_id, "canonical": canonical_id, "dimension": dimension},
+        ).fetchone()["id"]
+
+    if canonical_id is None:
+        # Nothing to merge on ("For serving"): keep it as typed
+        cur = conn.execute(
+            """
+            INSERT INTO grocery_items (ingredient_name, quantity, unit, user_id)
+            VALUES (?, ?, ?, ?)
+            """,
+            (name, quantity, unit, user_id),
+        )
+        item_id = cur.lastrowid
+    elif target is not None:
+        # No amount to add: the ingredient is already on the list
+        item_id = target
+        conn.execute("UPDATE grocery_items SET checked = 0 WHERE id = ?", (item_id,))
+    else:
+        if base_amount is not None:
+            conn.execute(
+                _ADOPT_SQL.format(user="?", canonical="?", dimension="?"),
+                (dimension, user_id, canonical_id),
+            )
+        quantity, unit = (quantity, unit) if base_amount is None else display_amount(base_amount, dimension, metric)
+        row = conn.execute(
+            """
+            INSERT INTO grocery_items
+                (ingredient_name, quantity, unit, user_id, checked,
+                 canonical_id, dimension, base_amount)
+            VALUES (?, ?, ?, ?, 0, ?, ?, ?)
+            ON CONFLICT (user_id, canonical_id, dimension) WHERE canonical_id IS NOT NULL
+            DO UPDATE SET
+                base_amount = CASE
+                    WHEN base_amount IS NULL THEN excluded.base_amount
+                    WHEN excluded.base_amount IS NULL THEN base_amount
+                    ELSE base_amount + excluded.base_amount
+                END,
+                checked = 0
+            RETURNING id, base_amount, quantity, unit
+            """,
+            (name, quantity, unit, user_id, canonical_id, dimension, base_amount),
+        ).fetchone()
+        item_id = row["id"]
+
+        if row["base_amount"] is not None:
+            # Show the (possibly merged) total, staying in the measuring
+            # system the row was already shown in
+            if row["unit"] in UNITS:
+                metric = row["unit"] in METRIC_UNITS
+            shown = display_amount(row["base_amount"], dimension, metric)
+            if shown != (row["quantity"], row["unit"]):
+                conn.execute(
+                    "UPDATE grocery_items SET quantity = ?, unit = ? WHERE id = ?",
+                    (*shown, item_id),
+                )
+
+    conn.execute(
+        """
+        INSERT INTO grocery_item_sources (item_id, recipe_id, base_amount)
+        VALUES (?, ?, ?)
+        ON CONFLICT (item_id, recipe_id) DO UPDATE SET
+            base_amount = CASE
+                WHEN base_amount IS NULL THEN excluded.base_amount
+                WHEN excluded.base_amount IS NULL THEN base_amount
+                ELSE base_amount + excluded.base_amount
+            END
+        """,
+        (item_id, recipe_id, base_amount),
+    )
+    return item_id
+
+
+def add_manual_item(conn, user_id, name, quantity=None, unit=None) -> int:
+    """An item typed on the grocery page; merges like recipe ingredients do."""
+    parsed = parse_link(name, quantity, unit)
+    canonical_id = canonical_ids(conn, [parsed.name]).get(parsed.name)
+    amount = parsed.quantity_max if parsed.quantity_max is not None else parsed.quantity
+    dimension, base_amount = to_base(amount, parsed.unit)
+    return _merge(
+        conn, user_id, MANUAL,
+        parsed.name or name, canonical_id, dimension, base_amount,
+        metric=parsed.unit in METRIC_UNITS,
+        quantity=quantity, unit=unit,
+    )
+
+
+def add_recipe(conn, user_id, recipe_id) -> int:
+    """
+    Merge every ingredient of a recipe into the user's list. Returns the
+    number of ingredient lines added.
+
+    Set-based: a fixed handful of statements (adopt, upsert, insert,
+    provenance, display text) whether the recipe has 4 ingredients or 40.
+    """
+    params = {"user": user_id, "recipe": recipe_id}
+    contributions = f"""
+        SELECT ri.canonical_id, c.name AS canonical, i.name, ri.quantity, ri.unit, ri.std_unit,
+               {_DIMENSION_SQL} AS dimension,
+               {_BASE_AMOUNT_SQL} AS base_amount
+        FROM recipe_ingredients ri
+        JOIN ingredients i ON i.id = ri.ingredient_id
+        LEFT JOIN canonical_ingredients c ON c.id = ri.canonical_id
+        WHERE ri.recipe_id = :recipe
+    """
+
+    # 1) Rows that only had amount-less sources take the dimension of this
+    #    recipe's quantified line for the same ingredient
+    conn.execute(
+        _ADOPT_SQL.format(
+            user=":user",
+            canonical=f"SELECT canonical_id FROM ({contributions}) WHERE base_amount IS NOT NULL",
+            dimension=f"""(
+                SELECT min(x.dimension) FROM ({contributions}) x
+                WHERE x.canonical_id = grocery_items.canonical_id AND x.base_amount IS NOT NULL
+            )""",
+        ),
+        params,
+    )
+
+    # 2) Quantified ingredients: upsert into the user's rows. A new row's
+    #    unit starts out as the normalized unit so step 5 knows which
+    #    measuring system to display in.
+    conn.execute(
+        f"""
+        INSERT INTO grocery_items
+            (ingredient_name, quantity, unit, user_id, checked,
+             canonical_id, dimension, base_amount)
+        SELECT canonical, quantity, std_unit, :user, 0, canonical_id, dimension, base_amount
+        FROM ({contributions})
+        WHERE canonical_id IS NOT NULL AND base_amount IS NOT NULL
+        ON CONFLICT (user_id, canonical_id, dimension) WHERE canonical_id IS NOT NULL
+        DO UPDATE SET
+            base_amount = coalesce(base_amount, 0) + excluded.base_amount,
+            checked = 0
+        """,
+        params,
+    )
+
+    # 3) Amount-less ingredients the list doesn't have yet: one row each,
+    #    showing what was typed. The others join their existing row in step 4.
+    conn.execute(
+        f"""
+        INSERT INTO grocery_items
+            (ingredient_name, quantity, unit, user_id, checked,
+             canonical_id, dimension, base_amount)
+        SELECT canonical, quantity, unit, :user, 0, canonical_id, min(dimension), NULL
+        FROM ({contributions}) x
+        WHERE canonical_id IS NOT NULL AND base_amount IS NULL
+          AND NOT EXISTS (
+              SELECT 1 FROM grocery_items g
+              WHERE g.user_id = :user AND g.canonical_id = x.canonical_id
+          )
+        GROUP BY canonical_id
+        """,
+        params,
+    )
+
+    # Nothing to merge on ("For serving"): plain rows, as written
+    loose_ids = [
+        row["id"]
+        for row in conn.execute(
+            f"""
+            INSERT INTO grocery_items (ingredient_name, quantity, unit, user_id)
+            SELECT name, quantity, unit, :user
+            FROM ({contributions})
+            WHERE canonical_id IS NULL
+            RETURNING id
+            """,
+            params,
+        )
+    ]
+
+    # 4) Provenance
+    target = _TARGET_SQL.format(user=":user", canonical="x.canonical_id", dimension="x.dimension")
+    conn.execute(
+        f"""
+        INSERT INTO grocery_item_sources (item_id, recipe_id, base_amount)
+        SELECT item_id, :recipe, sum(base_amount)
+        FROM (
+            SELECT ({target}) AS item_id, x.base_amount
+            FROM ({contributions}) x
+            WHERE x.canonical_id IS NOT NULL
+        )
+        GROUP BY item_id
+        ON CONFLICT (item_id, recipe_id) DO UPDATE SET
+            base_amount = CASE
+                WHEN base_amount IS NULL THEN excluded.base_amount
+                WHEN excluded.base_amount IS NULL THEN base_amount
+                ELSE base_amount + excluded.base_amount
+            END
+        """,
+        params,
+    )
+    if loose_ids:
+        conn.executemany(
+            "INSERT OR IGNORE INTO grocery_item_sources (item_id, recipe_id, base_amount) VALUES (?, ?, NULL)",
+            [(item_id, recipe_id) for item_id in loose_ids],
+        )
+
+    # 5) Every row this recipe touched is back on the list, showing its total
+    conn.execute(
+        """
+        UPDATE grocery_items
+        SET checked = 0,
+            quantity = CASE WHEN base_amount IS NULL THEN quantity
+                            ELSE grocery_quantity(base_amount, dimension, unit) END,
+            unit = CASE WHEN base_amount IS NULL THEN unit
+                        ELSE grocery_unit(base_amount, dimension, unit) END
+        WHERE user_id = :user
+          AND EXISTS (
+              SELECT 1 FROM grocery_item_sources s
+              WHERE s.item_id = grocery_items.id AND s.recipe_id = :recipe
+          )
+        """,
+        params,
+    )
+    return conn.execute(
+        "SELECT count(*) FROM recipe_ingredients WHERE recipe_id = ?", (recipe_id,)
+    ).fetchone()[0]
+
+
+def remove_recipe(conn, user_id, recipe_id) -> int:
+    """
+    Take a recipe's contribution back off the user's list. Items nothing
+    else asked for are deleted; the rest go back to the total of their
+    remaining sources, with no quantity shown if none of those has one.
+    Returns the number of items touched.
+    """
+    touched = [
+        row[0]
+        for row in conn.execute(
+            """
+            DELETE FROM grocery_item_sources
+            WHERE recipe_id = ? AND item_id IN (SELECT id FROM grocery_items WHERE user_id = ?)
+            RETURNING item_id
+            """,
+            (recipe_id, user_id),
+        ).fetchall()
+    ]
+    if not touched:
+        return 0
+    ids = ", ".join("?" for _ in touched)
+
+    conn.execute(
+        f"""
+        DELETE FROM grocery_items
+        WHERE id IN ({ids})
+          AND NOT EXISTS (SELECT 1 FROM grocery_item_sources s WHERE s.item_id = grocery_items.id)
+        """,
+        touched,
+    )
+    # Rows that never had a total keep showing what was typed
+    conn.execute(
+        f"""
+        UPDATE grocery_items
+        SET base_amount = r.total,
+            quantity = CASE WHEN r.total IS NULL THEN NULL
+                            ELSE grocery_quantity(r.total, grocery_items.dimension, grocery_items.unit) END,
+            unit = CASE WHEN r.total IS NULL THEN NULL
+                        ELSE grocery_unit(r.total, grocery_items.dimension, grocery_items.unit) END
+        FROM (
+            SELECT item_id, sum(base_amount) AS total FROM grocery_item_sources
+            WHERE item_id IN ({ids})
+            GROUP BY item_id
+        ) r
+        WHERE grocery_items.id = r.item_id AND grocery_items.base_amount IS NOT NULL
+        """,
+        touched,
+    )
+    return len(touched)
+
+
+def merge_amountless(conn) -> int:
+    """
+    Fold rows with no amount into a quantified row for the same ingredient
+    (lists built before amount-less lines merged). Returns rows removed.
+    """
+    conn.execute(
+        "CREATE TEMP TABLE IF NOT EXISTS grocery_moves (old_id INTEGER PRIMARY KEY, new_id INTEGER NOT NULL)"
+    )
+    conn.execute("DELETE FROM temp.grocery_moves")
+    conn.execute(
+        """
+        INSERT INTO temp.grocery_moves (old_id, new_id)
+        SELECT old_id, new_id FROM (
+            SELECT g.id AS old_id, (
+                SELECT min(k.id) FROM grocery_items k
+                WHERE k.user_id IS g.user_id AND k.canonical_id = g.canonical_id
+                  AND k.base_amount IS NOT NULL
+            ) AS new_id
+            FROM grocery_items g
+            WHERE g.canonical_id IS NOT NULL AND g.base_amount IS NULL
+        )
+        WHERE new_id IS NOT NULL
+        """
+    )
+    conn.execute(
+        """
+        INSERT OR IGNORE INTO grocery_item_sources (item_id, recipe_id, base_amount)
+        SELECT m.new_id, s.recipe_id, NULL
+        FROM grocery_item_sources s
+        JOIN temp.grocery_moves m ON m.old_id = s.item_id
+        """
+    )
+    conn.execute(
+        """
+        UPDATE grocery_items SET checked = 0
+        WHERE id IN (
+            SELECT m.new_id FROM temp.grocery_moves m
+            JOIN grocery_items o ON o.id = m.old_id
+            WHERE o.checked = 0
+        )
+        """
+    )
+    conn.execute("DELETE FROM grocery_item_sources WHERE item_id IN (SELECT old_id FROM temp.grocery_moves)")
+    return conn.execute("DELETE FROM grocery_items WHERE id IN (SELECT old_id FROM temp.grocery_moves)").rowcount
+
+
+def set_checked(conn, user_id, item_ids, checked=True) -> int:
+    cur = conn.executemany(
+        "UPDATE grocery_items SET checked = ? WHERE id = ? AND user_id = ?",
+        [(1 if checked else 0, item_id, user_id) for item_id in item_ids],
+    )
+    return cur.rowcount
+
+
+def delete_items(conn, user_id, item_ids) -> int:
+    item_ids = list(item_ids)
+    # Sources first, while we can still see which items are this user's
+    conn.executemany(
+        """
+        DELETE FROM grocery_item_sources
+        WHERE item_id = ? AND item_id IN (SELECT id FROM grocery_items WHERE user_id = ?)
+        """,
+        [(item_id, user_id) for item_id in item_ids],
+    )
+    cur = conn.executemany(
+        "DELETE FROM grocery_items WHERE id = ? AND user_id = ?",
+        [(item_id, user_id) for item_id in item_ids],
+    )
+    return cur.rowcount
+
+
+def delete_item(conn, user_id, item_id) -> bool:
+    return delete_items(conn, user_id, [item_id]) > 0
+
+
+def clear_checked(conn, user_id) -> int:
+    conn.execute(
+        """
+        DELETE FROM grocery_item_sources
+        WHERE item_id IN (SELECT id FROM grocery_items WHERE user_id = ? AND checked = 1)
+        """,
+        (user_id,),
+    )
+    cur = conn.execute(
+        "DELETE FROM grocery_items WHERE user_id = ? AND checked = 1",
+        (user_id,),
+    )
+    return cur.rowcount
+
+
+def apply_batch(conn, user_id, ops) -> dict:
+    """
+    Apply a list of grocery operations in order, inside the caller's
+    transaction. Runs of the same kind of id-based operation ("check",
+    "check", "check") go to SQLite as one executemany.
+
+    Each op is a dict with "op" plus:
+        add            ingredient_name, quantity, unit
+        add_recipes    recipe_ids
+        check/uncheck  id
+        delete         id
+        clear_checked  -
+    Returns per-operation counts.
+    """
+    counts = {"added": 0, "checked": 0, "unchecked": 0, "deleted": 0, "recipes_added": 0}
+    run_op, run_ids = None, []
+
+    def flush():
+        if not run_ids:
+            return
+        if run_op == "check":
+            counts["checked"] += set_checked(conn, user_id, run_ids, True)
+        elif run_op == "uncheck":
+            counts["unchecked"] += set_checked(conn, user_id, run_ids, False)
+        elif run_op == "delete":
+            counts["deleted"] += delete_items(conn, user_id, run_ids)
+        run_ids.clear()
+
+    for op in ops:
+        kind = op["op"]
+        if kind in ("check", "uncheck", "delete"):
+            if kind != run_op:
+                flush()
+                run_op = kind
+            run_ids.append(op["id"])
+            continue
+
+        flush()
+        run_op = None
+        if kind == "add":
+            add_manual_item(conn, user_id, op["ingredient_name"], op.get("quantity"), op.get("unit"))
+            counts["added"] += 1
+        elif kind == "add_recipes" and op["recipe_ids"]:
+            existing = {
+                row["id"]
+                for row in conn.execute(
+                    f"SELECT id FROM recipes WHERE id IN ({', '.join('?' * len(op['recipe_ids']))})",
+                    op["recipe_ids"],
+                )
+            }
+            for recipe_id in op["recipe_ids"]:
+                if recipe_id in existing:
+                    add_recipe(conn, user_id, recipe_id)
+                    counts["recipes_added"] += 1
+        elif kind == "clear_checked":
+            counts["deleted"] += clear_checked(conn, user_id)
+    flush()
+    return counts
+
+
+# -----------------------------------------
+# READS
+# -----------------------------------------
+
+def list_items(conn, user_id) -> list:
+    return conn.execute(
+        """
+        SELECT id, ingredient_name, quantity, unit, checked
+        FROM grocery_items
+        WHERE user_id = ?
+        ORDER BY id DESC
+        """,
+        (user_id,),
+    ).fetchall()
@@ -0,0 +1,219 @@
+# -----------------------------------------
+# Ovens Lovin's – responsive photo variants
+# -----------------------------------------
+#
+# The upload pipeline (uploads.py) runs every photo through make_variants()
+# before storing it: one WebP and one JPEG per width in WIDTHS (never wider
+# than the original), EXIF orientation applied and then all metadata
+# dropped (EXIF / GPS, XMP, comments; the ICC profile is kept so colours
+# survive). The stored variants end up in recipe_images.variants as
+#
+#   [{"url": ..., "width": 320, "height": 240, "type": "image/webp"}, ...]
+#
+# and the image endpoints turn them into <picture>-ready srcset strings
+# (recipe_detail.py).
+#
+# Resizing is CPU-bound, so it runs in a process pool (IMAGE_PROCESSES),
+# never in the API worker threads or the upload threads. This module is
+# imported by the pool's child processes: keep it free of app imports.
+#
+# Only JPEG, PNG, WebP and GIF are accepted, recognised by their leading
+# bytes (sniff()) whatever the file is called, so nothing else is ever
+# stored or served under /uploads.
+#
+# The stored original is never the uploaded file: make_variants() also
+# writes a full-size re-encode with the same metadata dropped. Pillow is
+# optional. Without it there are no variants, and strip_metadata() copies
+# the upload minus its EXIF / XMP / IPTC / comment blocks instead (GIFs are
+# copied as they are; they carry no EXIF). Pillow (and the process pool
+# machinery) is only imported when the first photo is resized, so importing
+# the app stays cheap.
+
+import importlib.util
+import os
+import struct
+import threading
+from pathlib import Path
+
+WIDTHS = (320, 640, 1280)
+FORMATS = (
+    # (mime type, Pillow format, extension, save options)
+    ("image/webp", "WEBP", "webp", {"quality": 80, "method": 4}),
+    ("image/jpeg", "JPEG", "jpg", {"quality": 82, "optimize": True, "progressive": True}),
+)
+IMAGE_PROCESSES = int(os.getenv("IMAGE_PROCESSES", str(min(2, os.cpu_count() or 1))))
+
+# Decompression-bomb guard: ~50 megapixels is plenty for a phone photo
+MAX_PIXELS = 50_000_000
+
+
+# (extension, leading bytes); WebP is RIFF....WEBP
+IMAGE_TYPES = (
+    ("jpg", b"\xff\xd8\xff"),
+    ("png", b"\x89PNG\r\n\x1a\n"),
+    ("gif", b"GIF87a"),
+    ("gif", b"GIF89a"),
+)
+
+
+class NotAnImage(ValueError):
+    """The upload could not be decoded as an image."""
+
+
+def available() -> bool:
+    return importlib.util.find_spec("PIL") is not None
+
+
+def sniff(path) -> str:
+    """The extension for the image in `path`, from its content. Raises NotAnImage."""
+    with open(path, "rb") as f:
+        head = f.read(12)
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    for ext, magic in IMAGE_TYPES:
+        if head.startswith(magic):
+            return ext
+    raise NotAnImage("Only JPEG, PNG, WebP and GIF images are accepted")
+
+
+# JPEG APP1 (EXIF, XMP), APP13 (IPTC) and COM segments; APP2 (ICC) stays
+_JPEG_DROP = {0xE1, 0xED, 0xFE}
+_PNG_DROP = {b"eXIf", b"tEXt", b"zTXt", b"iTXt", b"tIME"}
+_WEBP_DROP = {b"EXIF", b"XMP "}
+
+
+def _strip_jpeg(data: bytes) -> bytes:
+    out, pos = [data[:2]], 2
+    while pos < len(data):
+        if data[pos] != 0xFF:
+            raise NotAnImage("Not a readable image: bad JPEG marker")
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            # Fill byte
+            pos += 1
+            continue
+        if marker == 0xDA:
+            # Start of scan: entropy-coded data to the end
+            out.append(data[pos:])
+            break
+        (length,) = struct.unpack(">H", data[pos + 2:pos + 4])
+        if marker not in _JPEG_DROP:
+            out.append(data[pos:pos + 2 + length])
+        pos += 2 + length
+    return b"".join(out)
+
+
+def _strip_png(data: bytes) -> bytes:
+    out, pos = [data[:8]], 8
+    while pos < len(data):
+        (length,) = struct.unpack(">I", data[pos:pos + 4])
+        end = pos + 12 + length
+        if data[pos + 4:pos + 8] not in _PNG_DROP:
+            out.append(data[pos:end])
+        pos = end
+    return b"".join(out)
+
+
+def _strip_webp(data: bytes) -> bytes:
+    out, pos = [], 12
+    while pos < len(data):
+        fourcc = data[pos:pos + 4]
+        (length,) = struct.unpack("<I", data[pos + 4:pos + 8])
+        chunk = data[pos:pos + 8 + length + (length & 1)]
+        if fourcc == b"VP8X":
+            # Clear the EXIF and XMP flags of the dropped chunks
+            chunk = chunk[:8] + bytes([chunk[8] & ~0x0C]) + chunk[9:]
+        if fourcc not in _WEBP_DROP:
+            out.append(chunk)
+        pos += len(chunk)
+    body = b"".join(out)
+    return b"RIFF" + struct.pack("<I", len(body) + 4) + b"WEBP" + body
+
+
+def strip_metadata(source, target):
+    """Copy the image in `source` to `target` without its metadata (no Pillow needed)."""
+    ext = sniff(source)
+    data = Path(source).read_bytes()
+    strip = {"jpg": _strip_jpeg, "png": _strip_png, "webp": _strip_webp}.get(ext)
+    try:
+        Path(target).write_bytes(strip(data) if strip else data)
+    except (struct.error, IndexError):
+        raise NotAnImage("Not a readable image: truncated") from None
+
+
+def make_variants(source: str, out_dir: str) -> dict:
+    """
+    Resize `source` into out_dir. Returns {"width", "height", "original":
+    {"path", "type"}, "variants": [{"path", "width", "height", "type"}, ...]}
+    with the original's size. Runs in a pool process.
+    """
+    from PIL import Image, ImageOps
+
+    Image.MAX_IMAGE_PIXELS = MAX_PIXELS
+    try:
+        with Image.open(source) as img:
+            lossless = img.format in ("PNG", "GIF")
+            img = ImageOps.exif_transpose(img)
+            icc_profile = img.info.get("icc_profile")
+            if img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGBA" if "transparency" in img.info or img.mode in ("LA", "PA") else "RGB")
+            flat = img
+            if img.mode == "RGBA":
+                # JPEG has no alpha: flatten onto white
+                flat = Image.new("RGB", img.size, (255, 255, 255))
+                flat.paste(img, mask=img.getchannel("A"))
+            img.info, flat.info = {}, {}
+    except (OSError, Image.DecompressionBombError, SyntaxError) as e:
+        raise NotAnImage(f"Not a readable image: {e}") from None
+
+    width, height = img.size
+    # Full size; PNG for PNG / GIF uploads and anything with transparency
+    if lossless or img.mode == "RGBA":
+        original = {"path": str(Path(out_dir) / "original.png"), "type": "image/png"}
+        img.save(original["path"], "PNG", icc_profile=icc_profile, optimize=True)
+    else:
+        original = {"path": str(Path(out_dir) / "original.jpg"), "type": "image/jpeg"}
+        flat.save(original["path"], "JPEG", icc_profile=icc_profile, quality=90, optimize=True)
+
+    variants = []
+    for target in sorted({min(w, width) for w in WIDTHS}):
+        size = (target, max(1, round(height * target / width)))
+        for mime, fmt, ext, options in FORMATS:
+            base = img if fmt == "WEBP" else flat
+            resized = base if size == base.size else base.resize(size, Image.LANCZOS)
+            path = Path(out_dir) / f"{target}.{ext}"
+            resized.save(path, fmt, icc_profile=icc_profile, **options)
+            variants.append({"path": str(path), "width": size[0], "height": size[1], "type": mime})
+    return {"width": width, "height": height, "original": original, "variants": variants}
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def process_pool():
+    # spawn, not fork: the parent has database and worker threads running
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import get_context
+
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=IMAGE_PROCESSES, mp_context=get_context("spawn"))
+        return _pool
+
+
+def generate(source, out_dir) -> dict:
+    """make_variants() in the process pool; blocks the calling thread until done."""
+    from concurrent.futures.process import BrokenProcessPool
+
+    global _pool
+    pool = process_pool()
+    try:
+        return pool.submit(make_variants, str(source), str(out_dir)).result()
+    except BrokenProcessPool:
+        # A child died (e.g. killed for memory); start a fresh pool next time
+        with _pool_lock:
+            if _pool is pool:
+                _pool = None
+        raise
@@ -1,140 +1,408 @@
+# -----------------------------------------
+# Ovens Lovin's – recipe importer
+# -----------------------------------------
+#
+# Streams recipes from a JSON array (recipes.json) or NDJSON file (one
+# recipe per line) into the database, a batch at a time:
+#
+#   - records are read one by one, never the whole file at once
+#   - each record's text is hashed (recipes.content_hash); records whose
+#     hash is already stored are skipped without even being decoded
+#   - new recipes go through recipe_pipeline.create_recipe(); changed ones
+#     are updated in place; each batch is one transaction
+#
+# A file byte-for-byte identical to the last one imported from the same
+# path (import_files) is skipped after a single hashing pass.
+#
+#   python import_recipes.py [path] [--batch-size 500] [--dry-run] [--full]
+#
+# --dry-run prints what would be added or changed and writes no recipes;
+# --full diffs every record even if the file is unchanged.
+
+import argparse
+import hashlib
+import io
 import json
 import sqlite3
+import time
 from pathlib import Path
-from main import auto_category
 
-DB_PATH = Path(__file__).parent / "recipes.db"
+from db import get_write_conn
+from ingredients import link_ingredients
+from migrations import SchemaOutOfDate, check_current, migrate
+from recipe_pipeline import InvalidRecipe, clean_ingredients, create_recipe
+from search import held_ingredients
+import similarity
+
 JSON_PATH = Path(__file__).parent / "recipes.json"
 
-def get_conn():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-def slugify(title: str) -> str:
-    return (
-        title.strip()
-        .lower()
-        .replace(" ", "-")
-        .replace("'", "")
-        .replace("\"", "")
-    )
+BATCH_SIZE = 500
+CHUNK_SIZE = 1 << 16
+
+# -----------------------------------------
+# READING
+# -----------------------------------------
+
+def iter_json_array(f, chunk_size=CHUNK_SIZE):
+    """
+    Yield (raw text, value) for each element of a top-level JSON array,
+    without loading the whole file.
+    """
+    decoder = json.JSONDecoder()
+    buf, pos, eof = "", 0, False
+    started = False
+
+    def more():
+        nonlocal buf, pos, eof
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+        buf = buf[pos:] + chunk
+        pos = 0
+
+    while True:
+        # Skip whitespace, the opening bracket and separators
+        while pos < len(buf) and (buf[pos].isspace() or buf[pos] == "," or (buf[pos] == "[" and not started)):
+            started = started or buf[pos] == "["
+            pos += 1
+        if pos >= len(buf):
+            if eof:
+                return
+            more()
+            continue
+        if buf[pos] == "]":
+            return
+        try:
+            value, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            more()
+            continue
+        # A number at the end of the buffer may have been cut short
+        if end == len(buf) and not eof and not isinstance(value, (dict, list)):
+            more()
+            continue
+        yield buf[pos:end], value
+        pos = end
+
+
+def iter_ndjson(f):
+    """(raw line, None) per record; lines are only decoded if they're needed."""
+    for line in f:
+        line = line.strip()
+        if line:
+            yield line, None
+
+
+def iter_records(path: Path):
+    """
+    (raw text, value or None) per recipe in a JSON array or NDJSON file
+    (sniffed from the first character). NDJSON lines stay bytes.
+    """
+    with open(path, "rb") as f:
+        first = f.read(4096).lstrip()[:1]
+        f.seek(0)
+        if first == b"[":
+            yield from iter_json_array(io.TextIOWrapper(f, encoding="utf-8"))
+        else:
+            yield from iter_ndjson(f)
+
+
+def content_hash(raw) -> str:
+    """
+    Fingerprint of a source record's text. Hashing the text rather than
+    the decoded fields means an unchanged record is skipped without being
+    decoded at all; a record that was only reformatted hashes differently,
+    but then compares equal field by field and just gets re-stamped.
+    """
+    if isinstance(raw, str):
+        raw = raw.encode("utf-8")
+    return hashlib.sha1(raw).hexdigest()
+
+
+def file_hash(path: Path) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def normalize(raw):
+    """The parts of a source record we store, or None if it has no title."""
+    if not isinstance(raw, dict):
+        return None
+    title = (raw.get("title") or "").strip()
+    if not title:
+        return None
+    return {
+        "title": title,
+        "category": raw.get("category") or None,
+        "url": raw.get("url") or None,
+        "instructions": "\n".join(raw.get("instructions") or []),
+        "ingredients": [name for name, _, _ in clean_ingredients(raw.get("ingredients"))],
+    }
+
+
+# -----------------------------------------
+# DIFFING
+# -----------------------------------------
+
+def _existing(conn, titles):
+    """Stored recipes matching these titles (case-insensitively), keyed by lower(title)."""
+    rows = conn.execute(
+        f"""
+        SELECT id, title, content_hash, category, source_url, prep_instructions
+        FROM recipes
+        WHERE title COLLATE NOCASE IN ({', '.join('?' * len(titles))})
+        """,
+        titles,
+    ).fetchall()
+    return {row["title"].lower(): row for row in rows}
+
+
+def _stored_ingredients(conn, recipe_ids):
+    lines = {recipe_id: [] for recipe_id in recipe_ids}
+    if recipe_ids:
+        rows = conn.execute(
+            f"""
+            SELECT ri.recipe_id, i.name
+            FROM recipe_ingredients ri
+            JOIN ingredients i ON i.id = ri.ingredient_id
+            WHERE ri.recipe_id IN ({', '.join('?' * len(recipe_ids))})
+            ORDER BY ri.rowid
+            """,
+            recipe_ids,
+        )
+        for row in rows:
+            # Older imports stored lines unstripped
+            lines[row["recipe_id"]].append((row["name"] or "").strip())
+    return lines
+
+
+def changed_fields(row, stored_ingredients, record) -> list:
+    changed = []
+    if (row["prep_instructions"] or "") != record["instructions"]:
+        changed.append("instructions")
+    if stored_ingredients != record["ingredients"]:
+        changed.append("ingredients")
+    # A record without a category/url leaves the stored one alone
+    if record["category"] and record["category"] != row["category"]:
+        changed.append("category")
+    if record["url"] and record["url"] != row["source_url"]:
+        changed.append("url")
+    return changed
 
-def find_duplicate(cur, title):
-    cur.execute("SELECT id FROM recipes WHERE lower(title) = lower(?)", (title,))
-    row = cur.fetchone()
-    return row["id"] if row else None
 
-def import_recipes():
-    conn = get_conn()
-    cur = conn.cursor()
+def _known_hashes(conn, hashes):
+    rows = conn.execute(
+        f"SELECT content_hash FROM recipes WHERE content_hash IN ({', '.join('?' * len(hashes))})",
+        hashes,
+    )
+    return {row[0] for row in rows}
 
-    with open(JSON_PATH, "r", encoding="utf-8") as f:
-        recipes = json.load(f)
 
-    count_imported = 0
-    count_skipped = 0
+def plan_batch(conn, entries):
+    """
+    Sort a batch of (hash, raw text, value or None) entries into new /
+    changed / unchanged. Returns (new, changed, stamp, unchanged, invalid)
+    where changed holds (recipe_id, record, fields) and stamp holds
+    (hash, recipe_id) for recipes whose content matches but whose hash
+    doesn't (imported before hashes existed, or the source was only
+    reformatted).
+    """
+    known = _known_hashes(conn, list({h for h, _, _ in entries}))
+    unchanged = invalid = 0
 
-    for r in recipes:
-        title = r.get("title", "").strip()
-        if not title:
-            print("Skipping recipe with no title.")
+    by_key = {}
+    for h, raw, value in entries:
+        if h in known:
+            unchanged += 1
+            continue
+        record = normalize(json.loads(raw) if value is None else value)
+        if record is None:
+            invalid += 1
             continue
+        record["hash"] = h
+        # Last occurrence of a title within the batch wins
+        by_key[record["title"].lower()] = record
+    if not by_key:
+        return [], [], [], unchanged, invalid
+
+    existing = _existing(conn, [r["title"] for r in by_key.values()])
+    new, changed, stamp, stale = [], [], [], []
+    for key, record in by_key.items():
+        row = existing.get(key)
+        if row is None:
+            new.append(record)
+        else:
+            stale.append((row, record))
+
+    stored = _stored_ingredients(conn, [row["id"] for row, _ in stale])
+    for row, record in stale:
+        fields = changed_fields(row, stored[row["id"]], record)
+        if fields:
+            changed.append((row["id"], record, fields))
+        else:
+            stamp.append((record["hash"], row["id"]))
+            unchanged += 1
+    return new, changed, stamp, unchanged, invalid
 
-        # Duplicate check
-        exists = find_duplicate(cur, title)
-        if exists:
-            print(f"Skipping duplicate: {title}")
-            count_skipped += 1
-            continue  # <-- THIS AVOIDS THE recipe_id ISSUE
-
-        slug = slugify(title)
-
-        # Ensure slug is unique
-        cur.execute("SELECT id FROM recipes WHERE slug = ?", (slug,))
-        slug_exists = cur.fetchone()
-
-        if slug_exists:
-            # Generate unique slug: beef-wellington-2, beef-wellington-3, etc.
-            num = 2
-            while True:
-                new_slug = f"{slug}-{num}"
-                cur.execute("SELECT id FROM recipes WHERE slug = ?", (new_slug,))
-                if not cur.fetchone():
-                    slug = new_slug
-                    break
-                num += 1
-
-        meal_type = None
-        raw_category = r.get("category")
-        category = raw_category or auto_category(title)
-        prep_instructions = "\n".join(r.get("instructions", []))
-        cook_instructions = ""
-
-        # Insert recipe
+
+# -----------------------------------------
+# WRITING
+# -----------------------------------------
+
+def apply_batch(conn, new, changed, stamp) -> int:
+    """
+    Write one planned batch; returns how many new recipes were created.
+    Each new record gets a savepoint, so one that fails halfway leaves none
+    of its rows in the batch's transaction.
+    """
+    created = 0
+    if not conn.in_transaction:
+        # Otherwise the first RELEASE would commit on its own
+        conn.execute("BEGIN IMMEDIATE")
+    for record in new:
+        conn.execute("SAVEPOINT import_record")
         try:
-            cur.execute(
-                """
-                INSERT INTO recipes
-                (title, slug, meal_type, category, source_type, is_budget_friendly,
-                 base_recipe_id, prep_instructions, cook_instructions)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    title,
-                    slug,
-                    meal_type,
-                    category,
-                    "chef",
-                    0,
-                    None,
-                    prep_instructions,
-                    cook_instructions,
-                )
+            create_recipe(
+                conn,
+                record["title"],
+                category=record["category"],
+                source_type="chef",
+                prep_instructions=record["instructions"],
+                source_url=record["url"],
+                content_hash=record["hash"],
+                ingredients=[(line, None, None) for line in record["ingredients"]],
             )
-            recipe_id = cur.lastrowid
-        except sqlite3.Error as e:
-            print(f"Error inserting recipe {title}: {e}")
-            continue
+            created += 1
+        except (InvalidRecipe, sqlite3.Error) as e:
+            conn.execute("ROLLBACK TO import_record")
+            print(f"Error inserting recipe {record['title']}: {e}")
+        conn.execute("RELEASE import_record")
 
-        # Insert ingredients
-        for ing in r.get("ingredients", []):
-            # Skip null, None, empty, or non-string ingredients
-            if not ing or not isinstance(ing, str):
-                print(f"Skipping invalid ingredient in {title}: {ing}")
+    if changed:
+        conn.executemany(
+            """
+            UPDATE recipes
+            SET prep_instructions = ?,
+                category = COALESCE(?, category),
+                source_url = COALESCE(?, source_url),
+                content_hash = ?
+            WHERE id = ?
+            """,
+            [
+                (record["instructions"], record["category"], record["url"], record["hash"], recipe_id)
+                for recipe_id, record, _ in changed
+            ],
+        )
+        for recipe_id, record, fields in changed:
+            if "ingredients" not in fields:
                 continue
+            with held_ingredients(conn, recipe_id):
+                conn.execute("DELETE FROM recipe_ingredients WHERE recipe_id = ?", (recipe_id,))
+            link_ingredients(conn, recipe_id, [(line, None, None) for line in record["ingredients"]])
+
+    if stamp:
+        conn.executemany("UPDATE recipes SET content_hash = ? WHERE id = ?", stamp)
+    return created
+
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_recipes(path=JSON_PATH, batch_size=BATCH_SIZE, dry_run=False, full=False) -> dict:
+    path = Path(path).resolve()
+    stats = {"read": 0, "invalid": 0, "imported": 0, "updated": 0, "unchanged": 0}
+    start = time.perf_counter()
 
-            try:
-                cur.execute("INSERT OR IGNORE INTO ingredients (name) VALUES (?)", (ing,))
-                cur.execute("SELECT id FROM ingredients WHERE name = ?", (ing,))
-                ing_row = cur.fetchone()
-
-                if ing_row is None:
-                    print(f"Ingredient lookup failed for {title}: {ing}")
-                    continue
-
-                ing_id = ing_row["id"]
-
-                cur.execute(
-                    """
-                    INSERT INTO recipe_ingredients (recipe_id, ingredient_id, quantity, unit)
-                    VALUES (?, ?, ?, ?)
-                    """,
-                    (recipe_id, ing_id, None, None),
-                )
-            except sqlite3.Error as e:
-                print(f"Error inserting ingredient {ing} for recipe {title}: {e}")
+    def entries():
+        for raw, value in iter_records(path):
+            stats["read"] += 1
+            yield content_hash(raw), raw, value
+
+    with get_write_conn() as conn:
+        if dry_run:
+            check_current(conn)
+        else:
+            migrate(conn)
+
+        digest = file_hash(path)
+        last = conn.execute(
+            "SELECT sha1, records FROM import_files WHERE path = ?", (str(path),)
+        ).fetchone()
+        if last and last["sha1"] == digest and not full:
+            stats["read"] = stats["unchanged"] = last["records"]
+            stats["seconds"] = time.perf_counter() - start
+            return stats
+
+        for batch in _batches(entries(), batch_size):
+            new, changed, stamp, unchanged, invalid = plan_batch(conn, batch)
+            stats["unchanged"] += unchanged
+            stats["invalid"] += invalid
+
+            if dry_run:
+                for record in new:
+                    print(f"+ {record['title']}")
+                for _, record, fields in changed:
+                    print(f"~ {record['title']}  ({', '.join(fields)})")
+                stats["imported"] += len(new)
+                stats["updated"] += len(changed)
                 continue
 
-        count_imported += 1
+            stats["imported"] += apply_batch(conn, new, changed, stamp)
+            stats["updated"] += len(changed)
+            conn.commit()
+
+        if not dry_run:
+            conn.execute(
+                """
+                INSERT INTO import_files (path, sha1, records, imported_at)
+                VALUES (?, ?, ?, datetime('now'))
+                ON CONFLICT (path) DO UPDATE SET
+                    sha1 = excluded.sha1,
+                    records = excluded.records,
+                    imported_at = excluded.imported_at
+                """,
+                (str(path), digest, stats["read"]),
+            )
+            conn.commit()
+            # Signatures for the recipes whose ingredients were written, in
+            # short transactions so API writes aren't locked out meanwhile
+            similarity.refresh(conn, commit=True)
+
+    stats["seconds"] = time.perf_counter() - start
+    return stats
 
-    conn.commit()
-    conn.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import recipes from JSON or NDJSON.")
+    parser.add_argument("path", nargs="?", default=str(JSON_PATH))
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="show the diff, write nothing")
+    parser.add_argument("--full", action="store_true", help="diff every record even if the file is unchanged")
+    args = parser.parse_args()
+
+    try:
+        stats = import_recipes(args.path, batch_size=args.batch_size, dry_run=args.dry_run, full=args.full)
+    except SchemaOutOfDate as e:
+        parser.exit(1, f"{e}\n")
+    rate = stats["read"] / stats["seconds"] if stats["seconds"] else 0.0
 
     print("\n========================")
-    print(f"Imported recipes: {count_imported}")
-    print(f"Skipped duplicates: {count_skipped}")
+    print(f"{'Would import' if args.dry_run else 'Imported'} recipes: {stats['imported']}")
+    print(f"{'Would update' if args.dry_run else 'Updated'} recipes: {stats['updated']}")
+    print(f"Unchanged: {stats['unchanged']}")
+    print(f"Skipped (no title): {stats['invalid']}")
+    print(f"Read {stats['read']} records in {stats['seconds']:.2f}s ({rate:,.0f} recipes/sec)")
     print("========================")
-
-if __name__ == "__main__":
-    import_recipes()
\ No newline at end of file
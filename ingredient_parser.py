@@ -0,0 +1,325 @@
+# -----------------------------------------
+# Ovens Lovin's – ingredient line parser
+# -----------------------------------------
+#
+# Scraped ingredient lines look like "2 garlic cloves, chopped" or
+# "8 each bone-in chicken thighs (about 3-4 pounds)". parse_ingredient()
+# splits them into quantity, unit, canonical name and preparation note;
+# canonical_name() is the name part on its own ("garlic",
+# "chicken thigh"). Pure functions, no database access – see
+# ingredients.py for where the results are stored.
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+
+UNIT_WORDS = {
+    "teaspoon", "teaspoons", "tsp", "tsps", "t",
+    "tablespoon", "tablespoons", "tbsp", "tbsps", "tbs", "tbl",
+    "cup", "cups", "c",
+    "ounce", "ounces", "oz", "fl",
+    "pound", "pounds", "lb", "lbs",
+    "gram", "grams", "g", "gr", "kilogram", "kilograms", "kg",
+    "milliliter", "milliliters", "millilitre", "millilitres", "ml",
+    "liter", "liters", "litre", "litres", "l",
+    "pint", "pints", "quart", "quarts", "gallon", "gallons",
+    "pinch", "pinches", "dash", "dashes", "handful", "handfuls",
+    "each", "piece", "pieces", "slice", "slices", "can", "cans", "tin", "tins",
+    "jar", "jars", "package", "packages", "pkg", "bottle", "bottles",
+    "bunch", "bunches", "sprig", "sprigs", "stalk", "stalks", "head", "heads",
+    "clove", "cloves", "knob", "knobs", "sheet", "sheets", "stick", "sticks",
+    # Amounts nobody measures; stripped from names, never stored as a unit
+    "splash", "splashes", "drizzle", "sprinkle", "crack", "cracks", "glug", "glugs",
+}
+
+# Spelling variants -> the unit name we store
+UNIT_ALIASES = {
+    "teaspoon": "tsp", "teaspoons": "tsp", "tsp": "tsp", "tsps": "tsp", "t": "tsp",
+    "tablespoon": "tbsp", "tablespoons": "tbsp", "tbsp": "tbsp", "tbsps": "tbsp",
+    "tbs": "tbsp", "tbl": "tbsp",
+    "cup": "cup", "cups": "cup", "c": "cup",
+    "ounce": "oz", "ounces": "oz", "oz": "oz",
+    "pound": "lb", "pounds": "lb", "lb": "lb", "lbs": "lb",
+    "gram": "g", "grams": "g", "g": "g", "gr": "g",
+    "kilogram": "kg", "kilograms": "kg", "kg": "kg",
+    "milliliter": "ml", "milliliters": "ml", "millilitre": "ml", "millilitres": "ml", "ml": "ml",
+    "liter": "l", "liters": "l", "litre": "l", "litres": "l", "l": "l",
+    "pint": "pint", "pints": "pint", "quart": "quart", "quarts": "quart",
+    "gallon": "gallon", "gallons": "gallon",
+    "pinch": "pinch", "pinches": "pinch", "dash": "dash", "dashes": "dash",
+    "handful": "handful", "handfuls": "handful",
+    "piece": "piece", "pieces": "piece", "slice": "slice", "slices": "slice",
+    "can": "can", "cans": "can", "tin": "can", "tins": "can",
+    "jar": "jar", "jars": "jar", "package": "package", "packages": "package", "pkg": "package",
+    "bottle": "bottle", "bottles": "bottle", "bunch": "bunch", "bunches": "bunch",
+    "sprig": "sprig", "sprigs": "sprig", "stalk": "stalk", "stalks": "stalk",
+    "head": "head", "heads": "head", "clove": "clove", "cloves": "clove",
+    "knob": "knob", "sheet": "sheet", "sheets": "sheet", "stick": "stick", "sticks": "stick",
+}
+
+# Words that describe the state or size of an ingredient, not what it is
+DESCRIPTORS = {
+    "fresh", "freshly", "dried", "chopped", "finely", "roughly", "coarsely",
+    "diced", "minced", "sliced", "thinly", "thickly", "thick", "thin", "cut",
+    "grated", "shredded", "crushed", "ground", "cracked", "peeled", "halved",
+    "quartered", "trimmed", "beaten", "softened", "melted", "cooked", "raw",
+    "large", "small", "medium", "extra", "big", "whole", "boneless", "skinless",
+    "bone-in", "skin-on", "flaky", "good", "quality", "ripe", "cold", "warm",
+    "hot", "room", "temperature", "about", "approx", "approximately", "plus",
+    "optional", "divided", "packed", "heaping", "level", "of", "a", "an",
+    "the", "to", "taste", "for", "serving", "garnish",
+    # Filler around vague amounts: "a few very generous cracks of ..."
+    "few", "very", "generous", "generously", "scant", "heaped", "rounded",
+    "amount", "some", "couple", "several", "additional", "enough", "needed",
+    "more", "good-quality",
+}
+
+# Words allowed between a quantity and its unit: "1 scant teaspoon"
+_UNIT_QUALIFIERS = {
+    "scant", "heaped", "heaping", "rounded", "level", "generous", "good",
+    "large", "small", "medium", "big",
+}
+
+# Irregular plurals; everything else goes through the suffix rules below
+_SINGULARS = {
+    "leaves": "leaf",
+    "loaves": "loaf",
+    "halves": "half",
+    "knives": "knife",
+    "potatoes": "potato",
+    "tomatoes": "tomato",
+    "anchovies": "anchovy",
+    "molasses": "molasses",
+    "asparagus": "asparagus",
+    "couscous": "couscous",
+    "hummus": "hummus",
+    "swiss": "swiss",
+    "peas": "pea",
+}
+
+_VULGAR_FRACTIONS = {
+    "¼": 1 / 4, "½": 1 / 2, "¾": 3 / 4, "⅐": 1 / 7, "⅑": 1 / 9, "⅒": 1 / 10,
+    "⅓": 1 / 3, "⅔": 2 / 3, "⅕": 1 / 5, "⅖": 2 / 5, "⅗": 3 / 5, "⅘": 4 / 5,
+    "⅙": 1 / 6, "⅚": 5 / 6, "⅛": 1 / 8, "⅜": 3 / 8, "⅝": 5 / 8, "⅞": 7 / 8,
+}
+# "1½" -> "1 ½": keeps a mixed number from turning into 11/2 when folded
+_VULGAR_RE = re.compile("(\\d)([" + "".join(_VULGAR_FRACTIONS) + "])")
+
+_PARENS_RE = re.compile(r"\(([^)]*)\)")
+_QUANTITY_RE = re.compile(r"^(?:\d[\d./]*(?:\s*[-–]\s*[\d./]+)?\s*)+")
+_WORD_RE = re.compile(r"[a-z][a-z'-]*")
+# "400g" -> "400 g"
+_GLUED_UNIT_RE = re.compile(r"(\d)([a-z])")
+# "1 / 2" -> "1/2"
+_SPACED_FRACTION_RE = re.compile(r"(\d)\s*/\s*(\d)")
+# "1,000" -> "1000" (but not "2,3" or "1,5000")
+_THOUSANDS_RE = re.compile(r"(\d),(\d{3})(?!\d)")
+# "2 x 400g tins": a count of packs, then the size of each
+_TIMES_RE = re.compile(r"^[x×](?:\s+|(?=[\d.]))")
+
+# "Scant ½ teaspoon": the qualifier belongs to the unit, not the name
+_LEADING_QUALIFIERS_RE = re.compile(
+    r"^\s*(?:(?:" + "|".join(sorted(_UNIT_QUALIFIERS)) + r")\s+)+(?=\.?\d)"
+)
+# Preparation notes follow a comma, or a " + " ("+ more for dusting")
+_NOTE_SPLIT_RE = re.compile(r",|\s\+\s")
+
+# One number: "2 1/2", "1/2", "2.5", ".5", "2" (longest form first)
+_NUMBER = r"\d+\s+\d+/\d+|\d+/\d+|\d*\.\d+|\d+"
+_AMOUNT_RE = re.compile(
+    rf"^\s*(?P<low>{_NUMBER})(?:\s*(?:-|–|to)\s*(?P<high>{_NUMBER}))?\s*"
+)
+
+
+class ParsedIngredient(NamedTuple):
+    raw: str
+    name: str                        # canonical name, "" if nothing usable
+    quantity: Optional[float] = None
+    quantity_max: Optional[float] = None   # upper end of "3-4", else None
+    unit: Optional[str] = None       # normalized (see UNIT_ALIASES)
+    note: Optional[str] = None       # "chopped", "to taste", ...
+
+
+def singularize(word: str) -> str:
+    if word in _SINGULARS:
+        return _SINGULARS[word]
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 4 and word.endswith(("ches", "shes", "sses", "xes")):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def _number(text: str) -> float:
+    total = 0.0
+    for part in text.split():
+        if "/" in part:
+            num, den = part.split("/", 1)
+            total += float(num) / float(den) if float(den) else 0.0
+        else:
+            total += float(part)
+    return total
+
+
+def fold(text: str) -> str:
+    """
+    Lowercase, strip accents ("crème" -> "creme"), "½" -> "1/2",
+    "1 ⁄ 2" -> "1/2", "1,000" -> "1000".
+    """
+    text = _VULGAR_RE.sub(r"\1 \2", text or "")
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = _SPACED_FRACTION_RE.sub(r"\1/\2", text.replace("\u2044", "/"))
+    return _THOUSANDS_RE.sub(r"\1\2", text).lower()
+
+
+def _amount(text: str):
+    """Leading quantity and unit of `text`, plus whatever follows them."""
+    quantity = quantity_max = unit = None
+    m = _AMOUNT_RE.match(_LEADING_QUALIFIERS_RE.sub("", text))
+    if m:
+        quantity = _number(m.group("low"))
+        if m.group("high"):
+            quantity_max = _number(m.group("high"))
+            # "1-12 ounce bottle" is one 12-ounce bottle, not a range
+            if quantity_max <= quantity:
+                quantity_max = None
+        text = m.string[m.end():]
+
+        times = _TIMES_RE.match(text)
+        if times:
+            text = text[times.end():]
+            # "2 x 400 g" is 800 g; "2 x lemons" is just 2
+            each = _AMOUNT_RE.match(text)
+            if each:
+                size = _number(each.group("low"))
+                quantity *= size
+                if quantity_max is not None:
+                    quantity_max *= size
+                text = text[each.end():]
+
+    words = text.split()
+    skip = 0
+    if quantity is not None:
+        while skip < len(words) - 1 and words[skip] in _UNIT_QUALIFIERS:
+            skip += 1
+    if skip < len(words):
+        first = words[skip].rstrip(".")
+        # Without a quantity, a lone unit word is the ingredient ("Cloves")
+        if first in UNIT_ALIASES and (quantity is not None or len(words) > 1) and not (
+            first in ("t", "c", "l") and quantity is None
+        ):
+            unit = UNIT_ALIASES[first]
+            text = " ".join(words[skip + 1:])
+            if text.startswith("of "):
+                text = text[3:]
+    return quantity, quantity_max, unit, text
+
+
+def _name_from(text: str) -> str:
+    text = _QUANTITY_RE.sub("", text.strip())
+
+    words = _WORD_RE.findall(text)
+    # Leading units: "cup diced onion", "sprigs of thyme"
+    # (but "Cloves" on its own is the spice)
+    while len(words) > 1 and (words[0] in UNIT_WORDS or words[0] in DESCRIPTORS):
+        words.pop(0)
+    words = [w for w in words if w not in DESCRIPTORS]
+    # Trailing units: "garlic cloves", "thyme sprigs"
+    while len(words) > 1 and words[-1] in UNIT_WORDS:
+        words.pop()
+
+    if not words:
+        return ""
+    words[-1] = singularize(words[-1])
+    return " ".join(words)
+
+
+def _trailing_unit(text: str) -> Optional[str]:
+    # "2 garlic cloves" -> clove
+    words = _WORD_RE.findall(text)
+    if len(words) > 1 and words[-1] in UNIT_ALIASES:
+        return UNIT_ALIASES[words[-1]]
+    return None
+
+
+@lru_cache(maxsize=16384)
+def parse_ingredient(line: str) -> ParsedIngredient:
+    """
+    Split one ingredient line into its parts.
+
+        "2 1/2 cups flour"           -> 2.5, cup, "flour"
+        "3-4 sprigs of fresh thyme"  -> 3.0..4.0, sprig, "thyme"
+        "½ cup diced yellow onion"   -> 0.5, cup, "yellow onion"
+        "2 garlic cloves, chopped"   -> 2.0, clove, "garlic", note "chopped"
+        "Salt, to taste"             -> no quantity, "salt", note "to taste"
+
+    Results are cached; the same line always parses the same way.
+    """
+    raw = line or ""
+    text = fold(raw)
+    notes = [n.strip() for n in _PARENS_RE.findall(text) if n.strip()]
+    text = _GLUED_UNIT_RE.sub(r"\1 \2", _PARENS_RE.sub(" ", text))
+
+    parts = [p.strip() for p in _NOTE_SPLIT_RE.split(text)]
+    quantity, quantity_max, unit, head = _amount(parts[0])
+
+    # Anything after the first comma is usually a preparation note
+    # ("garlic, chopped"); but "4 slices, thick cut bacon" puts the name
+    # later, so fall through to the next part when one reduces to nothing.
+    name = _name_from(head)
+    name_at = 0
+    if not name:
+        for i, part in enumerate(parts[1:], start=1):
+            name = _name_from(part)
+            if name:
+                name_at = i
+                head = part
+                break
+
+    if unit is None and name:
+        unit = _trailing_unit(head)
+
+    notes = [p for i, p in enumerate(parts) if i > name_at and p] + notes
+    return ParsedIngredient(
+        raw=raw,
+        name=name,
+        quantity=quantity,
+        quantity_max=quantity_max,
+        unit=unit,
+        note="; ".join(notes) or None,
+    )
+
+
+def canonical_name(line: str) -> str:
+    """
+    Canonical ingredient name for a raw ingredient line.
+
+        "2 garlic cloves, chopped"                         -> "garlic"
+        "8 each bone-in chicken thighs (about 3-4 pounds)" -> "chicken thigh"
+        "½ cup diced yellow onion"                         -> "yellow onion"
+
+    Returns "" when nothing ingredient-like is left.
+    """
+    return parse_ingredient(line).name
+
+
+def format_quantity(value: Optional[float]) -> Optional[str]:
+    """2.0 -> "2", 0.5 -> "1/2", 2.25 -> "2 1/4"; other values to 2 places."""
+    if value is None:
+        return None
+    whole = int(value)
+    frac = value - whole
+    for den in (2, 3, 4, 8):
+        num = round(frac * den)
+        if abs(frac - num / den) < 0.01:
+            if num == 0:
+                return str(whole)
+            if num == den:
+                return str(whole + 1)
+            return f"{whole} {num}/{den}" if whole else f"{num}/{den}"
+    return f"{value:.2f}".rstrip("0").rstrip(".")
@@ -0,0 +1,254 @@
+# -----------------------------------------
+# Ovens Lovin's – structured ingredient storage
+# -----------------------------------------
+#
+# Ingredient lines are parsed once, when they are written, and the result
+# is kept next to the raw text:
+#
+#   canonical_ingredients (id, name)          "garlic", "yellow onion", ...
+#   ingredients.canonical_id                   raw line -> canonical name
+#   recipe_ingredients.canonical_id, amount, amount_max, std_unit, prep_note
+#
+# recipe_ingredients.quantity / unit stay exactly as the user typed them
+# (recipe.html shows them in front of the name); amount/std_unit are the
+# numeric, normalized version that grocery lists and the pantry matcher
+# read.
+#
+# Run `python ingredients.py` to back-fill rows written before this existed
+# (--reparse to redo every row after a parser change).
+
+from ingredient_parser import parse_ingredient
+from search import held_ingredients
+
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS canonical_ingredients (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL UNIQUE
+    )
+    """,
+]
+
+NEW_COLUMNS = {
+    "ingredients": [("canonical_id", "INTEGER")],
+    "recipe_ingredients": [
+        ("canonical_id", "INTEGER"),
+        ("amount", "REAL"),
+        ("amount_max", "REAL"),
+        ("std_unit", "TEXT"),
+        ("prep_note", "TEXT"),
+    ],
+}
+
+INDEXES = [
+    # Per-recipe reads use idx_recipe_ingredients_detail (recipe_detail.py)
+    "CREATE INDEX IF NOT EXISTS idx_ingredients_canonical ON ingredients (canonical_id)",
+    "CREATE INDEX IF NOT EXISTS idx_recipe_ingredients_canonical ON recipe_ingredients (canonical_id)",
+]
+
+
+def ensure_schema(conn):
+    for statement in SCHEMA:
+        conn.execute(statement)
+    for table, columns in NEW_COLUMNS.items():
+        existing = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+        for column, kind in columns:
+            if column not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {kind}")
+    for statement in INDEXES:
+        conn.execute(statement)
+
+
+def parse_link(name, quantity=None, unit=None):
+    """
+    Parse one recipe ingredient. The Add Recipe page sends quantity and
+    unit separately ("2", "cups", "onion"); imports send the whole line.
+    """
+    if quantity or unit:
+        return parse_ingredient(" ".join(p for p in (quantity, unit, name) if p))
+    return parse_ingredient(name)
+
+
+def canonical_ids(conn, names) -> dict:
+    """Map canonical names to ids, creating the missing ones."""
+    names = {n for n in names if n}
+    if not names:
+        return {}
+    conn.executemany(
+        "INSERT OR IGNORE INTO canonical_ingredients (name) VALUES (?)",
+        [(n,) for n in names],
+    )
+    ids = {}
+    names = sorted(names)
+    # Stay under SQLite's bound-parameter limit
+    for start in range(0, len(names), 500):
+        chunk = names[start:start + 500]
+        rows = conn.execute(
+            f"SELECT id, name FROM canonical_ingredients WHERE name IN ({', '.join('?' * len(chunk))})",
+            chunk,
+        )
+        ids.update((row["name"], row["id"]) for row in rows)
+    return ids
+
+
+# Per-connection scratch table for link_ingredients(); lives in temp, so
+# it never touches the database file or the WAL.
+_STAGING = """
+    CREATE TEMP TABLE IF NOT EXISTS staged_ingredients (
+        pos INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        quantity TEXT,
+        unit TEXT,
+        canonical TEXT,
+        amount REAL,
+        amount_max REAL,
+        std_unit TEXT,
+        prep_note TEXT
+    )
+"""
+
+
+def link_ingredients(conn, recipe_id, items) -> int:
+    """
+    Attach ingredients to a recipe. `items` are (name, quantity, unit)
+    tuples; blank names are skipped. Returns the number linked.
+
+    Set-based: the parsed rows are staged in a temp table with one
+    executemany, then canonical names, ingredient rows and links are each
+    written with a single INSERT ... SELECT – a fixed handful of
+    statements whether the recipe has 4 ingredients or 40.
+    """
+    rows = []
+    for pos, (name, quantity, unit) in enumerate(items):
+        name = (name or "").strip()
+        if not name:
+            continue
+        p = parse_link(name, quantity, unit)
+        rows.append((pos, name, quantity, unit, p.name or None,
+                     p.quantity, p.quantity_max, p.unit, p.note))
+    if not rows:
+        return 0
+
+    conn.execute(_STAGING)
+    conn.execute("DELETE FROM temp.staged_ingredients")
+    conn.executemany(
+        "INSERT INTO temp.staged_ingredients VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    conn.execute(
+        """
+        INSERT OR IGNORE INTO canonical_ingredients (name)
+        SELECT DISTINCT canonical FROM temp.staged_ingredients WHERE canonical IS NOT NULL
+        """
+    )
+    conn.execute(
+        """
+        INSERT OR IGNORE INTO ingredients (name, canonical_id)
+        SELECT s.name, c.id
+        FROM temp.staged_ingredients s
+        LEFT JOIN canonical_ingredients c ON c.name = s.canonical
+        ORDER BY s.pos
+        """
+    )
+    # One search-index update for the recipe, not one per ingredient
+    with held_ingredients(conn, recipe_id):
+        cur = conn.execute(
+            """
+            INSERT INTO recipe_ingredients
+                (recipe_id, ingredient_id, quantity, unit,
+                 canonical_id, amount, amount_max, std_unit, prep_note)
+            SELECT ?, i.id, s.quantity, s.unit,
+                   c.id, s.amount, s.amount_max, s.std_unit, s.prep_note
+            FROM temp.staged_ingredients s
+            JOIN ingredients i ON i.name = s.name
+            LEFT JOIN canonical_ingredients c ON c.name = s.canonical
+            ORDER BY s.pos
+            """,
+            (recipe_id,),
+        )
+    return cur.rowcount
+
+
+def backfill(conn, batch_size: int = 500, reparse: bool = False) -> dict:
+    """
+    Parse every ingredient / recipe_ingredients row that has no
+    canonical_id yet. Safe to re-run; once caught up only the handful of
+    lines with no usable name ("For serving") are looked at again.
+
+    reparse=True parses every row again (after parser fixes) and writes
+    only the ones whose result changed, so caches and sync clients see
+    just those recipes as edited.
+    """
+    ingredient_rows = conn.execute(
+        f"""
+        SELECT i.id, i.name, c.name AS canonical
+        FROM ingredients i
+        LEFT JOIN canonical_ingredients c ON c.id = i.canonical_id
+        {"" if reparse else "WHERE i.canonical_id IS NULL"}
+        """
+    ).fetchall()
+    link_rows = conn.execute(
+        f"""
+        SELECT ri.rowid AS link_id, i.name, ri.quantity, ri.unit, c.name AS canonical,
+               ri.amount, ri.amount_max, ri.std_unit, ri.prep_note
+        FROM recipe_ingredients ri
+        JOIN ingredients i ON i.id = ri.ingredient_id
+        LEFT JOIN canonical_ingredients c ON c.id = ri.canonical_id
+        {"" if reparse else "WHERE ri.canonical_id IS NULL"}
+        """
+    ).fetchall()
+
+    parsed_ingredients = []
+    for r in ingredient_rows:
+        p = parse_ingredient(r["name"] or "")
+        if not reparse or (p.name or None) != r["canonical"]:
+            parsed_ingredients.append((r["id"], p))
+    parsed_links = []
+    for r in link_rows:
+        p = parse_link(r["name"] or "", r["quantity"], r["unit"])
+        stored = (r["canonical"], r["amount"], r["amount_max"], r["std_unit"], r["prep_note"])
+        if not reparse or (p.name or None, p.quantity, p.quantity_max, p.unit, p.note) != stored:
+            parsed_links.append((r["link_id"], p))
+
+    ids = canonical_ids(
+        conn,
+        [p.name for _, p in parsed_ingredients] + [p.name for _, p in parsed_links],
+    )
+
+    for start in range(0, len(parsed_ingredients), batch_size):
+        conn.executemany(
+            "UPDATE ingredients SET canonical_id = ? WHERE id = ?",
+            [(ids.get(p.name), row_id) for row_id, p in parsed_ingredients[start:start + batch_size]],
+        )
+    for start in range(0, len(parsed_links), batch_size):
+        conn.executemany(
+            """
+            UPDATE recipe_ingredients
+            SET canonical_id = ?, amount = ?, amount_max = ?, std_unit = ?, prep_note = ?
+            WHERE rowid = ?
+            """,
+            [
+                (ids.get(p.name), p.quantity, p.quantity_max, p.unit, p.note, link_id)
+                for link_id, p in parsed_links[start:start + batch_size]
+            ],
+        )
+
+    return {"ingredients": len(parsed_ingredients), "recipe_ingredients": len(parsed_links)}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from db import get_write_conn
+
+    parser = argparse.ArgumentParser(description="Parse stored ingredient lines into structured columns.")
+    parser.add_argument("--reparse", action="store_true", help="parse every row again, not just new ones")
+    args = parser.parse_args()
+
+    with get_write_conn() as conn:
+        ensure_schema(conn)
+        counts = backfill(conn, reparse=args.reparse)
+
+    print(f"Parsed ingredients: {counts['ingredients']}")
+    print(f"Parsed recipe ingredient links: {counts['recipe_ingredients']}")
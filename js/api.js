@@ -36,15 +36,202 @@
         }
     }
 
+    // -------- GROCERY BATCHING --------
+    // Rapid check / delete / add taps are queued for a moment and sent as
+    // one POST /grocery/batch (one request, one transaction). Every caller
+    // in the same batch gets the same response, which includes the
+    // updated list.
+    const BATCH_DELAY_MS = 60;
+    let pendingOps = [];
+    let pendingWaiters = [];
+    let batchTimer = null;
+
+    function flushGroceryBatch() {
+        clearTimeout(batchTimer);
+        batchTimer = null;
+        if (!pendingOps.length) return Promise.resolve(null);
+
+        const ops = pendingOps;
+        const waiters = pendingWaiters;
+        pendingOps = [];
+        pendingWaiters = [];
+
+        const request = apiFetch("/grocery/batch", {
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify({ ops })
+        });
+        request.then(
+            res => waiters.forEach(w => w.resolve(res)),
+            err => waiters.forEach(w => w.reject(err))
+        );
+        return request;
+    }
+
+    function queueGroceryOp(op) {
+        return new Promise((resolve, reject) => {
+            pendingOps.push(op);
+            pendingWaiters.push({ resolve, reject });
+            if (!batchTimer) {
+                batchTimer = setTimeout(flushGroceryBatch, BATCH_DELAY_MS);
+            }
+        });
+    }
+
+
+    // -------- OFFLINE REPLICA (IndexedDB) --------
+    // The recipe list, this user's favorites and grocery list are kept in
+    // IndexedDB and brought up to date with GET /sync?since=<cursor>, which
+    // returns only what changed since the last sync. When the network is
+    // down the last synced copy is used, so the pages still work offline.
+    const REPLICA_DB = "ovens-lovins";
+    const REPLICA_VERSION = 1;
+    const REPLICA_STORES = ["recipes", "favorites", "grocery", "meta"];
+    const CATALOG_FIELDS = ["id", "title", "meal_type", "category", "source_type", "is_budget_friendly", "is_favorite"];
+
+    let replicaDb = null;
+    let syncing = null;
+
+    function idbResult(req) {
+        return new Promise((resolve, reject) => {
+            req.onsuccess = () => resolve(req.result);
+            req.onerror = () => reject(req.error);
+        });
+    }
+
+    function idbDone(tx) {
+        return new Promise((resolve, reject) => {
+            tx.oncomplete = () => resolve();
+            tx.onerror = tx.onabort = () => reject(tx.error);
+        });
+    }
+
+    function openReplica() {
+        if (!replicaDb) {
+            if (!window.indexedDB) return Promise.reject(new Error("IndexedDB unavailable"));
+            const req = indexedDB.open(REPLICA_DB, REPLICA_VERSION);
+            req.onupgradeneeded = () => {
+                const db = req.result;
+                db.createObjectStore("recipes", { keyPath: "id" });
+                db.createObjectStore("favorites");          // key = recipe id
+                db.createObjectStore("grocery", { keyPath: "id" });
+                db.createObjectStore("meta");               // cursor, user_id
+            };
+            replicaDb = idbResult(req);
+            replicaDb.catch(() => { replicaDb = null; });
+        }
+        return replicaDb;
+    }
+
+    async function readMeta(db, key) {
+        return idbResult(db.transaction("meta").objectStore("meta").get(key));
+    }
+
+    async function applyDelta(db, delta) {
+        const tx = db.transaction(REPLICA_STORES, "readwrite");
+        const recipes = tx.objectStore("recipes");
+        const favorites = tx.objectStore("favorites");
+        const grocery = tx.objectStore("grocery");
+        const meta = tx.objectStore("meta");
+
+        if (delta.reset) {
+            recipes.clear();
+            favorites.clear();
+            grocery.clear();
+        }
+        delta.recipes.upserted.forEach(r => recipes.put(r));
+        delta.recipes.deleted.forEach(id => recipes.delete(id));
+        delta.favorites.added.forEach(id => favorites.put(true, id));
+        delta.favorites.removed.forEach(id => favorites.delete(id));
+        delta.grocery.upserted.forEach(item => grocery.put(item));
+        delta.grocery.deleted.forEach(id => grocery.delete(id));
+        meta.put(delta.cursor, "cursor");
+        meta.put(getUserId(), "user_id");
+        return idbDone(tx);
+    }
+
+    // One sync at a time; callers arriving meanwhile share it
+    function syncReplica() {
+        if (!syncing) {
+            syncing = (async () => {
+                const db = await openReplica();
+                let cursor = await readMeta(db, "cursor");
+                if ((await readMeta(db, "user_id")) !== getUserId()) cursor = null;
+
+                let delta;
+                do {
+                    delta = await apiFetch(cursor ? `/sync?since=${cursor}` : "/sync");
+                    await applyDelta(db, delta);
+                    cursor = delta.cursor;
+                } while (delta.more);
+                return db;
+            })();
+            syncing.then(() => { syncing = null; }, () => { syncing = null; });
+        }
+        return syncing;
+    }
+
+    // Synced replica, or the last synced copy if the server can't be reached
+    async function replica() {
+        try {
+            return await syncReplica();
+        } catch (err) {
+            const db = await openReplica();
+            if ((await readMeta(db, "cursor")) == null) throw err;   // never synced
+            console.warn("Sync failed, using offline copy:", err);
+            return db;
+        }
+    }
+
+    async function replicaCatalog() {
+        const db = await replica();
+        const tx = db.transaction(["recipes", "favorites"]);
+        const [recipes, favoriteIds] = await Promise.all([
+            idbResult(tx.objectStore("recipes").getAll()),
+            idbResult(tx.objectStore("favorites").getAllKeys())
+        ]);
+        const favorites = new Set(favoriteIds);
+        return recipes.map(r => ({ ...r, is_favorite: favorites.has(r.id) }));
+    }
+
+    async function replicaGroceryList() {
+        const db = await replica();
+        const items = await idbResult(db.transaction("grocery").objectStore("grocery").getAll());
+        return items.reverse();   // newest first, like GET /grocery/list
+    }
+
     const api = {
         getUserId,
 
         // Recipes
-        getRecipes() {
-            return apiFetch("/recipes");
+        // params: meal_type, category, source_type, is_budget_friendly,
+        // favorites_only, cursor, limit, fields (array or comma string)
+        getRecipes(params = {}) {
+            const query = new URLSearchParams();
+            Object.entries(params).forEach(([key, value]) => {
+                if (value === undefined || value === null || value === "") return;
+                query.set(key, Array.isArray(value) ? value.join(",") : value);
+            });
+            const qs = query.toString();
+            return apiFetch(qs ? `/recipes?${qs}` : "/recipes");
         },
-        getRecipe(id) {
-            return apiFetch(`/recipe/${id}`);
+        // Whole recipe list (CATALOG_FIELDS) from the offline replica;
+        // straight from /recipes if IndexedDB isn't available
+        getCatalog() {
+            return replicaCatalog().catch(err => {
+                console.warn("Replica unavailable:", err);
+                return api.getRecipes({ fields: CATALOG_FIELDS });
+            });
+        },
+        syncReplica,
+        searchRecipes(q, limit = 50) {
+            const qs = new URLSearchParams({ q, limit });
+            return apiFetch(`/recipes/search?${qs}`);
+        },
+        // include: sections besides the recipe row, e.g. ["ingredients", "images", "base"]
+        getRecipe(id, include) {
+            const qs = include ? `?include=${[].concat(include).join(",")}` : "";
+            return apiFetch(`/recipe/${id}${qs}`);
         },
         createRecipe(recipe) {
             return apiFetch("/recipes", {
@@ -71,26 +258,39 @@
             return apiFetch(`/grocery/add_from_recipe/${id}`, { method: "POST" });
         },
         getGroceryList() {
-            return apiFetch("/grocery/list");
+            return replicaGroceryList().catch(err => {
+                console.warn("Replica unavailable:", err);
+                return apiFetch("/grocery/list");
+            });
         },
+        // The calls below are batched; each resolves to the batch response
+        // ({ status, added, checked, ..., items }).
         addGrocery(item) {
-            return apiFetch("/grocery", {
-                method: "POST",
-                headers: { "Content-Type": "application/json" },
-                body: JSON.stringify(item)
-            });
+            return queueGroceryOp({ op: "add", ...item });
         },
         checkGrocery(id) {
-            return apiFetch(`/grocery/check/${id}`, { method: "POST" });
+            return queueGroceryOp({ op: "check", id });
+        },
+        uncheckGrocery(id) {
+            return queueGroceryOp({ op: "uncheck", id });
         },
         deleteGrocery(id) {
-            return apiFetch(`/grocery/delete/${id}`, { method: "DELETE" });
+            return queueGroceryOp({ op: "delete", id });
+        },
+        clearCheckedGrocery() {
+            return queueGroceryOp({ op: "clear_checked" });
         },
+        addRecipesToGrocery(recipeIds) {
+            return queueGroceryOp({ op: "add_recipes", recipe_ids: recipeIds });
+        },
+        flushGroceryBatch,
 
         // Photos
         getRecipeImages(recipeId) {
             return apiFetch(`/recipe/${recipeId}/images`);
         },
+        // Resolves with {job_id, status, status_url} as soon as the server
+        // has the file; the photo shows up once waitForUpload() says done.
         uploadRecipeImage(recipeId, file, caption = "") {
             const formData = new FormData();
             formData.append("file", file);
@@ -101,6 +301,16 @@
                 body: formData
             });
         },
+        async waitForUpload(job, { intervalMs = 700, timeoutMs = 120000 } = {}) {
+            const deadline = Date.now() + timeoutMs;
+            for (;;) {
+                const status = await apiFetch(job.status_url);
+                if (status.status === "done") return status;
+                if (status.status === "failed") throw new Error(status.error || "Upload failed");
+                if (Date.now() > deadline) throw new Error("Upload is taking too long");
+                await new Promise(resolve => setTimeout(resolve, intervalMs));
+            }
+        },
         deleteRecipeImage(imageId) {
             return apiFetch(`/recipe/images/${imageId}`, {
                 method: "DELETE"
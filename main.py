@@ -3,130 +3,47 @@
 # FINAL PRODUCTION VERSION
 # -----------------------------------------
 
-from datetime import datetime
-
-from fastapi import FastAPI, HTTPException, UploadFile, File, Header, Request
+from fastapi import APIRouter, FastAPI, HTTPException, UploadFile, File, Header, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import List, Literal, Optional
+from contextlib import asynccontextmanager
 from pathlib import Path
-import sqlite3
-import cloudinary
-import cloudinary.uploader
 from dotenv import load_dotenv
-import os
-
-
-# -----------------------------------------
-# ENVIRONMENT VARIABLES / CLOUDINARY CONFIG
-# -----------------------------------------
-
-load_dotenv()
-
-cloudinary.config(
-    cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
-    api_key=os.getenv("CLOUDINARY_API_KEY"),
-    api_secret=os.getenv("CLOUDINARY_API_SECRET"),
-    secure=True
-)
-
-
-# -----------------------------------------
-# DATABASE CONFIG
-# -----------------------------------------
+import time
 
-DB_PATH = Path(__file__).parent / "recipes.db"
-print("USING DATABASE:", DB_PATH)
+from catalog_cache import catalog_cache, favorite_flag, render_payload, serialize_payload, split_payload
+import changes
+from db import DB_PATH, get_conn, get_write_conn, pool_stats, set_statement_observer
+from fastjson import dumps
+import grocery
+import metrics
+import migrations
+from pantry import pantry_index
+import recipe_detail
+import recipe_pipeline
+from search import search_recipes
+import similarity
+import uploads
+from versions import SCOPE_RECIPES, favorites_scope, get_versions, grocery_scope
 
 
-def get_conn():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+BASE_DIR = Path(__file__).parent
 
-def init_db():
-    conn = get_conn()
-    cur = conn.cursor()
 
-    # Per-user favorites join table
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS user_favorites (
-            user_id TEXT NOT NULL,
-            recipe_id INTEGER NOT NULL,
-            PRIMARY KEY (user_id, recipe_id)
-        )
-    """)
-
-    # user_id column on grocery_items
-    cur.execute("PRAGMA table_info(grocery_items)")
-    cols = [row["name"] for row in cur.fetchall()]
-    if "user_id" not in cols:
-        cur.execute("ALTER TABLE grocery_items ADD COLUMN user_id TEXT")
-        conn.commit()
-
-    conn.close()
-
-def auto_category(title: str) -> str:
-    t = (title or "").lower()
-
-    if any(word in t for word in ["salad"]):
-        return "Salad"
-    if any(word in t for word in ["soup", "stew", "chowder", "broth"]):
-        return "Soups & Stews"
-    if any(word in t for word in ["pasta", "spaghetti", "noodle", "lasagna"]):
-        return "Pasta"
-    if "chicken" in t:
-        return "Chicken"
-    if any(word in t for word in ["beef", "steak", "burger"]):
-        return "Beef"
-    if any(word in t for word in ["pork", "ham", "bacon"]):
-        return "Pork"
-    if any(word in t for word in ["fish", "salmon", "shrimp", "prawn", "crab"]):
-        return "Seafood"
-    if any(word in t for word in ["cake", "cookie", "brownie", "pie", "tart", "crumble", "dessert"]):
-        return "Dessert"
-    if any(word in t for word in ["sandwich", "wrap", "taco", "quesadilla"]):
-        return "Handhelds"
-
-    return "Other"
-   
 def normalize_user_id(x_user_id: Optional[str]) -> str:
     return x_user_id or "anon"
 
-# Call on startup
-init_db()
-
-# -----------------------------------------
-# FASTAPI APP
-# -----------------------------------------
-
-app = FastAPI(title="Ovens Lovin's – The Kitchen Helper")
-
 
 # -----------------------------------------
-# STATIC FILE MOUNTS  (match your filesystem)
+# MIDDLEWARE
 # -----------------------------------------
 
-app.mount("/css", StaticFiles(directory="css"), name="css")
-app.mount("/js", StaticFiles(directory="js"), name="js")
-app.mount("/icons", StaticFiles(directory="icons"), name="icons")
-
-
-# -----------------------------------------
-# CORS (Allows PWA install + local requests)
-# -----------------------------------------
+STATIC_PREFIXES = ("/css/", "/js/", "/icons/", "/manifest.json", "/service-worker.js")
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"]
-)
 
-@app.middleware("http")
 async def add_security_and_cache_headers(request: Request, call_next):
     """
     Add a few standard security headers and sane Cache-Control defaults.
@@ -143,6 +60,8 @@ async def add_security_and_cache_headers(request: Request, call_next):
     response.headers.setdefault("Referrer-Policy", "strict-origin-when-cross-origin")
 
     # ---- Cache rules ----
+    # Handlers that know better (the versioned API responses below) set
+    # their own Cache-Control; these are only the defaults.
     path = request.url.path
 
     # For HTML pages and root: don't cache aggressively
@@ -154,57 +73,135 @@ async def add_security_and_cache_headers(request: Request, call_next):
         )
         response.headers.setdefault("Pragma", "no-cache")
         response.headers.setdefault("Expires", "0")
-    else:
-        # For CSS/JS/icons/API responses we’re okay with short caching
+    elif path.startswith(STATIC_PREFIXES):
+        # CSS/JS/icons are fine with short caching
         # (Service worker still controls most of this.)
         response.headers.setdefault(
             "Cache-Control",
             "public, max-age=3600"
         )
+    else:
+        # API responses without an ETag may be per-user or change at any
+        # time; never let a browser or proxy reuse them
+        response.headers.setdefault("Cache-Control", "no-store")
 
     return response
 
+
+async def record_request_metrics(request: Request, call_next):
+    """Per-route latency, status and SQL statement counts for /metrics."""
+    stats = metrics.begin_request()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        metrics.end_request(request.scope, status, time.perf_counter() - start, stats)
+
+
+# -----------------------------------------
+# APP FACTORY
+# -----------------------------------------
+#
+# Importing this module only defines things: no database access, no
+# network clients, nothing printed. Database checks run in the lifespan
+# hook, once per worker, before it accepts requests; Cloudinary is
+# imported and configured by uploads.CloudinaryStorage on the first upload.
+#
+#   uvicorn main:app                  (app = create_app() below)
+#   uvicorn main:create_app --factory
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    print("USING DATABASE:", DB_PATH)
+    # Every statement on a pooled connection is timed for /metrics (metrics.py)
+    set_statement_observer(metrics.observe_statement)
+    # Schema changes live in migrations.py; startup only compares user_version
+    migrations.ensure_current()
+    # Photos stored by the local backend (IMAGE_STORAGE=local, uploads.py)
+    uploads.UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    yield
+
+
+def create_app() -> FastAPI:
+    load_dotenv()
+
+    app = FastAPI(title="Ovens Lovin's – The Kitchen Helper", lifespan=lifespan)
+
+    # Static directories resolve from this file, not the working directory
+    app.mount("/css", StaticFiles(directory=BASE_DIR / "css"), name="css")
+    app.mount("/js", StaticFiles(directory=BASE_DIR / "js"), name="js")
+    app.mount("/icons", StaticFiles(directory=BASE_DIR / "icons"), name="icons")
+    # Created at startup (lifespan), not here
+    app.mount(
+        uploads.UPLOAD_URL_PREFIX,
+        StaticFiles(directory=uploads.UPLOAD_DIR, check_dir=False),
+        name="uploads",
+    )
+
+    # CORS (Allows PWA install + local requests)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "ETag"],
+    )
+    app.middleware("http")(add_security_and_cache_headers)
+    # Registered last, so it wraps everything above and times the whole request
+    app.middleware("http")(record_request_metrics)
+
+    app.include_router(router)
+    return app
+
+
+router = APIRouter()
+
+
 # -----------------------------------------
 # PWA FILES (Manifest & Service Worker)
 # -----------------------------------------
 
-@app.get("/manifest.json", include_in_schema=False)
+@router.get("/manifest.json", include_in_schema=False)
 def manifest():
-    return FileResponse("manifest.json")
+    return FileResponse(BASE_DIR / "manifest.json")
 
 
-@app.get("/service-worker.js", include_in_schema=False)
+@router.get("/service-worker.js", include_in_schema=False)
 def service_worker():
-    return FileResponse("service-worker.js")
+    return FileResponse(BASE_DIR / "service-worker.js")
 
 
 # -----------------------------------------
 # PAGE ROUTES (Serve HTML directly)
 # -----------------------------------------
 
-@app.get("/", include_in_schema=False)
+@router.get("/", include_in_schema=False)
 def root():
-    return FileResponse("index.html")
+    return FileResponse(BASE_DIR / "index.html")
 
 
-@app.get("/index.html", include_in_schema=False)
+@router.get("/index.html", include_in_schema=False)
 def serve_index():
-    return FileResponse("index.html")
+    return FileResponse(BASE_DIR / "index.html")
 
 
-@app.get("/upload.html", include_in_schema=False)
+@router.get("/upload.html", include_in_schema=False)
 def serve_upload():
-    return FileResponse("upload.html")
+    return FileResponse(BASE_DIR / "upload.html")
 
 
-@app.get("/recipe.html", include_in_schema=False)
+@router.get("/recipe.html", include_in_schema=False)
 def serve_recipe():
-    return FileResponse("recipe.html")
+    return FileResponse(BASE_DIR / "recipe.html")
 
 
-@app.get("/grocery.html", include_in_schema=False)
+@router.get("/grocery.html", include_in_schema=False)
 def serve_grocery():
-    return FileResponse("grocery.html")
+    return FileResponse(BASE_DIR / "grocery.html")
 
 
 # -----------------------------------------
@@ -244,6 +241,16 @@ class RecipeOut(BaseModel):
     linked_chef: Optional[dict] = None
     ingredients: List[dict] = Field(default_factory=list)
     source_url: Optional[str] = None  # 👈 add this
+    # Only with ?include=images / ?include=base (recipe_detail.py)
+    images: Optional[List[dict]] = None
+    base_recipe: Optional[dict] = None
+
+
+class PantryIn(BaseModel):
+    ingredients: List[str]
+    limit: int = Field(default=20, ge=1, le=200)
+    min_coverage: float = Field(default=0.0, ge=0.0, le=1.0)
+    include_staples: bool = True   # count salt, pepper and water as on hand
 
 
 class GroceryItemIn(BaseModel):
@@ -256,514 +263,677 @@ class GroceryItemOut(GroceryItemIn):
     id: int
     checked: bool = False
 
-@app.post("/recipes")
+
+class GroceryOp(BaseModel):
+    op: Literal["add", "check", "uncheck", "delete", "clear_checked", "add_recipes"]
+    id: Optional[int] = None                 # check / uncheck / delete
+    ingredient_name: Optional[str] = None    # add
+    quantity: Optional[str] = None
+    unit: Optional[str] = None
+    recipe_ids: List[int] = Field(default_factory=list)   # add_recipes
+
+
+class GroceryBatchIn(BaseModel):
+    ops: List[GroceryOp] = Field(..., max_length=500)
+
+
+class FastJSONResponse(Response):
+    """Plain dicts/lists straight to JSON bytes (fastjson.py), no jsonable_encoder."""
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+# -----------------------------------------
+# CONDITIONAL GET (ETag / If-None-Match)
+# -----------------------------------------
+#
+# ETags are built from the data_versions counters (versions.py), so a
+# matching If-None-Match is answered with 304 after one small lookup,
+# without reading any recipe or grocery rows.
+
+# Catalog data is the same for everyone: shared caches may keep it briefly
+CACHE_SHARED = "public, max-age=60, must-revalidate"
+# Per-user data: browser only, and always revalidated (a 304 is cheap)
+CACHE_PRIVATE = "private, no-cache"
+
+
+def make_etag(kind: str, *versions) -> str:
+    return f'W/"{kind}-{"-".join(str(v) for v in versions)}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    # Weak comparison: W/"x" and "x" are the same tag
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def cache_headers(etag: str, per_user: bool) -> dict:
+    if per_user:
+        return {"ETag": etag, "Cache-Control": CACHE_PRIVATE, "Vary": "X-User-Id"}
+    return {"ETag": etag, "Cache-Control": CACHE_SHARED}
+
+
+def not_modified(headers: dict) -> Response:
+    return Response(status_code=304, headers=headers)
+
+
+@router.post("/recipes")
 def create_recipe(recipe: RecipeIn):
     """
-    Create a new recipe (used by the Add Recipe page).
+    Create a new recipe (used by the Add Recipe page) and attach its
+    ingredients. Category is auto-detected from the title if missing.
     """
-    conn = get_conn()
-    cur = conn.cursor()
-
-    # 1) Category: use given or auto-detect from title
-    category = recipe.category or auto_category(recipe.title)
-
-    # 2) Simple slug from title, kept unique
-    base_slug = recipe.title.strip().lower().replace(" ", "-")
-    slug = base_slug or None
-
-    if slug:
-        suffix = 2
-        while True:
-            cur.execute("SELECT id FROM recipes WHERE slug = ?", (slug,))
-            if not cur.fetchone():
-                break
-            slug = f"{base_slug}-{suffix}"
-            suffix += 1
-
-    # 3) Insert into recipes
-    cur.execute(
-        """
-        INSERT INTO recipes
-        (title, slug, meal_type, category, source_type, is_budget_friendly,
-         base_recipe_id, prep_instructions, cook_instructions, source_url)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        (
-            recipe.title,
-            slug,
-            recipe.meal_type,
-            category,
-            recipe.source_type,                        # "custom" from upload.html
-            1 if recipe.is_budget_friendly else 0,
-            recipe.base_recipe_id,
-            recipe.prep_instructions,
-            recipe.cook_instructions,
-            None,                                      # no external URL for user recipes
-        ),
-    )
-    recipe_id = cur.lastrowid
-
-    # 4) Ingredients: ensure names exist, then link in recipe_ingredients
-    for ing in recipe.ingredients:
-        # skip completely empty rows
-        if not ing.name.strip():
-            continue
-
-        cur.execute("INSERT OR IGNORE INTO ingredients (name) VALUES (?)", (ing.name,))
-        cur.execute("SELECT id FROM ingredients WHERE name = ?", (ing.name,))
-        row = cur.fetchone()
-        if not row:
-            continue
-
-        ingredient_id = row["id"]
-
-        cur.execute(
-            """
-            INSERT INTO recipe_ingredients
-            (recipe_id, ingredient_id, quantity, unit)
-            VALUES (?, ?, ?, ?)
-            """,
-            (recipe_id, ingredient_id, ing.quantity, ing.unit),
-        )
+    try:
+        with get_write_conn() as conn:
+            recipe_id = recipe_pipeline.create_recipe(
+                conn,
+                recipe.title,
+                meal_type=recipe.meal_type,
+                category=recipe.category,
+                source_type=recipe.source_type,      # "custom" from upload.html
+                is_budget_friendly=recipe.is_budget_friendly,
+                base_recipe_id=recipe.base_recipe_id,
+                prep_instructions=recipe.prep_instructions,
+                cook_instructions=recipe.cook_instructions,
+                ingredients=[(ing.name, ing.quantity, ing.unit) for ing in recipe.ingredients],
+            )
+            similarity.refresh_recipe(conn, recipe_id)
+    except recipe_pipeline.InvalidRecipe as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    conn.commit()
-    conn.close()
+    pantry_index.add_recipe(recipe_id, recipe.title, [ing.name for ing in recipe.ingredients])
 
-    # 5) Frontend only really needs the new ID
+    # Frontend only really needs the new ID (redirects to /recipe.html?id={id})
     return {"id": recipe_id}
 
 # -----------------------------------------
 # FAVORITES
 # -----------------------------------------
 
-@app.post("/favorite/{recipe_id}")
+@router.post("/favorite/{recipe_id}")
 def favorite(recipe_id: int, x_user_id: Optional[str] = Header(default=None)):
     user_id = normalize_user_id(x_user_id)
-    conn = get_conn()
-    cur = conn.cursor()
-
-    cur.execute("SELECT id FROM recipes WHERE id = ?", (recipe_id,))
-    if not cur.fetchone():
-        conn.close()
-        raise HTTPException(status_code=404, detail="Recipe not found")
-
-    cur.execute("""
-        INSERT OR IGNORE INTO user_favorites (user_id, recipe_id)
-        VALUES (?, ?)
-    """, (user_id, recipe_id))
-    conn.commit()
-    conn.close()
+    with get_write_conn() as conn:
+        cur = conn.cursor()
+
+        cur.execute("SELECT id FROM recipes WHERE id = ?", (recipe_id,))
+        if not cur.fetchone():
+            raise HTTPException(status_code=404, detail="Recipe not found")
+
+        cur.execute("""
+            INSERT OR IGNORE INTO user_favorites (user_id, recipe_id)
+            VALUES (?, ?)
+        """, (user_id, recipe_id))
     return {"status": "ok"}
 
 
-@app.post("/unfavorite/{recipe_id}")
+@router.post("/unfavorite/{recipe_id}")
 def unfavorite(recipe_id: int, x_user_id: Optional[str] = Header(default=None)):
     user_id = normalize_user_id(x_user_id)
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        DELETE FROM user_favorites
-        WHERE user_id = ? AND recipe_id = ?
-    """, (user_id, recipe_id))
-    conn.commit()
-    conn.close()
+    with get_write_conn() as conn:
+        conn.execute("""
+            DELETE FROM user_favorites
+            WHERE user_id = ? AND recipe_id = ?
+        """, (user_id, recipe_id))
     return {"status": "ok"}
 
 
-@app.get("/favorites")
-def get_favorites(x_user_id: Optional[str] = Header(default=None)):
+@router.get("/favorites")
+def get_favorites(request: Request, x_user_id: Optional[str] = Header(default=None)):
     user_id = normalize_user_id(x_user_id)
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT r.id, r.title, r.meal_type, r.category, r.source_type
-        FROM recipes r
-        JOIN user_favorites uf ON uf.recipe_id = r.id
-        WHERE uf.user_id = ?
-        ORDER BY r.title COLLATE NOCASE
-    """, (user_id,))
-    rows = cur.fetchall()
-    conn.close()
+    with get_conn() as conn:
+        etag = make_etag("favorites", *get_versions(conn, SCOPE_RECIPES, favorites_scope(user_id)))
+        headers = cache_headers(etag, per_user=True)
+        if etag_matches(request, etag):
+            return not_modified(headers)
+
+        rows = conn.execute("""
+            SELECT r.id, r.title, r.meal_type, r.category, r.source_type
+            FROM recipes r
+            JOIN user_favorites uf ON uf.recipe_id = r.id
+            WHERE uf.user_id = ?
+            ORDER BY r.title COLLATE NOCASE
+        """, (user_id,)).fetchall()
 
     result = []
     for r in rows:
-        cat = r["category"] if r["category"] else auto_category(r["title"])
         result.append(
             {
                 "id": r["id"],
                 "title": r["title"],
                 "meal_type": r["meal_type"],
-                "category": cat,
+                "category": r["category"],
                 "source_type": r["source_type"],
                 "is_favorite": True,
             }
         )
-    return result
+    return FastJSONResponse(result, headers=headers)
 
 # -----------------------------------------
 # RECIPE ENDPOINTS
 # -----------------------------------------
 
-@app.post("/recipes")
-def create_recipe(recipe: RecipeIn):
-    """
-    Create a new recipe (user-added) and attach its ingredients.
-    Uses auto_category() if no category is provided.
+# Fields /recipes can return (and project with ?fields=), mapped to the
+# recipe columns each one is built from.
+RECIPE_LIST_FIELDS = {
+    "id": ("id",),
+    "title": ("title",),
+    "meal_type": ("meal_type",),
+    "category": ("category",),
+    "source_type": ("source_type",),
+    "is_budget_friendly": ("is_budget_friendly",),
+    "base_recipe_id": ("base_recipe_id",),
+    "prep_instructions": ("prep_instructions",),
+    "cook_instructions": ("cook_instructions",),
+    "is_favorite": ("id",),
+    "linked_budget": (),
+    "linked_chef": (),
+    "ingredients": (),
+    "source_url": ("source_url",),
+}
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    if not fields:
+        return list(RECIPE_LIST_FIELDS)
+    wanted = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in wanted if f not in RECIPE_LIST_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown field(s): {', '.join(unknown)}")
+    return wanted
+
+
+def recipe_list_item(r, wanted, favorites_only) -> dict:
+    item = {}
+    for f in wanted:
+        if f == "is_budget_friendly":
+            item[f] = bool(r["is_budget_friendly"])
+        elif f == "is_favorite":
+            # Filled in per user when the cached payload is rendered
+            item[f] = True if favorites_only else favorite_flag(r["id"])
+        elif f == "ingredients":
+            item[f] = []
+        elif f in ("linked_budget", "linked_chef"):
+            item[f] = None
+        else:
+            item[f] = r[f]
+    return item
+
+
+@router.get("/recipes")
+def list_recipes(
+    request: Request,
+    meal_type: Optional[str] = None,
+    category: Optional[str] = None,
+    source_type: Optional[str] = None,
+    is_budget_friendly: Optional[bool] = None,
+    favorites_only: bool = False,
+    cursor: Optional[int] = Query(default=None, description="Return recipes with id greater than this"),
+    limit: Optional[int] = Query(default=None, ge=1, le=500),
+    fields: Optional[str] = Query(default=None, description="Comma-separated list of fields to return"),
+    x_user_id: Optional[str] = Header(default=None),
+):
     """
-    conn = get_conn()
-    cur = conn.cursor()
-
-    # Decide category automatically if missing
-    category = recipe.category or auto_category(recipe.title)
-
-    # Let source_type come from the payload, but default "custom" for user recipes
-    source_type = recipe.source_type or "custom"
-
-    cur.execute("""
-        INSERT INTO recipes
-            (title, meal_type, category, source_type,
-             is_budget_friendly, base_recipe_id,
-             prep_instructions, cook_instructions)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        recipe.title,
-        recipe.meal_type,
-        category,
-        source_type,
-        int(recipe.is_budget_friendly),
-        recipe.base_recipe_id,
-        recipe.prep_instructions,
-        recipe.cook_instructions,
-    ))
-    recipe_id = cur.lastrowid
-
-    # Attach ingredients
-    for ing in recipe.ingredients:
-        # make sure we have a name
-        if not ing.name:
-            continue
-
-        # ensure ingredient exists
-        cur.execute(
-            "INSERT OR IGNORE INTO ingredients (name) VALUES (?)",
-            (ing.name,)
-        )
-        cur.execute(
-            "SELECT id FROM ingredients WHERE name = ?",
-            (ing.name,)
-        )
-        row = cur.fetchone()
-        if not row:
-            continue
-
-        ing_id = row["id"]
-        cur.execute(
-            """
-            INSERT INTO recipe_ingredients
-                (recipe_id, ingredient_id, quantity, unit)
-            VALUES (?, ?, ?, ?)
-            """,
-            (recipe_id, ing_id, ing.quantity, ing.unit)
-        )
+    List recipes ordered by id.
 
-    conn.commit()
-    conn.close()
+    Filters are applied in SQL. Pagination is keyset based: pass the
+    X-Next-Cursor header from one page as ?cursor= to get the next one.
+    Without ?limit the whole (filtered) catalog is returned.
+    """
+    user_id = normalize_user_id(x_user_id)
+    wanted = parse_fields(fields)
+
+    columns = {"id"}
+    for f in wanted:
+        columns.update(RECIPE_LIST_FIELDS[f])
+
+    clauses = []
+    params = []
+    if meal_type:
+        clauses.append("meal_type = ?")
+        params.append(meal_type)
+    if category:
+        # Every row has a stored category (categories.backfill, migration 16)
+        clauses.append("category = ?")
+        params.append(category)
+    if source_type:
+        clauses.append("source_type = ?")
+        params.append(source_type)
+    if is_budget_friendly is not None:
+        clauses.append("is_budget_friendly = ?")
+        params.append(1 if is_budget_friendly else 0)
+    if favorites_only:
+        clauses.append("id IN (SELECT recipe_id FROM user_favorites WHERE user_id = ?)")
+        params.append(user_id)
+    if cursor is not None:
+        clauses.append("id > ?")
+        params.append(cursor)
+
+    sql = f"SELECT {', '.join(sorted(columns))} FROM recipes"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY id ASC"
+    if limit:
+        # One extra row tells us whether there is a next page
+        sql += " LIMIT ?"
+        params.append(limit + 1)
+
+    # is_favorite / favorites_only make the list depend on the user
+    per_user = favorites_only or "is_favorite" in wanted
+    scopes = [SCOPE_RECIPES, favorites_scope(user_id)] if per_user else [SCOPE_RECIPES]
+    # favorites_only pages are one user's own; every other page is shared
+    key = None if favorites_only else (
+        "list", meal_type, category, source_type, is_budget_friendly, cursor, limit, tuple(wanted)
+    )
 
-    # For now, just return the new id – front end can redirect to /recipe.html?id={id}
-    return {"id": recipe_id}
+    with get_conn() as conn:
+        versions = get_versions(conn, *scopes)
+        etag = make_etag("recipes", *versions)
+        headers = cache_headers(etag, per_user)
+        if etag_matches(request, etag):
+            return not_modified(headers)
+
+        catalog_cache.refresh(conn, versions[0])
+        cached = catalog_cache.get(key) if key else None
+        if cached:
+            parts, next_cursor = cached
+        else:
+            rows = conn.execute(sql, params).fetchall()
+            next_cursor = None
+            if limit and len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = rows[-1]["id"]
+            parts = serialize_payload([recipe_list_item(r, wanted, favorites_only) for r in rows])
+            if key:
+                catalog_cache.put(key, (parts, next_cursor), versions[0])
+
+        favorites = frozenset()
+        if "is_favorite" in wanted and not favorites_only:
+            favorites = catalog_cache.favorites(conn, user_id, versions[1])
+
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = str(next_cursor)
+    return Response(render_payload(parts, favorites), media_type="application/json", headers=headers)
+
+
+@router.get("/recipes/search")
+def search(
+    q: str = Query(..., description="Words to look for in titles, ingredients and instructions"),
+    limit: int = Query(default=20, ge=1, le=100),
+    prefix: bool = Query(default=True, description="Treat the last word as a prefix (search-as-you-type)"),
+):
+    """
+    Full-text recipe search, best matches first.
+    """
+    with get_conn() as conn:
+        results = search_recipes(conn, q, limit=limit, prefix=prefix)
+    return FastJSONResponse(results)
+
+
+@router.get("/recipe/{recipe_id}", response_model=RecipeOut)
+def get_recipe(
+    recipe_id: int,
+    request: Request,
+    include: Optional[str] = Query(
+        default=None,
+        description="Comma-separated sections: ingredients, images, base (default: ingredients)",
+    ),
+    x_user_id: Optional[str] = Header(default=None),
+):
+    """
+    One recipe with the requested sections, built in a single query
+    (recipe_detail.py) and served from the catalog cache after that.
+    """
+    user_id = normalize_user_id(x_user_id)
+    try:
+        sections = recipe_detail.parse_include(include)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
+    with get_conn() as conn:
+        versions = get_versions(conn, SCOPE_RECIPES, favorites_scope(user_id))
+        etag = make_etag(f"recipe{recipe_id}", *versions)
+        headers = cache_headers(etag, per_user=True)
+        if etag_matches(request, etag):
+            return not_modified(headers)
+
+        catalog_cache.refresh(conn, versions[0])
+        key = ("recipe", recipe_id, sections)
+        parts = catalog_cache.get(key)
+        if parts is None:
+            body = recipe_detail.detail_json(conn, recipe_id, sections)
+            if body is None:
+                raise HTTPException(status_code=404, detail="Recipe not found")
+            parts = split_payload(body.encode("utf-8"))
+            base_id = None
+            if "base" in sections:
+                # The embedded base_recipe goes stale with that recipe too
+                base_id = conn.execute(
+                    "SELECT base_recipe_id FROM recipes WHERE id = ?", (recipe_id,)
+                ).fetchone()[0]
+            catalog_cache.put(key, parts, versions[0], depends_on=base_id)
+
+        favorites = catalog_cache.favorites(conn, user_id, versions[1])
+
+    return Response(render_payload(parts, favorites), media_type="application/json", headers=headers)
+
+@router.delete("/recipe/{recipe_id}")
+def delete_recipe(recipe_id: int):
+    with get_write_conn() as conn:
+        cur = conn.cursor()
 
-@app.get("/recipes")
-def list_recipes(x_user_id: Optional[str] = Header(default=None)):
-    user_id = normalize_user_id(x_user_id)
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM recipes ORDER BY id ASC")
-    rows = cur.fetchall()
+        # Delete linked images; their files go once this has committed
+        images = cur.execute(
+            "DELETE FROM recipe_images WHERE recipe_id = ? RETURNING url, variants", (recipe_id,)
+        ).fetchall()
+        # Delete ingredient links
+        cur.execute("DELETE FROM recipe_ingredients WHERE recipe_id = ?", (recipe_id,))
+        # Nobody can favorite a recipe that's gone (idx_user_favorites_recipe)
+        cur.execute("DELETE FROM user_favorites WHERE recipe_id = ?", (recipe_id,))
+        # Delete the recipe itself
+        cur.execute("DELETE FROM recipes WHERE id = ?", (recipe_id,))
+        # Queued by the recipe_ingredients triggers; drops its signature
+        similarity.refresh_recipe(conn, recipe_id)
+
+    for image in images:
+        uploads.uploader.discard(image["url"], image["variants"])
+    pantry_index.remove_recipe(recipe_id)
+    return {"status": "deleted"}
 
-    cur.execute("SELECT recipe_id FROM user_favorites WHERE user_id = ?", (user_id,))
-    fav_ids = {row["recipe_id"] for row in cur.fetchall()}
 
-    conn.close()
+@router.get("/recipe/{recipe_id}/similar")
+def similar_recipes(recipe_id: int, request: Request, limit: int = Query(default=10, ge=1, le=50)):
+    """
+    Recipes with the most ingredients in common, most similar first, each
+    with its estimated Jaccard similarity (similarity.py).
+    """
+    with get_conn() as conn:
+        pending = similarity.has_pending(conn, recipe_id)
+    if pending:
+        # Its ingredients changed outside the write endpoints (an importer
+        # still running); the rest of the queue is left to that run
+        with get_write_conn() as conn:
+            similarity.refresh_recipe(conn, recipe_id)
 
-    recipes = []
-    for r in rows:
-        recipes.append(
-            RecipeOut(
-                id=r["id"],
-                title=r["title"],
-                meal_type=r["meal_type"],
-                category=r["category"] or auto_category(r["title"]),
-                source_type=r["source_type"],
-                is_budget_friendly=bool(r["is_budget_friendly"]),
-                base_recipe_id=r["base_recipe_id"],
-                prep_instructions=r["prep_instructions"],
-                cook_instructions=r["cook_instructions"],
-                is_favorite=(r["id"] in fav_ids),
-                linked_budget=None,
-                linked_chef=None,
-                ingredients=[],
-                source_url=r["source_url"] if "source_url" in r.keys() else None,
-            )
-        )
-    return recipes
+    with get_conn() as conn:
+        versions = get_versions(conn, SCOPE_RECIPES)
+        etag = make_etag(f"similar{recipe_id}-{limit}", *versions)
+        headers = cache_headers(etag, per_user=False)
+        if etag_matches(request, etag):
+            return not_modified(headers)
 
+        if conn.execute("SELECT 1 FROM recipes WHERE id = ?", (recipe_id,)).fetchone() is None:
+            raise HTTPException(status_code=404, detail="Recipe not found")
+        results = similarity.similar(conn, recipe_id, limit)
 
-@app.get("/recipe/{recipe_id}")
-def get_recipe(recipe_id: int, x_user_id: Optional[str] = Header(default=None)):
-    user_id = normalize_user_id(x_user_id)
-    conn = get_conn()
-    cur = conn.cursor()
-
-    # Main recipe row
-    cur.execute("""SELECT * FROM recipes WHERE id = ?""", (recipe_id,))
-    recipe = cur.fetchone()
-    if not recipe:
-        conn.close()
-        raise HTTPException(status_code=404, detail="Recipe not found")
-
-    # Ingredients
-    cur.execute("""
-        SELECT ingredients.name, recipe_ingredients.quantity, recipe_ingredients.unit
-        FROM recipe_ingredients
-        JOIN ingredients ON ingredients.id = recipe_ingredients.ingredient_id
-        WHERE recipe_id = ?
-    """, (recipe_id,))
-    ingredients = [
-        {"name": row["name"], "quantity": row["quantity"], "unit": row["unit"]}
-        for row in cur.fetchall()
-    ]
+    return FastJSONResponse(results, headers=headers)
 
-    # Per-user favorite
-    cur.execute("""
-        SELECT 1 FROM user_favorites
-        WHERE user_id = ? AND recipe_id = ?
-    """, (user_id, recipe_id))
-    is_favorite = cur.fetchone() is not None
-
-    conn.close()
-
-    cat = recipe["category"] if recipe["category"] else auto_category(recipe["title"])
-
-    return RecipeOut(
-        id=recipe["id"],
-        title=recipe["title"],
-        meal_type=recipe["meal_type"],
-        category=recipe["category"] or auto_category(recipe["title"]),
-        source_type=recipe["source_type"],
-        is_budget_friendly=bool(recipe["is_budget_friendly"]),
-        base_recipe_id=recipe["base_recipe_id"],
-        prep_instructions=recipe["prep_instructions"],
-        cook_instructions=recipe["cook_instructions"],
-        is_favorite=is_favorite,
-        linked_budget=None,
-        linked_chef=None,
-        ingredients=ingredients,
-        source_url=recipe["source_url"] if "source_url" in recipe.keys() else None,
-    )
 
-@app.delete("/recipe/{recipe_id}")
-def delete_recipe(recipe_id: int):
-    conn = get_conn()
-    cur = conn.cursor()
-
-    # Delete linked images
-    cur.execute("DELETE FROM recipe_images WHERE recipe_id = ?", (recipe_id,))
-    # Delete ingredient links
-    cur.execute("DELETE FROM recipe_ingredients WHERE recipe_id = ?", (recipe_id,))
-    # Delete the recipe itself
-    cur.execute("DELETE FROM recipes WHERE id = ?", (recipe_id,))
-
-    conn.commit()
-    conn.close()
-    return {"status": "deleted"}
+# -----------------------------------------
+# PANTRY ("What can I cook?")
+# -----------------------------------------
 
+@router.post("/pantry/match")
+def pantry_match(pantry: PantryIn):
+    """
+    Recipes ranked by how much of their ingredient list is in the pantry,
+    each with its coverage (0..1) and the canonical names still missing.
+    """
+    with get_conn() as conn:
+        pantry_index.ensure_fresh(conn)
+
+    results = pantry_index.match(
+        pantry.ingredients,
+        limit=pantry.limit,
+        min_coverage=pantry.min_coverage,
+        include_staples=pantry.include_staples,
+    )
+    return results
 
 
 # -----------------------------------------
 # GROCERY LIST
 # -----------------------------------------
 
-@app.get("/grocery/list", response_model=List[GroceryItemOut])
-def grocery_list(x_user_id: Optional[str] = Header(default=None)):
-    user_id = normalize_user_id(x_user_id)
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT id, ingredient_name, quantity, unit, checked
-        FROM grocery_items
-        WHERE user_id = ?
-        ORDER BY id DESC
-    """, (user_id,))
-    items = cur.fetchall()
-    conn.close()
-
+def grocery_items_out(items) -> List[dict]:
+    # GroceryItemOut-shaped dicts, sent with FastJSONResponse (no per-row models)
     return [
-        GroceryItemOut(
-            id=i["id"],
-            ingredient_name=i["ingredient_name"],
-            quantity=i["quantity"],
-            unit=i["unit"],
-            checked=bool(i["checked"])
-        )
+        {
+            "ingredient_name": i["ingredient_name"],
+            "quantity": i["quantity"],
+            "unit": i["unit"],
+            "id": i["id"],
+            "checked": bool(i["checked"]),
+        }
         for i in items
     ]
 
 
-@app.post("/grocery/add_from_recipe/{recipe_id}")
+@router.get("/grocery/list", response_model=List[GroceryItemOut])
+def grocery_list(request: Request, x_user_id: Optional[str] = Header(default=None)):
+    user_id = normalize_user_id(x_user_id)
+    with get_conn() as conn:
+        etag = make_etag("grocery", *get_versions(conn, grocery_scope(user_id)))
+        headers = cache_headers(etag, per_user=True)
+        if etag_matches(request, etag):
+            return not_modified(headers)
+        items = grocery.list_items(conn, user_id)
+
+    return FastJSONResponse(grocery_items_out(items), headers=headers)
+
+
+@router.post("/grocery/batch")
+def grocery_batch(batch: GroceryBatchIn, x_user_id: Optional[str] = Header(default=None)):
+    """
+    Apply several grocery operations (add / check / uncheck / delete /
+    clear_checked / add_recipes) in one transaction, in order, and return
+    the resulting list so the page doesn't have to fetch it again.
+    """
+    user_id = normalize_user_id(x_user_id)
+
+    for i, op in enumerate(batch.ops):
+        if op.op in ("check", "uncheck", "delete") and op.id is None:
+            raise HTTPException(status_code=400, detail=f"ops[{i}]: '{op.op}' needs an id")
+        if op.op == "add" and not (op.ingredient_name or "").strip():
+            raise HTTPException(status_code=400, detail=f"ops[{i}]: 'add' needs an ingredient_name")
+
+    with get_write_conn() as conn:
+        counts = grocery.apply_batch(conn, user_id, [op.model_dump() for op in batch.ops])
+        items = grocery.list_items(conn, user_id)
+
+    return FastJSONResponse({"status": "ok", **counts, "items": grocery_items_out(items)})
+
+
+@router.post("/grocery/add_from_recipe/{recipe_id}")
 def add_grocery_from_recipe(recipe_id: int, x_user_id: Optional[str] = Header(default=None)):
     """
-    Take all ingredients from a recipe and add them as grocery_items
-    for the current user.
+    Merge all ingredients from a recipe into the current user's grocery
+    list (same ingredient -> one row, quantities summed across units).
     """
     user_id = normalize_user_id(x_user_id)
 
-    conn = get_conn()
-    cur = conn.cursor()
-
-    # Make sure recipe exists
-    cur.execute("SELECT id, title FROM recipes WHERE id = ?", (recipe_id,))
-    recipe = cur.fetchone()
-    if not recipe:
-        conn.close()
-        raise HTTPException(status_code=404, detail="Recipe not found")
-
-    # Pull ingredients for this recipe
-    cur.execute(
-        """
-        SELECT ingredients.name AS ingredient_name,
-               recipe_ingredients.quantity,
-               recipe_ingredients.unit
-        FROM recipe_ingredients
-        JOIN ingredients
-          ON ingredients.id = recipe_ingredients.ingredient_id
-        WHERE recipe_ingredients.recipe_id = ?
-        """,
-        (recipe_id,)
-    )
-    rows = cur.fetchall()
-
-    added = 0
-    for row in rows:
-        cur.execute(
-            """
-            INSERT INTO grocery_items (ingredient_name, quantity, unit, user_id)
-            VALUES (?, ?, ?, ?)
-            """,
-            (row["ingredient_name"], row["quantity"], row["unit"], user_id)
-        )
-        added += 1
+    with get_write_conn() as conn:
+        cur = conn.cursor()
+
+        # Make sure recipe exists
+        cur.execute("SELECT id, title FROM recipes WHERE id = ?", (recipe_id,))
+        recipe = cur.fetchone()
+        if not recipe:
+            raise HTTPException(status_code=404, detail="Recipe not found")
 
-    conn.commit()
-    conn.close()
+        added = grocery.add_recipe(conn, user_id, recipe_id)
 
     return {"status": "ok", "recipe_id": recipe_id, "items_added": added}
 
 
-@app.post("/grocery", response_model=GroceryItemOut)
-def add_grocery(item: GroceryItemIn, x_user_id: Optional[str] = Header(default=None)):
+@router.delete("/grocery/recipe/{recipe_id}")
+def remove_grocery_recipe(recipe_id: int, x_user_id: Optional[str] = Header(default=None)):
+    """
+    Undo add_from_recipe: subtract what this recipe contributed and drop
+    items nothing else needs.
+    """
     user_id = normalize_user_id(x_user_id)
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO grocery_items (ingredient_name, quantity, unit, user_id)
-        VALUES (?, ?, ?, ?)
-    """, (item.ingredient_name, item.quantity, item.unit, user_id))
-    item_id = cur.lastrowid
-    conn.commit()
-    conn.close()
+    with get_write_conn() as conn:
+        touched = grocery.remove_recipe(conn, user_id, recipe_id)
+    return {"status": "ok", "recipe_id": recipe_id, "items_updated": touched}
 
-    return GroceryItemOut(id=item_id, **item.dict(), checked=False)
 
+@router.post("/grocery", response_model=GroceryItemOut)
+def add_grocery(item: GroceryItemIn, x_user_id: Optional[str] = Header(default=None)):
+    user_id = normalize_user_id(x_user_id)
+    with get_write_conn() as conn:
+        item_id = grocery.add_manual_item(conn, user_id, item.ingredient_name, item.quantity, item.unit)
+        row = conn.execute(
+            "SELECT id, ingredient_name, quantity, unit, checked FROM grocery_items WHERE id = ?",
+            (item_id,),
+        ).fetchone()
+
+    return GroceryItemOut(
+        id=row["id"],
+        ingredient_name=row["ingredient_name"],
+        quantity=row["quantity"],
+        unit=row["unit"],
+        checked=bool(row["checked"]),
+    )
 
-@app.post("/grocery/check/{item_id}")
+
+@router.post("/grocery/check/{item_id}")
 def check_item(item_id: int, x_user_id: Optional[str] = Header(default=None)):
     user_id = normalize_user_id(x_user_id)
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        UPDATE grocery_items
-        SET checked = 1
-        WHERE id = ? AND user_id = ?
-    """, (item_id, user_id))
-    conn.commit()
-    conn.close()
+    with get_write_conn() as conn:
+        conn.execute("""
+            UPDATE grocery_items
+            SET checked = 1
+            WHERE id = ? AND user_id = ?
+        """, (item_id, user_id))
     return {"status": "ok"}
 
 
-@app.delete("/grocery/delete/{item_id}")
+@router.delete("/grocery/delete/{item_id}")
 def delete_item(item_id: int, x_user_id: Optional[str] = Header(default=None)):
     user_id = normalize_user_id(x_user_id)
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        DELETE FROM grocery_items
-        WHERE id = ? AND user_id = ?
-    """, (item_id, user_id))
-    conn.commit()
-    conn.close()
+    with get_write_conn() as conn:
+        grocery.delete_item(conn, user_id, item_id)
     return {"status": "deleted"}
 
 
+# -----------------------------------------
+# DELTA SYNC (offline replica in js/api.js)
+# -----------------------------------------
+
+@router.get("/sync")
+def sync(
+    since: Optional[int] = Query(default=None, ge=0, description="Cursor from the previous /sync response"),
+    x_user_id: Optional[str] = Header(default=None),
+):
+    """
+    Recipes, favorites and grocery items changed since the cursor, as their
+    current rows (deletions as ids). Without a cursor (or with one this
+    database never issued) the whole replica is returned with reset=true.
+    Keep calling with the returned cursor while more=true.
+    """
+    user_id = normalize_user_id(x_user_id)
+    with get_conn() as conn:
+        # One read transaction: the rows and the cursor come from the same snapshot
+        conn.execute("BEGIN")
+        return FastJSONResponse(changes.changes_since(conn, user_id, since))
+
+
 # -----------------------------------------
 # IMAGE UPLOAD FOR RECIPES
 # -----------------------------------------
 
-# List images for a recipe
-@app.get("/recipe/{recipe_id}/images")
+# List images for a recipe, each with srcset-ready variants
+# (recipe_detail.py has the shape)
+@router.get("/recipe/{recipe_id}/images")
 def list_recipe_images(recipe_id: int):
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute(
-        "SELECT id, url, caption, created_at FROM recipe_images WHERE recipe_id = ? ORDER BY created_at DESC",
-        (recipe_id,)
-    )
-    rows = cur.fetchall()
-    conn.close()
-    return [
-        {
-            "id": r["id"],
-            "url": r["url"],
-            "caption": r["caption"],
-            "created_at": r["created_at"]
-        }
-        for r in rows
-    ]
+    with get_conn() as conn:
+        body = recipe_detail.images_json(conn, recipe_id)
+    return Response(content=body, media_type="application/json")
+
 
+# Upload a new image with caption: spooled and queued, stored in the
+# background (uploads.py). Poll status_url until status is done / failed.
+@router.post("/recipe/{recipe_id}/upload_image", status_code=202)
+def upload_recipe_image(recipe_id: int, file: UploadFile = File(...), caption: str = ""):
+    with get_conn() as conn:
+        if not conn.execute("SELECT 1 FROM recipes WHERE id = ?", (recipe_id,)).fetchone():
+            raise HTTPException(status_code=404, detail="Recipe not found")
 
-# Upload + register a new image with caption
-@app.post("/recipe/{recipe_id}/upload_image")
-async def upload_recipe_image(recipe_id: int, file: UploadFile = File(...), caption: str = ""):
     try:
-        result = cloudinary.uploader.upload(file.file, overwrite=False)
-        url = result["secure_url"]
+        job_id = uploads.uploader.submit(recipe_id, file.file, file.filename, caption)
+    except uploads.UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except uploads.NotAnImage as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except uploads.UploadsBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
 
-        conn = get_conn()
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT INTO recipe_images (recipe_id, url, caption, created_at) VALUES (?, ?, ?, ?)",
-            (recipe_id, url, caption, datetime.utcnow())
-        )
-        conn.commit()
-        conn.close()
+    return {"job_id": job_id, "status": "queued", "status_url": f"/upload_jobs/{job_id}"}
 
-        return {"url": url}
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/upload_jobs/{job_id}")
+def upload_job_status(job_id: str):
+    job = uploads.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Upload job not found")
+    return job
 
 
 # Delete image
-@app.delete("/recipe/images/{image_id}")
+@router.delete("/recipe/images/{image_id}")
 def delete_recipe_image(image_id: int):
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM recipe_images WHERE id = ?", (image_id,))
-    conn.commit()
-    conn.close()
+    with get_write_conn() as conn:
+        row = conn.execute(
+            "DELETE FROM recipe_images WHERE id = ? RETURNING url, variants", (image_id,)
+        ).fetchone()
+    if row:
+        uploads.uploader.discard(row["url"], row["variants"])
     return {"status": "deleted"}
 
 
 # -----------------------------------------
-# END OF FILE
+# DATABASE MONITORING
 # -----------------------------------------
 
+@router.get("/db/stats", include_in_schema=False)
+def db_stats():
+    """
+    Connection pool counters (reads/writes served, wait time, timeouts,
+    readers open/idle/in use) for each database this process talks to.
+    """
+    return pool_stats()
+
+
+@router.get("/cache/stats", include_in_schema=False)
+def cache_stats():
+    """Catalog cache hits / misses / evictions / invalidations and size."""
+    return catalog_cache.stats()
+
+
+@router.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Request, SQL, pool and cache metrics in Prometheus text format."""
+    return PlainTextResponse(
+        metrics.render(pool_stats(), catalog_cache.stats()),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
+@router.get("/upload/stats", include_in_schema=False)
+def upload_stats():
+    """Storage backend, worker count and uploads still in flight."""
+    return uploads.uploader.stats()
+
+
+app = create_app()
+
+
+# -----------------------------------------
+# END OF FILE
+# -----------------------------------------
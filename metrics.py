@@ -0,0 +1,243 @@
+# -----------------------------------------
+# Ovens Lovin's – request / SQL metrics
+# -----------------------------------------
+#
+# Cheap enough to leave on: a few perf_counter() calls per request and per
+# SQL statement, with nothing allocated per row. main.py's metrics
+# middleware calls begin_request() / end_request(); db.py reports every
+# statement on a pooled connection (execute plus fetches) to
+# observe_statement(), which adds it to the current request.
+#
+# GET /metrics renders everything in Prometheus text format:
+#
+#   http_requests_total{method,route,status}
+#   http_request_duration_seconds{method,route}        histogram
+#   http_request_sql_statements{route}                  histogram
+#   http_request_sql_duration_seconds{route}            histogram
+#   sql_background_statements_total / _duration_seconds_total
+#                                                       (upload workers etc.)
+#   sql_slow_statements_total
+#   db_pool_* / catalog_cache_*                         from their stats()
+#
+# Routes are labelled by their template ("/recipe/{recipe_id}"), never the
+# raw path, so the number of series stays fixed. Statements slower than
+# SLOW_QUERY_MS are logged with their parameters reduced to types.
+
+import logging
+import os
+import re
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+log = logging.getLogger("ovens_lovins.sql")
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values = {}
+
+    def inc(self, key=(), amount=1):
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for key, value in sorted(self._values.items()):
+            yield f"{self.name}{_labels(self.labels, key)} {_number(value)}"
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels, buckets):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}  # key -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, key, value):
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for key, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), series):
+                cumulative += count
+                labels = _labels((*self.labels, "le"), (*key, _number(bound)))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labels, key)} {_number(series[-1])}"
+            yield f"{self.name}_count{_labels(self.labels, key)} {cumulative}"
+
+
+def _number(value) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    escaped = (
+        str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in values
+    )
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, escaped)) + "}"
+
+
+# -----------------------------------------
+# REGISTRY
+# -----------------------------------------
+
+_lock = threading.Lock()
+
+requests_total = Counter(
+    "http_requests_total", "HTTP requests by route and status.", ("method", "route", "status")
+)
+request_seconds = Histogram(
+    "http_request_duration_seconds", "Time to response headers.", ("method", "route"), LATENCY_BUCKETS
+)
+request_statements = Histogram(
+    "http_request_sql_statements", "SQL statements run per request.", ("route",), STATEMENT_BUCKETS
+)
+request_sql_seconds = Histogram(
+    "http_request_sql_duration_seconds", "Time in SQLite per request (execute + fetch).",
+    ("route",), LATENCY_BUCKETS,
+)
+background_statements = Counter(
+    "sql_background_statements_total", "SQL statements outside a request (upload workers etc.)."
+)
+background_seconds = Counter(
+    "sql_background_duration_seconds_total", "Time in SQLite outside a request."
+)
+slow_statements = Counter(
+    "sql_slow_statements_total", f"Statements slower than SLOW_QUERY_MS ({SLOW_QUERY_MS:g} ms)."
+)
+
+REGISTRY = (
+    requests_total, request_seconds, request_statements, request_sql_seconds,
+    background_statements, background_seconds, slow_statements,
+)
+
+
+# -----------------------------------------
+# REQUESTS AND STATEMENTS
+# -----------------------------------------
+
+class RequestStats:
+    __slots__ = ("statements", "sql_seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.sql_seconds = 0.0
+
+
+_current = ContextVar("request_stats", default=None)
+
+
+def begin_request() -> RequestStats:
+    # The object is shared (not copied) with the endpoint's worker thread,
+    # so statements run there are added to it
+    stats = RequestStats()
+    _current.set(stats)
+    return stats
+
+
+def route_label(scope) -> str:
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if "endpoint" in scope:
+        # Static mount: the router only leaves its prefix in root_path
+        return scope["root_path"][len(scope.get("app_root_path", "")):] + "/*"
+    return "unmatched"
+
+
+def end_request(scope, status: int, seconds: float, stats: RequestStats):
+    route = route_label(scope)
+    method = scope.get("method", "")
+    with _lock:
+        requests_total.inc((method, route, str(status)))
+        request_seconds.observe((method, route), seconds)
+        request_statements.observe((route,), stats.statements)
+        request_sql_seconds.observe((route,), stats.sql_seconds)
+
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def redact(sql, params) -> str:
+    """SQL text plus parameter *types* only, never their values."""
+    if params is None:
+        shown = "(many)"
+    elif isinstance(params, dict):
+        shown = "{" + ", ".join(f"{k}: {type(v).__name__}" for k, v in params.items()) + "}"
+    else:
+        shown = "(" + ", ".join(type(v).__name__ for v in params) + ")"
+    return f"{_WHITESPACE.sub(' ', sql or '').strip()[:500]} {shown}"
+
+
+def observe_statement(sql, params, seconds, total, new_statement):
+    stats = _current.get()
+    if stats is not None:
+        stats.statements += new_statement
+        stats.sql_seconds += seconds
+    else:
+        with _lock:
+            background_statements.inc(amount=int(new_statement))
+            background_seconds.inc(amount=seconds)
+
+    threshold = SLOW_QUERY_MS / 1000
+    # Logged once, when the statement's running total crosses the threshold
+    if total >= threshold > total - seconds:
+        with _lock:
+            slow_statements.inc()
+        log.warning("slow query (%.0f ms so far): %s", total * 1000, redact(sql, params))
+
+
+# -----------------------------------------
+# EXPOSITION
+# -----------------------------------------
+
+# stats() keys that only ever go up; the other numbers are gauges
+STATS_COUNTERS = {"reads", "writes", "timeouts", "hits", "misses", "evictions", "invalidations"}
+
+
+def _stats_gauges(prefix, rows, label=None):
+    """Render flat stats() dicts (db.pool_stats(), catalog_cache.stats())."""
+    names = {}
+    for row in rows:
+        key = (row[label],) if label else ()
+        for name, value in row.items():
+            if name != label and isinstance(value, (int, float)):
+                names.setdefault(name, []).append((key, value))
+    for name, series in names.items():
+        counter = name in STATS_COUNTERS or name.endswith("_seconds")
+        metric = f"{prefix}_{name}{'_total' if counter else ''}"
+        yield f"# TYPE {metric} {'counter' if counter else 'gauge'}"
+        for key, value in series:
+            yield f"{metric}{_labels((label,) if label else (), key)} {_number(value)}"
+
+
+def render(pool_stats=(), cache_stats=None) -> str:
+    with _lock:
+        lines = [line for metric in REGISTRY for line in metric.render()]
+    lines += _stats_gauges("db_pool", pool_stats, label="database")
+    if cache_stats:
+        lines += _stats_gauges("catalog_cache", [cache_stats])
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,356 @@
+# -----------------------------------------
+# Ovens Lovin's – schema migrations
+# -----------------------------------------
+#
+# Every schema change lives here, numbered, and the database remembers the
+# last one it ran in PRAGMA user_version. Startup only compares that number
+# against LATEST (one pragma read); the DDL, PRAGMA table_info checks and
+# back-fills run once, either from the offline CLI:
+#
+#   python migrations.py            # apply everything pending
+#   python migrations.py --status   # show current / latest version
+#   python migrations.py --to 4     # stop at a given version
+#
+# or, unless MIGRATE_ON_STARTUP=0, from the app the first time it sees an
+# older database. Each migration runs in its own transaction together with
+# its user_version bump, so an interrupted run resumes where it stopped.
+#
+# Migrations are written to be safe on databases that already have some of
+# their changes (earlier app versions created tables ad hoc at startup).
+# Add new ones at the end; never edit one that has shipped.
+
+import argparse
+import os
+
+import categories
+import changes
+import grocery
+import ingredients
+import recipe_detail
+import recipe_pipeline
+import search
+import similarity
+import uploads
+import versions
+from db import get_conn, get_write_conn
+
+
+class SchemaOutOfDate(RuntimeError):
+    """The database is older than the code and startup migrations are off."""
+
+
+def _columns(conn, table) -> set:
+    return {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _add_columns(conn, table, columns):
+    existing = _columns(conn, table)
+    for column, kind in columns:
+        if column not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {kind}")
+
+
+# -----------------------------------------
+# MIGRATIONS
+# -----------------------------------------
+
+def _base_tables(conn):
+    for statement in (
+        """
+        CREATE TABLE IF NOT EXISTS recipes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            slug TEXT UNIQUE,
+            meal_type TEXT,
+            category TEXT,
+            source_type TEXT,
+            is_budget_friendly INTEGER,
+            base_recipe_id INTEGER,
+            prep_instructions TEXT,
+            cook_instructions TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS ingredients (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS recipe_ingredients (
+            recipe_id INTEGER,
+            ingredient_id INTEGER,
+            quantity TEXT,
+            unit TEXT,
+            FOREIGN KEY(recipe_id) REFERENCES recipes(id),
+            FOREIGN KEY(ingredient_id) REFERENCES ingredients(id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS grocery_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ingredient_name TEXT,
+            quantity TEXT,
+            unit TEXT,
+            checked INTEGER DEFAULT 0
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS user_favorites (
+            user_id TEXT NOT NULL,
+            recipe_id INTEGER NOT NULL,
+            PRIMARY KEY (user_id, recipe_id)
+        )
+        """,
+    ):
+        conn.execute(statement)
+
+    _add_columns(conn, "recipes", [("is_favorite", "INTEGER DEFAULT 0"), ("source_url", "TEXT")])
+    _add_columns(conn, "grocery_items", [("user_id", "TEXT")])
+
+    # Indexes behind the /recipes filters (id last, for keyset paging)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_recipes_meal_type ON recipes (meal_type, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_recipes_category ON recipes (category, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_recipes_source_type ON recipes (source_type, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_recipes_budget ON recipes (is_budget_friendly, id)")
+
+
+def _ingredients(conn):
+    ingredients.ensure_schema(conn)
+    # Parse anything written before the parsed columns existed
+    ingredients.backfill(conn)
+
+
+def _import_files(conn):
+    # Whole-file fingerprints for import_recipes.py
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS import_files (
+            path TEXT PRIMARY KEY,
+            sha1 TEXT NOT NULL,
+            records INTEGER NOT NULL,
+            imported_at TEXT NOT NULL
+        )
+        """
+    )
+
+
+def _favorites_by_recipe(conn):
+    # DELETE /recipes/{id} clears favorites by recipe_id; the PK only covers
+    # user_id first
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_user_favorites_recipe ON user_favorites (recipe_id)")
+
+
+def _orphaned_favorites(conn):
+    # Recipes deleted before DELETE /recipes/{id} cleared their favorites
+    conn.execute("DELETE FROM user_favorites WHERE recipe_id NOT IN (SELECT id FROM recipes)")
+
+
+def _recipe_images(conn):
+    # Older databases were created with image_url / uploaded_at; the API
+    # has always read and written url / created_at
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS recipe_images (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            recipe_id INTEGER,
+            url TEXT,
+            caption TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(recipe_id) REFERENCES recipes(id)
+        )
+        """
+    )
+    existing = _columns(conn, "recipe_images")
+    for old, new in (("image_url", "url"), ("uploaded_at", "created_at")):
+        if old in existing and new not in existing:
+            conn.execute(f"ALTER TABLE recipe_images RENAME COLUMN {old} TO {new}")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_recipe_images_recipe ON recipe_images (recipe_id, id)")
+
+
+def _image_variants(conn):
+    # Original size and the responsive variants (image_variants.py)
+    _add_columns(conn, "recipe_images", [("width", "INTEGER"), ("height", "INTEGER"), ("variants", "TEXT")])
+
+
+def _change_log(conn):
+    changes.ensure_schema(conn)
+    # Start the log with the current catalog, so the first cursor a client
+    # gets is already past it
+    conn.execute(
+        """
+        INSERT OR IGNORE INTO change_log (entity, user_id, entity_id, op)
+        SELECT 'recipe', '', id, 'upsert' FROM recipes ORDER BY id
+        """
+    )
+
+
+def _recipe_detail(conn):
+    recipe_detail.ensure_schema(conn)
+    # Image writes now count as recipe changes (ETags, catalog cache, /sync)
+    versions.ensure_schema(conn)
+    changes.ensure_schema(conn)
+
+
+def _similarity(conn):
+    similarity.ensure_schema(conn)
+    similarity.backfill(conn)
+
+
+def _change_log_triggers(conn):
+    # Recreate the change_log triggers (CREATE TRIGGER IF NOT EXISTS would
+    # keep the old REPLACE-based bodies)
+    names = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND sql LIKE '%INTO change_log%'"
+    ).fetchall()
+    for (name,) in names:
+        conn.execute(f"DROP TRIGGER {name}")
+    changes.ensure_schema(conn)
+
+
+def _reparse_ingredients(conn):
+    ingredients.backfill(conn, reparse=True)
+    # Lines that now parse to a different name queued their recipes
+    similarity.refresh(conn)
+
+
+def _trim_ingredient_names(conn):
+    # sync_recipes.py used to store lines unstripped ("Honey  "); link them
+    # to the stripped name the importer uses
+    untrimmed = "SELECT id FROM ingredients WHERE name != trim(name)"
+    twin = "SELECT j.id FROM ingredients j WHERE j.name = trim(i.name)"
+    # One of each group becomes the stripped name when none has it yet
+    conn.execute(
+        f"""
+        UPDATE ingredients SET name = trim(name)
+        WHERE id IN ({untrimmed})
+          AND NOT EXISTS (SELECT 1 FROM ingredients j WHERE j.name = trim(ingredients.name))
+          AND id = (SELECT min(k.id) FROM ingredients k WHERE trim(k.name) = trim(ingredients.name))
+        """
+    )
+    # A recipe linked to both spellings keeps one link
+    conn.execute(
+        f"""
+        DELETE FROM recipe_ingredients
+        WHERE ingredient_id IN ({untrimmed})
+          AND EXISTS (
+              SELECT 1 FROM recipe_ingredients r2
+              JOIN ingredients i ON i.id = recipe_ingredients.ingredient_id
+              WHERE r2.recipe_id = recipe_ingredients.recipe_id AND r2.ingredient_id = ({twin})
+          )
+        """
+    )
+    conn.execute(
+        f"""
+        UPDATE recipe_ingredients SET ingredient_id = ({twin})
+        FROM ingredients i
+        WHERE i.id = recipe_ingredients.ingredient_id AND i.id IN ({untrimmed})
+        """
+    )
+    conn.execute(f"DELETE FROM ingredients WHERE id IN ({untrimmed})")
+    similarity.refresh(conn)
+
+
+# (version, description, function); versions are 1..N with no gaps
+MIGRATIONS = [
+    (1, "base tables, user_id / source_url columns, recipe filter indexes", _base_tables),
+    (2, "full-text search index and triggers", search.ensure_search_index),
+    (3, "parsed ingredient columns + back-fill", _ingredients),
+    (4, "consolidated grocery list columns and sources", grocery.ensure_schema),
+    (5, "content_hash column, case-insensitive title index", recipe_pipeline.ensure_schema),
+    (6, "import_files fingerprints", _import_files),
+    (7, "user_favorites (recipe_id) index", _favorites_by_recipe),
+    (8, "recipe_images url / created_at columns", _recipe_images),
+    (9, "data_versions counters and triggers (ETags)", versions.ensure_schema),
+    (10, "change_log and triggers (delta sync)", _change_log),
+    (11, "change_log entries for ingredient edits", changes.ensure_schema),
+    (12, "covering indexes for the one-query recipe detail", _recipe_detail),
+    (13, "upload_jobs (background image uploads)", uploads.ensure_schema),
+    (14, "recipe_images width / height / variants", _image_variants),
+    (15, "change_log triggers that work under upserts and INSERT OR IGNORE", _change_log_triggers),
+    (16, "stored category for every recipe (no classifying at read time)", categories.backfill),
+    (17, "MinHash signatures and LSH buckets (similar recipes) + back-fill", _similarity),
+    (18, "re-parse ingredient lines (multipliers, spaced fractions, filler words)", _reparse_ingredients),
+    (19, "merge amount-less grocery rows into their ingredient's row", grocery.merge_amountless),
+    (20, "drop favorites of deleted recipes", _orphaned_favorites),
+    (21, "merge ingredient names stored with surrounding whitespace", _trim_ingredient_names),
+]
+
+LATEST = MIGRATIONS[-1][0]
+
+
+# -----------------------------------------
+# RUNNER
+# -----------------------------------------
+
+def current_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def check_current(conn):
+    """
+    Raise SchemaOutOfDate unless the database is at LATEST. For runs that
+    must not write (--dry-run), so they don't migrate as a side effect.
+    """
+    version = current_version(conn)
+    if version < LATEST:
+        raise SchemaOutOfDate(
+            f"Database schema is at version {version}, the code needs {LATEST}; "
+            "run `python migrations.py` first"
+        )
+
+
+def migrate(conn, target=LATEST, log=None) -> list:
+    """Apply pending migrations up to `target`; returns the versions applied."""
+    applied = []
+    for version, description, apply in MIGRATIONS:
+        if version > target or version <= current_version(conn):
+            continue
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            apply(conn)
+            # PRAGMA doesn't take parameters; version is always an int
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        applied.append(version)
+        if log:
+            log(f"  {version:>3}  {description}")
+    return applied
+
+
+def ensure_current():
+    """
+    Startup check: one PRAGMA read when the schema is current. Migrates an
+    older database in place unless MIGRATE_ON_STARTUP=0, in which case it
+    refuses to start (run `python migrations.py` first).
+    """
+    with get_conn() as conn:
+        version = current_version(conn)
+        if version >= LATEST:
+            return
+        if os.getenv("MIGRATE_ON_STARTUP", "1") == "0":
+            check_current(conn)
+    with get_write_conn() as conn:
+        migrate(conn, log=print)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations to recipes.db.")
+    parser.add_argument("--status", action="store_true", help="show versions, change nothing")
+    parser.add_argument("--to", type=int, default=LATEST, help="stop after this version")
+    args = parser.parse_args()
+
+    with get_write_conn() as conn:
+        version = current_version(conn)
+        if args.status:
+            print(f"Schema version: {version} (latest {LATEST})")
+            for number, description, _ in MIGRATIONS:
+                print(f"  {'x' if number <= version else ' '} {number:>3}  {description}")
+        else:
+            applied = migrate(conn, target=args.to, log=print)
+            print(f"Schema version: {current_version(conn)} ({len(applied)} applied)")
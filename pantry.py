@@ -0,0 +1,220 @@
+# -----------------------------------------
+# Ovens Lovin's – "What can I cook?" pantry matcher
+# -----------------------------------------
+#
+# In-memory inverted index over canonical ingredient names:
+#
+#   postings[name]       -> set of recipe ids that use it
+#   recipe_names[id]     -> set of canonical names the recipe needs
+#   token_names[word]    -> canonical names containing that word
+#
+# A pantry query resolves each pantry item to the canonical names it
+# covers ("onion" covers "yellow onion" and "red onion"), then walks those
+# posting lists once to count hits per recipe. Staples only cover their
+# own exact names: "water" is not "coconut water". No SQL at query time.
+#
+# Writes from other processes (importers, sync scripts, other workers) are
+# picked up through the shared "recipes" counter (versions.py): when it
+# moved, only the recipes logged in change_log (changes.py) since the last
+# check are re-read.
+
+import threading
+from collections import Counter
+
+from changes import latest_seq
+from ingredient_parser import canonical_name
+from versions import SCOPE_RECIPES, get_versions
+
+
+# Assumed to be on hand unless the caller says otherwise
+STAPLES = {"salt", "pepper", "black pepper", "water", "sea salt", "kosher salt"}
+
+# Changed recipes above which ensure_fresh() rebuilds instead of patching
+RELOAD_THRESHOLD = 500
+
+
+class PantryIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.postings = {}
+        self.recipe_names = {}
+        self.token_names = {}
+        self.titles = {}
+        # "recipes" counter and last change_log seq the index reflects;
+        # None until the first load
+        self.version = None
+        self.seq = 0
+
+    # ---- building ----
+
+    def _add(self, recipe_id, title, names):
+        self.titles[recipe_id] = title
+        self.recipe_names[recipe_id] = names
+        for name in names:
+            self.postings.setdefault(name, set()).add(recipe_id)
+            for token in name.split():
+                self.token_names.setdefault(token, set()).add(name)
+
+    def _remove(self, recipe_id):
+        self.titles.pop(recipe_id, None)
+        for name in self.recipe_names.pop(recipe_id, ()):
+            ids = self.postings.get(name)
+            if ids is None:
+                continue
+            ids.discard(recipe_id)
+            if not ids:
+                del self.postings[name]
+                for token in name.split():
+                    names = self.token_names.get(token)
+                    if names is not None:
+                        names.discard(name)
+                        if not names:
+                            del self.token_names[token]
+
+    def _read(self, conn, recipe_ids=None):
+        """{id: (title, canonical names)} for some recipes, or all of them."""
+        recipe_filter = ingredient_filter = ""
+        params = []
+        if recipe_ids is not None:
+            placeholders = ", ".join("?" for _ in recipe_ids)
+            recipe_filter = f"WHERE id IN ({placeholders})"
+            ingredient_filter = f"WHERE ri.recipe_id IN ({placeholders})"
+            params = list(recipe_ids)
+        found = {
+            r["id"]: (r["title"], set())
+            for r in conn.execute(f"SELECT id, title FROM recipes {recipe_filter}", params)
+        }
+        # Canonical names were stored when the ingredients were written;
+        # only rows the back-fill hasn't reached yet need parsing here.
+        rows = conn.execute(
+            f"""
+            SELECT ri.recipe_id, c.name AS canonical, i.name
+            FROM recipe_ingredients ri
+            JOIN ingredients i ON i.id = ri.ingredient_id
+            LEFT JOIN canonical_ingredients c ON c.id = ri.canonical_id
+            {ingredient_filter}
+            """,
+            params,
+        )
+        for r in rows:
+            name = r["canonical"] or canonical_name(r["name"])
+            if name and r["recipe_id"] in found:
+                found[r["recipe_id"]][1].add(name)
+        return found
+
+    def load(self, conn):
+        """Full rebuild from the database."""
+        # Read first: a write landing in between is replayed next time,
+        # which is harmless
+        version, seq = get_versions(conn, SCOPE_RECIPES)[0], latest_seq(conn)
+        recipes = self._read(conn)
+
+        with self._lock:
+            self.postings.clear()
+            self.recipe_names.clear()
+            self.token_names.clear()
+            self.titles.clear()
+            for recipe_id, (title, names) in recipes.items():
+                self._add(recipe_id, title, names)
+            self.version, self.seq = version, seq
+
+    def ensure_fresh(self, conn):
+        """Catch up with writes made behind our back (any process)."""
+        if self.version is None:
+            self.load(conn)
+            return
+        version = get_versions(conn, SCOPE_RECIPES)[0]
+        if version == self.version:
+            return
+        rows = conn.execute(
+            """
+            SELECT seq, entity_id FROM change_log
+            WHERE user_id = '' AND entity = 'recipe' AND seq > ?
+            ORDER BY seq
+            """,
+            (self.seq,),
+        ).fetchall()
+        changed = {r["entity_id"] for r in rows}
+        if len(changed) > RELOAD_THRESHOLD:
+            # A bulk import: one full read beats thousands of lookups
+            self.load(conn)
+            return
+        recipes = self._read(conn, changed) if changed else {}
+
+        with self._lock:
+            for recipe_id in changed:
+                self._remove(recipe_id)
+                if recipe_id in recipes:
+                    title, names = recipes[recipe_id]
+                    self._add(recipe_id, title, names)
+            self.version = max(self.version, version)
+            if rows:
+                self.seq = max(self.seq, rows[-1]["seq"])
+
+    # ---- incremental updates from the write paths ----
+
+    def add_recipe(self, recipe_id, title, ingredient_lines):
+        names = {canonical_name(line) for line in ingredient_lines}
+        names.discard("")
+        with self._lock:
+            self._remove(recipe_id)
+            self._add(recipe_id, title, names)
+
+    def remove_recipe(self, recipe_id):
+        with self._lock:
+            self._remove(recipe_id)
+
+    # ---- querying ----
+
+    def covered_names(self, pantry_items, include_staples=True):
+        """Canonical names covered by a list of free-text pantry items."""
+        covered = set()
+        if include_staples:
+            # Exact names only: "pepper" must not cover "cayenne pepper"
+            covered |= STAPLES & self.postings.keys()
+        for name in (canonical_name(item) for item in pantry_items):
+            if not name:
+                continue
+            tokens = name.split()
+            candidates = self.token_names.get(tokens[0], set())
+            for token in tokens[1:]:
+                candidates = candidates & self.token_names.get(token, set())
+            covered |= candidates
+        return covered
+
+    def match(self, pantry_items, limit=20, min_coverage=0.0, include_staples=True):
+        """
+        Recipes ranked by the fraction of their ingredients on hand, with
+        what's missing. Ties go to the recipe needing fewer ingredients.
+        """
+        with self._lock:
+            covered = self.covered_names(pantry_items, include_staples)
+
+            hits = Counter()
+            for name in covered:
+                hits.update(self.postings.get(name, ()))
+
+            ranked = []
+            for recipe_id, have in hits.items():
+                total = len(self.recipe_names[recipe_id])
+                coverage = have / total
+                if coverage >= min_coverage:
+                    ranked.append((coverage, -total, recipe_id, have))
+            ranked.sort(reverse=True)
+
+            results = []
+            for coverage, neg_total, recipe_id, have in ranked[:limit]:
+                results.append(
+                    {
+                        "id": recipe_id,
+                        "title": self.titles[recipe_id],
+                        "coverage": round(coverage, 3),
+                        "have": have,
+                        "total": -neg_total,
+                        "missing": sorted(self.recipe_names[recipe_id] - covered),
+                    }
+                )
+            return results
+
+
+pantry_index = PantryIndex()
@@ -0,0 +1,140 @@
+# -----------------------------------------
+# Ovens Lovin's – recipe detail in one statement
+# -----------------------------------------
+#
+# GET /recipe/{id} used to run a query per section and the recipe page
+# then fetched /recipe/{id}/images separately. detail_json() builds the
+# whole payload in one SELECT with SQLite's JSON functions: the recipe
+# row plus whichever sections were asked for
+#
+#   ingredients   [{name, quantity, unit}, ...] in entry order
+#   images        [{id, url, caption, created_at, width, height, src,
+#                   sources: [{type, srcset}, ...]}, ...] newest first
+#   base          base_recipe: {id, title, meal_type, category, source_type}
+#
+# Each section is a correlated subquery answered from a covering index
+# (images also read their variants column from the table).
+# is_favorite is left as a placeholder the catalog cache fills in per user
+# (catalog_cache.py), so the same payload serves everyone.
+
+from typing import Optional
+
+from catalog_cache import favorite_flag
+
+SECTIONS = ("ingredients", "images", "base")
+DEFAULT_SECTIONS = ("ingredients",)
+
+INDEXES = [
+    # Ingredient section and the search triggers' group_concat; replaces
+    # the plain (recipe_id) index
+    """
+    CREATE INDEX IF NOT EXISTS idx_recipe_ingredients_detail
+    ON recipe_ingredients (recipe_id, ingredient_id, quantity, unit)
+    """,
+    "DROP INDEX IF EXISTS idx_recipe_ingredients_recipe",
+    """
+    CREATE INDEX IF NOT EXISTS idx_recipe_images_detail
+    ON recipe_images (recipe_id, created_at, id, url, caption)
+    """,
+    "DROP INDEX IF EXISTS idx_recipe_images_recipe",
+]
+
+
+def ensure_schema(conn):
+    for statement in INDEXES:
+        conn.execute(statement)
+
+
+def _images_sql(recipe_id_sql: str) -> str:
+    # src: the largest JPEG variant up to 640px, else the original.
+    # sources: one {type, srcset} per format, WebP first, for <picture>.
+    # Variants come from image_variants.py; older photos have none.
+    return f"""
+            SELECT json_group_array(json_object(
+                'id', im.id, 'url', im.url, 'caption', im.caption, 'created_at', im.created_at,
+                'width', im.width, 'height', im.height,
+                'src', coalesce((
+                    SELECT json_extract(v.value, '$.url') FROM json_each(im.variants) v
+                    WHERE json_extract(v.value, '$.type') = 'image/jpeg'
+                    ORDER BY json_extract(v.value, '$.width') <= 640 DESC, json_extract(v.value, '$.width') DESC
+                    LIMIT 1
+                ), im.url),
+                'sources', json((
+                    SELECT json_group_array(json_object('type', type, 'srcset', srcset)) FROM (
+                        SELECT json_extract(v.value, '$.type') AS type,
+                               group_concat(json_extract(v.value, '$.url') || ' '
+                                            || json_extract(v.value, '$.width') || 'w', ', ') AS srcset
+                        FROM json_each(im.variants) v GROUP BY 1 ORDER BY 1 DESC
+                    )
+                ))))
+            FROM (SELECT id, url, caption, created_at, width, height, variants FROM recipe_images
+                  WHERE recipe_id = {recipe_id_sql} ORDER BY created_at DESC) im"""
+
+
+# Subquery results lose their JSON type, hence json(...) around each one
+_SECTION_SQL = {
+    "ingredients": """
+        'ingredients', json((
+            SELECT json_group_array(json_object('name', i.name, 'quantity', ri.quantity, 'unit', ri.unit))
+            FROM (SELECT ingredient_id, quantity, unit FROM recipe_ingredients
+                  WHERE recipe_id = r.id ORDER BY rowid) ri
+            JOIN ingredients i ON i.id = ri.ingredient_id
+        ))""",
+    "images": f"""
+        'images', json(({_images_sql("r.id")}))""",
+    "base": """
+        'base_recipe', json((
+            SELECT json_object(
+                'id', b.id, 'title', b.title, 'meal_type', b.meal_type,
+                'category', b.category, 'source_type', b.source_type)
+            FROM recipes b WHERE b.id = r.base_recipe_id
+        ))""",
+}
+
+
+def parse_include(include: Optional[str]) -> tuple:
+    """Sections named in ?include= (comma-separated), in SECTIONS order."""
+    if include is None:
+        return DEFAULT_SECTIONS
+    wanted = {s.strip() for s in include.split(",") if s.strip()}
+    unknown = wanted - set(SECTIONS)
+    if unknown:
+        raise ValueError(f"Unknown section(s): {', '.join(sorted(unknown))}")
+    return tuple(s for s in SECTIONS if s in wanted)
+
+
+def detail_sql(sections) -> str:
+    # Keys in RecipeOut order; new sections go at the end
+    fields = [
+        "'id', r.id",
+        "'title', r.title",
+        "'meal_type', r.meal_type",
+        "'category', r.category",
+        "'source_type', r.source_type",
+        "'is_budget_friendly', json(CASE WHEN r.is_budget_friendly THEN 'true' ELSE 'false' END)",
+        "'base_recipe_id', r.base_recipe_id",
+        "'prep_instructions', r.prep_instructions",
+        "'cook_instructions', r.cook_instructions",
+        "'is_favorite', ?",
+        "'linked_budget', NULL",
+        "'linked_chef', NULL",
+    ]
+    # RecipeOut always has ingredients: [] when the section wasn't asked for
+    if "ingredients" in sections:
+        fields.append(_SECTION_SQL["ingredients"].strip())
+    else:
+        fields.append("'ingredients', json('[]')")
+    fields.append("'source_url', r.source_url")
+    fields += [_SECTION_SQL[s].strip() for s in sections if s != "ingredients"]
+    return f"SELECT json_object({', '.join(fields)}) FROM recipes r WHERE r.id = ?"
+
+
+def detail_json(conn, recipe_id: int, sections=DEFAULT_SECTIONS) -> Optional[str]:
+    """The recipe as JSON text with an is_favorite placeholder, or None if it doesn't exist."""
+    row = conn.execute(detail_sql(sections), (favorite_flag(recipe_id), recipe_id)).fetchone()
+    return row[0] if row else None
+
+
+def images_json(conn, recipe_id: int) -> str:
+    """The recipe's images section on its own, as JSON text ([] if none)."""
+    return conn.execute(f"SELECT json(({_images_sql('?')}))", (recipe_id,)).fetchone()[0]
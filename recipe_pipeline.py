@@ -0,0 +1,142 @@
+# -----------------------------------------
+# Ovens Lovin's – recipe ingestion pipeline
+# -----------------------------------------
+#
+# The one way a recipe gets written: POST /recipes and import_recipes.py
+# both go through create_recipe(), so validation, categorization, slugs
+# and ingredient linking behave the same whichever door a recipe came in
+# through. Runs inside the caller's transaction.
+
+from typing import Iterable, Optional, Tuple
+
+from categories import auto_category
+from ingredients import link_ingredients
+
+
+SCHEMA_COLUMNS = [
+    # Fingerprint of the source record an importer built this recipe from;
+    # lets a re-import skip recipes that haven't changed
+    ("content_hash", "TEXT"),
+]
+
+INDEXES = [
+    # Duplicate checks match titles case-insensitively
+    "CREATE INDEX IF NOT EXISTS idx_recipes_title_nocase ON recipes (title COLLATE NOCASE)",
+    "CREATE INDEX IF NOT EXISTS idx_recipes_content_hash ON recipes (content_hash)",
+]
+
+
+def ensure_schema(conn):
+    """Columns and indexes create_recipe() writes to (see migrations.py)."""
+    existing = {row["name"] for row in conn.execute("PRAGMA table_info(recipes)")}
+    for column, kind in SCHEMA_COLUMNS:
+        if column not in existing:
+            conn.execute(f"ALTER TABLE recipes ADD COLUMN {column} {kind}")
+    for statement in INDEXES:
+        conn.execute(statement)
+
+
+class InvalidRecipe(ValueError):
+    """The recipe can't be stored as given (e.g. it has no title)."""
+
+
+def slugify(title: str) -> str:
+    return (
+        (title or "").strip()
+        .lower()
+        .replace(" ", "-")
+        .replace("'", "")
+        .replace("\"", "")
+    )
+
+
+def unique_slug(conn, title: str) -> Optional[str]:
+    """
+    Slug for `title` that no recipe uses yet: "beef-wellington", then
+    "beef-wellington-2", "-3", ... One indexed range lookup fetches the
+    base slug and all its numbered variants, whatever the collision count.
+    """
+    base = slugify(title)
+    if not base:
+        return None
+
+    # slug >= 'base-' AND slug < 'base.' is LIKE 'base-%', but stays on
+    # the case-sensitive UNIQUE index ('.' sorts right after '-')
+    taken = {
+        row[0]
+        for row in conn.execute(
+            "SELECT slug FROM recipes WHERE slug = ? OR (slug >= ? AND slug < ?)",
+            (base, base + "-", base + "."),
+        )
+    }
+    if base not in taken:
+        return base
+
+    suffix = 2
+    while f"{base}-{suffix}" in taken:
+        suffix += 1
+    return f"{base}-{suffix}"
+
+
+def clean_ingredients(items) -> list:
+    """(name, quantity, unit) tuples; plain strings are whole lines. Junk is dropped."""
+    cleaned = []
+    for item in items or ():
+        if isinstance(item, str):
+            item = (item, None, None)
+        elif not isinstance(item, (tuple, list)) or len(item) != 3:
+            continue
+        name, quantity, unit = item
+        if isinstance(name, str) and name.strip():
+            cleaned.append((name.strip(), quantity or None, unit or None))
+    return cleaned
+
+
+def create_recipe(
+    conn,
+    title: str,
+    *,
+    meal_type: Optional[str] = None,
+    category: Optional[str] = None,
+    source_type: Optional[str] = None,
+    is_budget_friendly: bool = False,
+    base_recipe_id: Optional[int] = None,
+    prep_instructions: str = "",
+    cook_instructions: str = "",
+    source_url: Optional[str] = None,
+    content_hash: Optional[str] = None,
+    ingredients: Iterable[Tuple[str, Optional[str], Optional[str]]] = (),
+) -> int:
+    """
+    Validate, categorize, slug and insert a recipe, then link its
+    ingredients. Returns the new recipe id. Raises InvalidRecipe.
+    """
+    title = (title or "").strip()
+    if not title:
+        raise InvalidRecipe("Recipe title is required")
+
+    cur = conn.execute(
+        """
+        INSERT INTO recipes
+            (title, slug, meal_type, category, source_type, is_budget_friendly,
+             base_recipe_id, prep_instructions, cook_instructions, source_url,
+             content_hash)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (
+            title,
+            unique_slug(conn, title),
+            meal_type,
+            category or auto_category(title),
+            source_type or "custom",
+            1 if is_budget_friendly else 0,
+            base_recipe_id,
+            prep_instructions or "",
+            cook_instructions or "",
+            source_url,
+            content_hash,
+        ),
+    )
+    recipe_id = cur.lastrowid
+    link_ingredients(conn, recipe_id, clean_ingredients(ingredients))
+    return recipe_id
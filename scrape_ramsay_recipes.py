@@ -1,20 +1,59 @@
+# -----------------------------------------
+# Ovens Lovin's – recipe page scraper
+# -----------------------------------------
+#
+# Fills in ingredients / instructions for recipes.json entries that only
+# have a URL. Pages are fetched concurrently (asyncio + httpx) but politely:
+#
+#   - at most --concurrency requests in flight
+#   - a token bucket per host (--rate requests/sec, bursts of --burst)
+#   - an on-disk HTTP cache (CACHE_DIR); re-runs send If-None-Match /
+#     If-Modified-Since and reuse the cached page on 304
+#   - each parsed page is appended to CHECKPOINT_PATH (NDJSON) as soon as
+#     it's done, so a crash loses nothing and a re-run picks up where it
+#     stopped
+#
+# recipes.json is rewritten once at the end (atomically). The checkpoint
+# file can also be fed straight to import_recipes.py.
+#
+#   python scrape_ramsay_recipes.py [--concurrency 4] [--rate 1] [--parser lxml]
+
+import argparse
+import asyncio
+import hashlib
 import json
+import os
 import time
 from pathlib import Path
+from urllib.parse import urlsplit
 
-import requests
+import httpx
 from bs4 import BeautifulSoup
 
 BASE_DIR = Path(__file__).parent
 JSON_PATH = BASE_DIR / "recipes.json"
+CHECKPOINT_PATH = BASE_DIR / "recipes.scraped.ndjson"
+CACHE_DIR = BASE_DIR / ".scrape_cache"
+
+USER_AGENT = "OvensLovinsBot/1.0 (+recipe import)"
+MAX_RETRIES = 3
+
 
+def default_parser() -> str:
+    """lxml is several times faster than the pure-Python parser; use it if installed."""
+    try:
+        import lxml  # noqa: F401
+        return "lxml"
+    except ImportError:
+        return "html.parser"
 
-def parse_recipe_page(html: str):
+
+def parse_recipe_page(html: str, parser: str = "html.parser"):
     """
     Try to extract ingredients list and instructions list
     from a Gordon Ramsay recipe page.
     """
-    soup = BeautifulSoup(html, "html.parser")
+    soup = BeautifulSoup(html, parser)
 
     ingredients = []
     instructions = []
@@ -46,53 +85,261 @@ def parse_recipe_page(html: str):
     return ingredients, instructions
 
 
-def main():
-    with open(JSON_PATH, "r", encoding="utf-8") as f:
-        recipes = json.load(f)
+# -----------------------------------------
+# RATE LIMITING
+# -----------------------------------------
 
-    updated = 0
-    skipped = 0
+class TokenBucket:
+    """`rate` tokens per second, holding at most `burst`."""
 
-    for r in recipes:
-        title = (r.get("title") or "").strip()
-        url = r.get("url")
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
 
-        if not url:
-            skipped += 1
-            continue
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
 
-        # Skip ones that already have data
-        if r.get("ingredients") or r.get("instructions"):
-            skipped += 1
-            continue
 
-        print(f"Fetching: {title} -> {url}")
-        try:
-            resp = requests.get(url, timeout=15)
-            resp.raise_for_status()
-        except Exception as e:
-            print(f"  !! Failed to fetch: {e}")
-            skipped += 1
-            continue
+class HostLimiter:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+
+    async def wait(self, url: str):
+        host = urlsplit(url).netloc
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(self.rate, self.burst)
+        await self.buckets[host].acquire()
+
 
-        ingredients, instructions = parse_recipe_page(resp.text)
+# -----------------------------------------
+# HTTP CACHE
+# -----------------------------------------
 
-        if not ingredients and not instructions:
-            print("  !! Could not parse ingredients/instructions")
-            skipped += 1
+class HttpCache:
+    """
+    One body file + one JSON metadata file per URL. Only validators are
+    kept (ETag / Last-Modified); every use is revalidated with the server.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return self.directory / f"{key}.html", self.directory / f"{key}.json"
+
+    def validators(self, url) -> dict:
+        body_path, meta_path = self._paths(url)
+        if not (body_path.exists() and meta_path.exists()):
+            return {}
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def load(self, url) -> str:
+        return self._paths(url)[0].read_text(encoding="utf-8")
+
+    def store(self, url, response: httpx.Response):
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not (etag or last_modified):
+            return
+        body_path, meta_path = self._paths(url)
+        body_path.write_text(response.text, encoding="utf-8")
+        meta_path.write_text(
+            json.dumps({"url": url, "etag": etag, "last_modified": last_modified}),
+            encoding="utf-8",
+        )
+
+
+async def fetch(client: httpx.AsyncClient, url: str, limiter: HostLimiter, cache: HttpCache):
+    """(html, from_cache). Retries 429/5xx with backoff, honouring Retry-After."""
+    for attempt in range(MAX_RETRIES + 1):
+        await limiter.wait(url)
+        headers = cache.validators(url)
+        resp = await client.get(url, headers=headers)
+
+        if resp.status_code == 304 and headers:
+            return cache.load(url), True
+        if resp.status_code == 429 or resp.status_code >= 500:
+            if attempt == MAX_RETRIES:
+                resp.raise_for_status()
+            retry_after = resp.headers.get("Retry-After", "")
+            await asyncio.sleep(float(retry_after) if retry_after.isdigit() else 2 ** attempt)
             continue
 
-        r["ingredients"] = ingredients
-        r["instructions"] = instructions
-        updated += 1
+        resp.raise_for_status()
+        cache.store(url, resp)
+        return resp.text, False
+
 
-        # Be polite to the site – short pause
-        time.sleep(1)
+# -----------------------------------------
+# CHECKPOINTS
+# -----------------------------------------
 
-    with open(JSON_PATH, "w", encoding="utf-8") as f:
+def load_checkpoint(path: Path) -> dict:
+    """url -> scraped record, from earlier (possibly interrupted) runs."""
+    done = {}
+    if path.exists():
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash mid-write leaves at most one torn last line
+                    continue
+                done[record["url"]] = record
+    return done
+
+
+def merge_into(json_path: Path, scraped: dict) -> int:
+    """Copy scraped ingredients / instructions into recipes.json; atomic rewrite."""
+    with open(json_path, "r", encoding="utf-8") as f:
+        recipes = json.load(f)
+
+    merged = 0
+    for r in recipes:
+        found = scraped.get(r.get("url"))
+        if found and not (r.get("ingredients") or r.get("instructions")):
+            r["ingredients"] = found["ingredients"]
+            r["instructions"] = found["instructions"]
+            merged += 1
+
+    tmp = json_path.with_suffix(".json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
         json.dump(recipes, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, json_path)
+    return merged
+
+
+# -----------------------------------------
+# MAIN
+# -----------------------------------------
+
+async def scrape(
+    recipes,
+    *,
+    concurrency=4,
+    rate=1.0,
+    burst=2,
+    parser=None,
+    cache_dir=CACHE_DIR,
+    checkpoint_path=CHECKPOINT_PATH,
+    timeout=15.0,
+) -> dict:
+    parser = parser or default_parser()
+    done = load_checkpoint(checkpoint_path)
+    todo = [
+        r for r in recipes
+        if r.get("url")
+        and not (r.get("ingredients") or r.get("instructions"))
+        and r["url"] not in done
+    ]
+    stats = {"fetched": 0, "cached": 0, "failed": 0, "unparsed": 0, "resumed": len(done)}
+
+    limiter = HostLimiter(rate, burst)
+    cache = HttpCache(cache_dir)
+    semaphore = asyncio.Semaphore(concurrency)
+    write_lock = asyncio.Lock()
+
+    with open(checkpoint_path, "a", encoding="utf-8") as out:
+
+        async def worker(client, r):
+            title = (r.get("title") or "").strip()
+            url = r["url"]
+            async with semaphore:
+                try:
+                    html, from_cache = await fetch(client, url, limiter, cache)
+                except (httpx.HTTPError, OSError) as e:
+                    print(f"  !! Failed to fetch {title}: {e}")
+                    stats["failed"] += 1
+                    return
+
+            # Parsing is CPU-bound; keep it off the event loop
+            ingredients, instructions = await asyncio.to_thread(parse_recipe_page, html, parser)
+            stats["cached" if from_cache else "fetched"] += 1
+            if not ingredients and not instructions:
+                print(f"  !! Could not parse ingredients/instructions: {title}")
+                stats["unparsed"] += 1
+                return
+
+            record = {"title": title, "url": url, "ingredients": ingredients, "instructions": instructions}
+            async with write_lock:
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+            done[url] = record
+            print(f"Fetched: {title}{' (cached)' if from_cache else ''}")
+
+        async with httpx.AsyncClient(
+            timeout=timeout,
+            follow_redirects=True,
+            headers={"User-Agent": USER_AGENT},
+            limits=httpx.Limits(max_connections=concurrency),
+        ) as client:
+            await asyncio.gather(*(worker(client, r) for r in todo))
+
+    stats["scraped"] = done
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape missing recipe details into recipes.json.")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=1.0, help="requests per second per host")
+    parser.add_argument("--burst", type=int, default=2)
+    parser.add_argument("--parser", choices=["html.parser", "lxml", "html5lib"], default=None,
+                        help="BeautifulSoup backend (default: lxml if installed)")
+    parser.add_argument("--json", default=str(JSON_PATH))
+    parser.add_argument("--checkpoint", default=str(CHECKPOINT_PATH))
+    parser.add_argument("--cache-dir", default=str(CACHE_DIR))
+    parser.add_argument("--no-merge", action="store_true", help="only write the NDJSON checkpoint")
+    args = parser.parse_args()
+
+    json_path = Path(args.json)
+    with open(json_path, "r", encoding="utf-8") as f:
+        recipes = json.load(f)
+
+    start = time.perf_counter()
+    stats = asyncio.run(
+        scrape(
+            recipes,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            burst=args.burst,
+            parser=args.parser,
+            cache_dir=Path(args.cache_dir),
+            checkpoint_path=Path(args.checkpoint),
+        )
+    )
+    seconds = time.perf_counter() - start
 
-    print(f"Updated: {updated}, skipped: {skipped}")
+    updated = 0 if args.no_merge else merge_into(json_path, stats["scraped"])
+    print(
+        f"Updated: {updated}, fetched: {stats['fetched']}, from cache: {stats['cached']}, "
+        f"failed: {stats['failed']}, unparsed: {stats['unparsed']}, "
+        f"resumed from checkpoint: {stats['resumed']} ({seconds:.1f}s)"
+    )
 
 
 if __name__ == "__main__":
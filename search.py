@@ -0,0 +1,200 @@
+# -----------------------------------------
+# Ovens Lovin's – full-text recipe search (SQLite FTS5)
+# -----------------------------------------
+#
+# recipes_fts holds one row per recipe (rowid = recipes.id) with the title,
+# all ingredient lines and the prep instructions. Triggers on recipes and
+# recipe_ingredients keep it in sync, so every write path (API, importers,
+# sync scripts) updates the index without knowing it exists.
+#
+# Rewriting a recipe's FTS row re-tokenizes the whole document, so bulk
+# ingredient writers wrap themselves in held_ingredients(): the per-row
+# triggers skip recipes listed in recipes_fts_hold, and the row is rebuilt
+# once when the hold is released.
+
+import html
+import re
+from contextlib import contextmanager
+
+
+# Concatenated ingredient lines for one recipe, used by the triggers below
+_INGREDIENTS_OF = """
+    (SELECT group_concat(i.name, ' ')
+     FROM recipe_ingredients ri
+     JOIN ingredients i ON i.id = ri.ingredient_id
+     WHERE ri.recipe_id = {recipe_id})
+"""
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS recipes_fts_hold (
+        recipe_id INTEGER PRIMARY KEY
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS recipes_fts USING fts5(
+        title,
+        ingredients,
+        prep_instructions,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS recipes_fts_ai AFTER INSERT ON recipes BEGIN
+        INSERT INTO recipes_fts (rowid, title, ingredients, prep_instructions)
+        VALUES (new.id, new.title, {_INGREDIENTS_OF.format(recipe_id="new.id")}, new.prep_instructions);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS recipes_fts_au AFTER UPDATE OF title, prep_instructions ON recipes BEGIN
+        UPDATE recipes_fts
+        SET title = new.title, prep_instructions = new.prep_instructions
+        WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS recipes_fts_ad AFTER DELETE ON recipes BEGIN
+        DELETE FROM recipes_fts WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS recipes_fts_ri_ai AFTER INSERT ON recipe_ingredients
+    WHEN new.recipe_id NOT IN (SELECT recipe_id FROM recipes_fts_hold) BEGIN
+        UPDATE recipes_fts
+        SET ingredients = {_INGREDIENTS_OF.format(recipe_id="new.recipe_id")}
+        WHERE rowid = new.recipe_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS recipes_fts_ri_ad AFTER DELETE ON recipe_ingredients
+    WHEN old.recipe_id NOT IN (SELECT recipe_id FROM recipes_fts_hold) BEGIN
+        UPDATE recipes_fts
+        SET ingredients = {_INGREDIENTS_OF.format(recipe_id="old.recipe_id")}
+        WHERE rowid = old.recipe_id;
+    END
+    """,
+]
+
+# Triggers whose definition changed since they were first created; dropped
+# and re-created by ensure_search_index() when the stored SQL differs
+_TRIGGERS = ("recipes_fts_ri_ai", "recipes_fts_ri_ad")
+
+REBUILD = f"""
+    INSERT INTO recipes_fts (rowid, title, ingredients, prep_instructions)
+    SELECT r.id, r.title, {_INGREDIENTS_OF.format(recipe_id="r.id")}, r.prep_instructions
+    FROM recipes r
+"""
+
+# Column weights for bm25(): title hits matter most, then ingredients
+BM25_WEIGHTS = (10.0, 4.0, 1.0)
+
+# Highlight markers that cannot appear in recipe text; swapped for <mark>
+# after the text has been HTML-escaped.
+_OPEN, _CLOSE = "\x02", "\x03"
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def ensure_search_index(conn):
+    """
+    Create the FTS table and triggers, and (re)fill the index if it has
+    drifted from the recipes table (first run, or a DB restored from backup).
+    """
+    for name in _TRIGGERS:
+        stored = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?", (name,)
+        ).fetchone()
+        wanted = next(s for s in SCHEMA if f" {name} " in s)
+        if stored and " ".join(stored[0].split()) != " ".join(wanted.replace("IF NOT EXISTS ", "").split()):
+            conn.execute(f"DROP TRIGGER {name}")
+    for statement in SCHEMA:
+        conn.execute(statement)
+
+    indexed = conn.execute("SELECT count(*) FROM recipes_fts").fetchone()[0]
+    total = conn.execute("SELECT count(*) FROM recipes").fetchone()[0]
+    if indexed != total:
+        conn.execute("DELETE FROM recipes_fts")
+        conn.execute(REBUILD)
+
+
+@contextmanager
+def held_ingredients(conn, *recipe_ids):
+    """
+    Write many recipe_ingredients rows for these recipes, then update each
+    one's search row once instead of once per row.
+    """
+    params = [(recipe_id,) for recipe_id in recipe_ids]
+    conn.executemany("INSERT OR IGNORE INTO recipes_fts_hold (recipe_id) VALUES (?)", params)
+    try:
+        yield
+    finally:
+        conn.executemany("DELETE FROM recipes_fts_hold WHERE recipe_id = ?", params)
+    conn.executemany(
+        f"UPDATE recipes_fts SET ingredients = {_INGREDIENTS_OF.format(recipe_id='?1')} WHERE rowid = ?1",
+        params,
+    )
+
+
+def build_match_query(text: str, prefix: bool = True) -> str:
+    """
+    Turn free text from the search box into a safe FTS5 MATCH expression.
+
+    Every word is quoted (so FTS operators in user input are inert) and all
+    words must match. With prefix=True the last word matches as a prefix,
+    which is what search-as-you-type wants: "chick" finds "chicken".
+    """
+    tokens = _TOKEN_RE.findall(text or "")
+    if not tokens:
+        return ""
+    terms = [f'"{t}"' for t in tokens]
+    if prefix:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+def _marked(text):
+    if text is None:
+        return None
+    return html.escape(text).replace(_OPEN, "<mark>").replace(_CLOSE, "</mark>")
+
+
+def search_recipes(conn, text: str, limit: int = 20, prefix: bool = True) -> list:
+    """
+    BM25-ranked matches with highlighted title and a short snippet from
+    whichever column matched best. Highlights are <mark> tags inside
+    otherwise HTML-escaped text.
+    """
+    query = build_match_query(text, prefix=prefix)
+    if not query:
+        return []
+
+    rows = conn.execute(
+        f"""
+        SELECT r.id, r.title, r.meal_type, r.category, r.source_type,
+               highlight(recipes_fts, 0, '{_OPEN}', '{_CLOSE}') AS title_html,
+               snippet(recipes_fts, -1, '{_OPEN}', '{_CLOSE}', '…', 12) AS snippet,
+               bm25(recipes_fts, ?, ?, ?) AS score
+        FROM recipes_fts
+        JOIN recipes r ON r.id = recipes_fts.rowid
+        WHERE recipes_fts MATCH ?
+        ORDER BY score
+        LIMIT ?
+        """,
+        (*BM25_WEIGHTS, query, limit),
+    ).fetchall()
+
+    return [
+        {
+            "id": r["id"],
+            "title": r["title"],
+            "meal_type": r["meal_type"],
+            "category": r["category"],
+            "source_type": r["source_type"],
+            "title_html": _marked(r["title_html"]),
+            "snippet": _marked(r["snippet"]),
+            # bm25() is "lower is better"; flip it so clients can sort descending
+            "score": round(-r["score"], 4),
+        }
+        for r in rows
+    ]
@@ -1,6 +1,6 @@
 // service-worker.js
 
-const CACHE_NAME = "ovens-lovins-v4";  // 👈 bump this when you change frontend
+const CACHE_NAME = "ovens-lovins-v11";  // 👈 bump this when you change frontend
 const urlsToCache = [
     "/",
     "/index.html",
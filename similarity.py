@@ -0,0 +1,339 @@
+# -----------------------------------------
+# Ovens Lovin's – "similar recipes"
+# -----------------------------------------
+#
+# Recipes are similar when their canonical ingredient sets overlap
+# (Jaccard similarity). Comparing every pair is O(N^2), so each recipe
+# gets a MinHash signature instead, and locality-sensitive hashing finds
+# the candidates:
+#
+#   recipe_minhash (recipe_id, signature,  NUM_PERM uint32s (512 bytes) and
+#                   ingredients)           the canonical ids (uint32s)
+#   recipe_lsh (bucket, recipe_id)         one row per band: a hash of
+#                                          ROWS signature values
+#   minhash_pending (recipe_id)            recipes whose ingredients
+#                                          changed, queued by triggers
+#
+# Two recipes with Jaccard similarity J share a bucket in at least one
+# band with probability 1 - (1 - J^ROWS)^BANDS: ~0.99 at J = 0.3, ~0.7
+# at J = 0.15. Recipes are rarely near-duplicates (a typical recipe's
+# closest match shares a fifth of its ingredients), hence the low
+# threshold. A query reads the recipe's BANDS buckets (index lookups),
+# keeps the CANDIDATES sharing the most bands and ranks those by exact
+# Jaccard similarity from their stored ingredient ids.
+#
+# Triggers queue every recipe whose ingredient links change, from any
+# write path; refresh() recomputes the queued ones. The importers call it
+# after a run has committed, committing every BATCH_SIZE recipes so the
+# write lock is never held for long. The write endpoints and
+# /recipe/{id}/similar only recompute the recipe they touch
+# (refresh_recipe()), never a backlog some other run left queued; until
+# that run refreshes, its recipes match by their previous signatures.
+# Salt, pepper and water are left out (pantry.STAPLES): they are in
+# everything and say nothing about a dish.
+#
+# Changing NUM_PERM, BANDS, ROWS or SEED invalidates what is stored:
+# run `python similarity.py --rebuild`.
+
+import hashlib
+import json
+import random
+import struct
+from typing import Iterable, List, Optional
+
+from pantry import STAPLES
+
+NUM_PERM = 128
+BANDS = 64
+ROWS = NUM_PERM // BANDS
+SEED = 20240601
+BATCH_SIZE = 1000
+# Candidates re-ranked exactly per query
+CANDIDATES = 50
+
+# h_i(x) = (a_i * x + b_i) mod a Mersenne prime, truncated to 32 bits
+_PRIME = (1 << 61) - 1
+_rng = random.Random(SEED)
+_COEFFS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+_FORMAT = struct.Struct(f"<{NUM_PERM}I")
+_BAND_BYTES = ROWS * 4
+
+
+def _queue(recipe_id):
+    # Not INSERT OR IGNORE: the statement firing the trigger would override
+    # the conflict clause (see changes.py)
+    return f"""
+        INSERT INTO minhash_pending (recipe_id)
+        SELECT {recipe_id} WHERE NOT EXISTS (SELECT 1 FROM minhash_pending WHERE recipe_id = {recipe_id});
+    """
+
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS recipe_minhash (
+        recipe_id INTEGER PRIMARY KEY,
+        signature BLOB NOT NULL,
+        ingredients BLOB NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS recipe_lsh (
+        bucket INTEGER NOT NULL,
+        recipe_id INTEGER NOT NULL,
+        PRIMARY KEY (bucket, recipe_id)
+    ) WITHOUT ROWID
+    """,
+    "CREATE TABLE IF NOT EXISTS minhash_pending (recipe_id INTEGER PRIMARY KEY)",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS recipe_ingredients_minhash_ai AFTER INSERT ON recipe_ingredients
+    BEGIN {_queue("new.recipe_id")} END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS recipe_ingredients_minhash_au
+    AFTER UPDATE OF recipe_id, canonical_id ON recipe_ingredients
+    BEGIN {_queue("old.recipe_id")}{_queue("new.recipe_id")} END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS recipe_ingredients_minhash_ad AFTER DELETE ON recipe_ingredients
+    BEGIN {_queue("old.recipe_id")} END
+    """,
+    # refresh() drops the deleted recipe's signature and buckets
+    f"""
+    CREATE TRIGGER IF NOT EXISTS recipes_minhash_ad AFTER DELETE ON recipes
+    BEGIN {_queue("old.id")} END
+    """,
+]
+
+
+def ensure_schema(conn):
+    for statement in SCHEMA:
+        conn.execute(statement)
+
+
+# -----------------------------------------
+# SIGNATURES
+# -----------------------------------------
+
+_hash_values = {}
+
+
+def _hashes(canonical_id: int) -> List[int]:
+    # The canonical vocabulary is small, so every id's NUM_PERM hash
+    # values are computed once and reused
+    values = _hash_values.get(canonical_id)
+    if values is None:
+        values = _hash_values[canonical_id] = [((a * canonical_id + b) % _PRIME) & 0xFFFFFFFF for a, b in _COEFFS]
+    return values
+
+
+def signature(canonical_ids: Iterable[int]) -> Optional[bytes]:
+    """MinHash of a set of canonical ingredient ids; None for an empty set."""
+    rows = [_hashes(i) for i in set(canonical_ids)]
+    if not rows:
+        return None
+    mins = rows[0] if len(rows) == 1 else map(min, *rows)
+    return _FORMAT.pack(*mins)
+
+
+def pack_ids(canonical_ids) -> bytes:
+    ids = sorted(canonical_ids)
+    return struct.pack(f"<{len(ids)}I", *ids)
+
+
+def unpack_ids(blob: bytes) -> set:
+    return set(struct.unpack(f"<{len(blob) // 4}I", blob))
+
+
+def buckets(sig: bytes) -> List[int]:
+    """One LSH bucket per band: a 64-bit hash of the band's values and its number."""
+    return [
+        int.from_bytes(
+            hashlib.blake2b(sig[band * _BAND_BYTES:(band + 1) * _BAND_BYTES], digest_size=8,
+                            salt=band.to_bytes(2, "little")).digest(),
+            "little", signed=True,
+        )
+        for band in range(BANDS)
+    ]
+
+
+# -----------------------------------------
+# MAINTENANCE
+# -----------------------------------------
+
+def _ingredient_sets(conn, recipe_ids) -> dict:
+    rows = conn.execute(
+        f"""
+        SELECT ri.recipe_id, ri.canonical_id
+        FROM recipe_ingredients ri
+        JOIN recipes r ON r.id = ri.recipe_id
+        WHERE ri.recipe_id IN (SELECT value FROM json_each(?))
+          AND ri.canonical_id IS NOT NULL
+          AND ri.canonical_id NOT IN (
+              SELECT id FROM canonical_ingredients WHERE name IN ({",".join("?" * len(STAPLES))})
+          )
+        """,
+        (json.dumps(list(recipe_ids)), *sorted(STAPLES)),
+    )
+    sets = {}
+    for recipe_id, canonical_id in rows:
+        sets.setdefault(recipe_id, set()).add(canonical_id)
+    return sets
+
+
+def update(conn, recipe_ids) -> None:
+    """Recompute (or drop, for deleted / ingredient-less recipes) these signatures."""
+    recipe_ids = list(recipe_ids)
+    old = {row[0]: (row[1], row[2]) for row in conn.execute(
+        """
+        SELECT recipe_id, signature, ingredients FROM recipe_minhash
+        WHERE recipe_id IN (SELECT value FROM json_each(?))
+        """,
+        (json.dumps(recipe_ids),),
+    )}
+    sets = _ingredient_sets(conn, recipe_ids)
+
+    stale_buckets, new_buckets, signatures, dropped = [], [], [], []
+    for recipe_id in recipe_ids:
+        ids = sets.get(recipe_id, ())
+        old_sig, old_ids = old.get(recipe_id, (None, None))
+        if old_ids is not None and unpack_ids(old_ids) == ids:
+            continue
+        if old_sig is not None:
+            stale_buckets += [(bucket, recipe_id) for bucket in buckets(old_sig)]
+        sig = signature(ids)
+        if sig is None:
+            dropped.append((recipe_id,))
+        else:
+            signatures.append((recipe_id, sig, pack_ids(ids)))
+            new_buckets += [(bucket, recipe_id) for bucket in buckets(sig)]
+
+    conn.executemany("DELETE FROM recipe_lsh WHERE bucket = ? AND recipe_id = ?", stale_buckets)
+    conn.executemany("DELETE FROM recipe_minhash WHERE recipe_id = ?", dropped)
+    conn.executemany(
+        "INSERT OR REPLACE INTO recipe_minhash (recipe_id, signature, ingredients) VALUES (?, ?, ?)", signatures
+    )
+    conn.executemany("INSERT OR IGNORE INTO recipe_lsh (bucket, recipe_id) VALUES (?, ?)", new_buckets)
+
+
+def has_pending(conn, recipe_id: Optional[int] = None) -> bool:
+    """Whether anything (or just `recipe_id`) is queued."""
+    if recipe_id is None:
+        return conn.execute("SELECT EXISTS (SELECT 1 FROM minhash_pending)").fetchone()[0] == 1
+    return conn.execute("SELECT 1 FROM minhash_pending WHERE recipe_id = ?", (recipe_id,)).fetchone() is not None
+
+
+def refresh_recipe(conn, recipe_id: int) -> bool:
+    """Recompute one recipe if it is queued; returns whether it was. Needs the writer."""
+    if conn.execute("DELETE FROM minhash_pending WHERE recipe_id = ? RETURNING recipe_id", (recipe_id,)).fetchall():
+        update(conn, [recipe_id])
+        return True
+    return False
+
+
+def refresh(conn, batch_size: int = BATCH_SIZE, commit: bool = False) -> int:
+    """
+    Recompute every queued recipe; returns how many. Needs the writer.
+    With commit, each batch is committed on its own.
+    """
+    done = 0
+    while True:
+        ids = [row[0] for row in conn.execute(
+            "SELECT recipe_id FROM minhash_pending ORDER BY recipe_id LIMIT ?", (batch_size,)
+        )]
+        if not ids:
+            return done
+        update(conn, ids)
+        conn.execute(
+            "DELETE FROM minhash_pending WHERE recipe_id IN (SELECT value FROM json_each(?))", (json.dumps(ids),)
+        )
+        if commit:
+            conn.commit()
+        done += len(ids)
+
+
+def backfill(conn, rebuild: bool = False) -> int:
+    """Queue every recipe without a signature (all of them if rebuild) and refresh."""
+    if rebuild:
+        conn.execute("DELETE FROM recipe_lsh")
+        conn.execute("DELETE FROM recipe_minhash")
+    conn.execute(
+        """
+        INSERT INTO minhash_pending (recipe_id)
+        SELECT r.id FROM recipes r
+        WHERE NOT EXISTS (SELECT 1 FROM recipe_minhash m WHERE m.recipe_id = r.id)
+          AND NOT EXISTS (SELECT 1 FROM minhash_pending p WHERE p.recipe_id = r.id)
+        """
+    )
+    return refresh(conn)
+
+
+# -----------------------------------------
+# QUERYING
+# -----------------------------------------
+
+def similar(conn, recipe_id: int, limit: int = 10) -> list:
+    """
+    Up to `limit` recipes sharing LSH buckets with this one, most similar
+    first: [{id, title, meal_type, category, source_type, similarity}].
+    Empty for a recipe without (parsed) ingredients.
+    """
+    row = conn.execute(
+        "SELECT signature, ingredients FROM recipe_minhash WHERE recipe_id = ?", (recipe_id,)
+    ).fetchone()
+    if row is None:
+        return []
+    mine = unpack_ids(row[1])
+    # Bands shared grow with similarity (BANDS * J^ROWS on average), so the
+    # CANDIDATES sharing the most are re-ranked by exact Jaccard similarity
+    candidates = [r[0] for r in conn.execute(
+        f"""
+        SELECT recipe_id FROM recipe_lsh
+        WHERE bucket IN ({",".join("?" * BANDS)}) AND recipe_id != ?
+        GROUP BY recipe_id
+        ORDER BY count(*) DESC, recipe_id
+        LIMIT ?
+        """,
+        (*buckets(row[0]), recipe_id, CANDIDATES),
+    )]
+    scored = []
+    for r in conn.execute(
+        """
+        SELECT r.id, r.title, r.meal_type, r.category, r.source_type, m.ingredients
+        FROM recipe_minhash m
+        JOIN recipes r ON r.id = m.recipe_id
+        WHERE m.recipe_id IN (SELECT value FROM json_each(?))
+        """,
+        (json.dumps(candidates),),
+    ):
+        theirs = unpack_ids(r[5])
+        scored.append((len(mine & theirs) / len(mine | theirs), r))
+    scored.sort(key=lambda item: (-item[0], item[1][0]))
+    return [
+        {
+            "id": r[0],
+            "title": r[1],
+            "meal_type": r[2],
+            "category": r[3],
+            "source_type": r[4],
+            "similarity": round(score, 3),
+        }
+        for score, r in scored[:limit]
+    ]
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    from db import get_write_conn
+    from migrations import migrate
+
+    parser = argparse.ArgumentParser(description="Compute MinHash signatures for similar-recipe lookups.")
+    parser.add_argument("--rebuild", action="store_true", help="recompute every recipe, not just missing ones")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with get_write_conn() as conn:
+        migrate(conn)
+        count = backfill(conn, rebuild=args.rebuild)
+    print(f"Signatures computed for {count} recipes in {time.perf_counter() - start:.2f}s")
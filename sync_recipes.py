@@ -0,0 +1,228 @@
+# -----------------------------------------
+# Ovens Lovin's – sync recipes.json into existing recipes
+# -----------------------------------------
+#
+# Copies what the scraper found (source URL, instructions, ingredient
+# lines) onto recipes that already exist, matched by title
+# case-insensitively. Unlike import_recipes.py it never creates recipes.
+#
+# The whole file is loaded into temp tables with one executemany each and
+# joined against recipes once (through the title COLLATE NOCASE index),
+# so every update below is a single set-based statement:
+#
+#   source_url          set wherever the file has one and it differs
+#   prep_instructions   filled in only where the DB has none yet
+#   ingredients         lines the recipe doesn't have yet are linked
+#
+#   python sync_recipes.py [path] [--only source-url|details] [--dry-run]
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+from db import get_write_conn
+from import_recipes import iter_records
+from ingredients import backfill as backfill_ingredients
+from migrations import SchemaOutOfDate, check_current, migrate
+from search import held_ingredients
+import similarity
+
+BASE_DIR = Path(__file__).parent
+JSON_PATH = BASE_DIR / "recipes.json"
+
+STAGING = [
+    "DROP TABLE IF EXISTS temp.sync_recipes",
+    "DROP TABLE IF EXISTS temp.sync_ingredients",
+    "DROP TABLE IF EXISTS temp.sync_matches",
+    "DROP TABLE IF EXISTS temp.sync_new_links",
+    """
+    CREATE TEMP TABLE sync_recipes (
+        pos INTEGER PRIMARY KEY,
+        title TEXT NOT NULL COLLATE NOCASE,
+        url TEXT,
+        prep_instructions TEXT
+    )
+    """,
+    """
+    CREATE TEMP TABLE sync_ingredients (
+        pos INTEGER NOT NULL,
+        seq INTEGER NOT NULL,
+        name TEXT NOT NULL
+    )
+    """,
+]
+
+
+def load(conn, path: Path) -> int:
+    """Stage the file in temp tables; returns the number of records with a title."""
+    for statement in STAGING:
+        conn.execute(statement)
+
+    recipes, lines = [], []
+    for raw, value in iter_records(path):
+        r = json.loads(raw) if value is None else value
+        title = (r.get("title") or "").strip()
+        if not title:
+            continue
+        pos = len(recipes)
+        recipes.append((
+            pos,
+            title,
+            (r.get("url") or "").strip() or None,
+            "\n".join(r.get("instructions") or []) or None,
+        ))
+        # Stripped like recipe_pipeline.clean_ingredients(), so a line the
+        # importer stored matches here
+        for seq, ing in enumerate(r.get("ingredients") or []):
+            if isinstance(ing, str) and ing.strip():
+                lines.append((pos, seq, ing.strip()))
+
+    conn.executemany("INSERT INTO temp.sync_recipes VALUES (?, ?, ?, ?)", recipes)
+    conn.executemany("INSERT INTO temp.sync_ingredients VALUES (?, ?, ?)", lines)
+
+    # A title listed twice: the later record wins (sync_recipes.title is NOCASE)
+    conn.execute(
+        "DELETE FROM temp.sync_recipes WHERE pos NOT IN (SELECT max(pos) FROM temp.sync_recipes GROUP BY title)"
+    )
+    conn.execute("CREATE INDEX temp.idx_sync_ingredients_pos ON sync_ingredients (pos)")
+
+    # sync_recipes.title on the left, so the comparison is NOCASE and can
+    # use idx_recipes_title_nocase
+    conn.execute(
+        """
+        CREATE TEMP TABLE sync_matches AS
+        SELECT s.pos, r.id AS recipe_id
+        FROM temp.sync_recipes s
+        JOIN recipes r ON s.title = r.title
+        """
+    )
+    conn.execute("CREATE INDEX temp.idx_sync_matches_pos ON sync_matches (pos)")
+    return len(recipes)
+
+
+def sync_source_urls(conn) -> int:
+    return conn.execute(
+        """
+        UPDATE recipes
+        SET source_url = s.url
+        FROM temp.sync_matches m
+        JOIN temp.sync_recipes s ON s.pos = m.pos
+        WHERE recipes.id = m.recipe_id
+          AND s.url IS NOT NULL
+          AND recipes.source_url IS NOT s.url
+        """
+    ).rowcount
+
+
+def sync_instructions(conn) -> int:
+    # Only overwrite if the DB has no prep_instructions yet
+    return conn.execute(
+        """
+        UPDATE recipes
+        SET prep_instructions = s.prep_instructions
+        FROM temp.sync_matches m
+        JOIN temp.sync_recipes s ON s.pos = m.pos
+        WHERE recipes.id = m.recipe_id
+          AND s.prep_instructions IS NOT NULL
+          AND trim(coalesce(recipes.prep_instructions, '')) = ''
+        """
+    ).rowcount
+
+
+def sync_ingredients(conn) -> dict:
+    new_names = conn.execute(
+        "INSERT OR IGNORE INTO ingredients (name) SELECT DISTINCT name FROM temp.sync_ingredients"
+    ).rowcount
+
+    conn.execute(
+        """
+        CREATE TEMP TABLE sync_new_links AS
+        SELECT m.recipe_id, i.id AS ingredient_id, min(si.seq) AS seq
+        FROM temp.sync_ingredients si
+        JOIN temp.sync_matches m ON m.pos = si.pos
+        JOIN ingredients i ON i.name = si.name
+        WHERE NOT EXISTS (
+            SELECT 1 FROM recipe_ingredients ri
+            WHERE ri.recipe_id = m.recipe_id AND ri.ingredient_id = i.id
+        )
+        GROUP BY m.recipe_id, i.id
+        """
+    )
+
+    # Only recipes that gain lines need their search row rebuilt
+    recipe_ids = [row[0] for row in conn.execute("SELECT DISTINCT recipe_id FROM temp.sync_new_links")]
+    with held_ingredients(conn, *recipe_ids):
+        linked = conn.execute(
+            """
+            INSERT INTO recipe_ingredients (recipe_id, ingredient_id, quantity, unit)
+            SELECT recipe_id, ingredient_id, NULL, NULL
+            FROM temp.sync_new_links
+            ORDER BY recipe_id, seq
+            """
+        ).rowcount
+
+    # Parse the ingredient lines linked above
+    parsed = backfill_ingredients(conn)
+    return {"ingredients_added": new_names, "links_added": linked, "links_parsed": parsed["recipe_ingredients"]}
+
+
+def sync(path=JSON_PATH, source_url=True, details=True, dry_run=False) -> dict:
+    start = time.perf_counter()
+    with get_write_conn() as conn:
+        if dry_run:
+            check_current(conn)
+        else:
+            migrate(conn)
+
+        records = load(conn, Path(path))
+        matched = conn.execute("SELECT count(DISTINCT pos) FROM temp.sync_matches").fetchone()[0]
+        summary = {"records": records, "matched": matched, "unmatched": records - matched}
+
+        if source_url:
+            summary["source_url_changed"] = sync_source_urls(conn)
+        if details:
+            summary["instructions_filled"] = sync_instructions(conn)
+            summary.update(sync_ingredients(conn))
+
+        if dry_run:
+            conn.rollback()
+        else:
+            conn.commit()
+            # Short transactions, as in import_recipes.py
+            similarity.refresh(conn, commit=True)
+
+    summary["seconds"] = time.perf_counter() - start
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sync recipes.json onto existing recipes.")
+    parser.add_argument("path", nargs="?", default=str(JSON_PATH))
+    parser.add_argument("--only", choices=["source-url", "details"])
+    parser.add_argument("--dry-run", action="store_true", help="report what would change, write nothing")
+    args = parser.parse_args(argv)
+
+    try:
+        summary = sync(
+            args.path,
+            source_url=args.only in (None, "source-url"),
+            details=args.only in (None, "details"),
+            dry_run=args.dry_run,
+        )
+    except SchemaOutOfDate as e:
+        parser.exit(1, f"{e}\n")
+
+    print("\n========================")
+    print(f"Records: {summary['records']}  matched: {summary['matched']}  unmatched: {summary['unmatched']}")
+    if "source_url_changed" in summary:
+        print(f"source_url changed: {summary['source_url_changed']}")
+    if "instructions_filled" in summary:
+        print(f"Instructions filled in: {summary['instructions_filled']}")
+        print(f"Ingredient links added: {summary['links_added']} ({summary['ingredients_added']} new ingredients)")
+    print(f"{'Dry run, nothing written' if args.dry_run else 'Done'} in {summary['seconds']:.2f}s")
+    print("========================")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# db.py and uploads.py read these at import time: point them at a scratch
+# copy of recipes.db before any test imports the app
+SCRATCH = Path(tempfile.mkdtemp(prefix="ovens-lovins-tests-"))
+shutil.copy(ROOT / "recipes.db", SCRATCH / "recipes.db")
+os.environ["RECIPES_DB_PATH"] = str(SCRATCH / "recipes.db")
+os.environ["UPLOAD_DIR"] = str(SCRATCH / "uploads")
+os.environ["UPLOAD_SPOOL_DIR"] = str(SCRATCH / "spool")
+os.environ["IMAGE_STORAGE"] = "local"
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(SCRATCH, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def client():
+    """The app with its lifespan run (schema migrated), on the scratch database."""
+    from fastapi.testclient import TestClient
+
+    import main
+
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture
+def read_conn(client):
+    from db import get_conn
+
+    with get_conn() as conn:
+        yield conn
+
+
+@pytest.fixture
+def write_conn(client):
+    """The writer connection; don't combine with requests that write."""
+    from db import get_write_conn
+
+    with get_write_conn() as conn:
+        yield conn
@@ -0,0 +1,34 @@
+from catalog_cache import CatalogCache
+from db import get_conn, get_write_conn
+from recipe_pipeline import create_recipe
+
+
+def test_first_refresh_starts_at_latest_seq(client):
+    cache = CatalogCache()
+    with get_conn() as conn:
+        calls = []
+        conn.set_trace_callback(calls.append)
+        cache.refresh(conn, 1)
+        conn.set_trace_callback(None)
+        latest = conn.execute("SELECT max(seq) FROM change_log").fetchone()[0]
+
+    assert cache._seq == latest
+    assert not any("entity_id FROM change_log" in sql for sql in calls)
+
+
+def test_base_section_invalidated_with_base_recipe(client):
+    with get_write_conn() as conn:
+        base_id = create_recipe(conn, "Cache Base Stock")
+        child_id = create_recipe(conn, "Cache Child Soup", base_recipe_id=base_id)
+
+    def base_title():
+        response = client.get(f"/recipe/{child_id}", params={"include": "base"})
+        assert response.status_code == 200
+        return response.json()["base_recipe"]["title"]
+
+    assert base_title() == "Cache Base Stock"
+
+    with get_write_conn() as conn:
+        conn.execute("UPDATE recipes SET title = 'Cache Brown Stock' WHERE id = ?", (base_id,))
+
+    assert base_title() == "Cache Brown Stock"
@@ -0,0 +1,236 @@
+import pytest
+
+import grocery
+from db import get_write_conn
+from ingredients import canonical_ids
+from migrations import MIGRATIONS
+from recipe_pipeline import create_recipe
+
+
+def items(conn, user_id):
+    return {
+        row["ingredient_name"]: dict(row)
+        for row in conn.execute(
+            """
+            SELECT id, ingredient_name, quantity, unit, checked, dimension, base_amount
+            FROM grocery_items WHERE user_id = ?
+            """,
+            (user_id,),
+        )
+    }
+
+
+def sources(conn, item_id):
+    return {
+        row["recipe_id"]: row["base_amount"]
+        for row in conn.execute("SELECT recipe_id, base_amount FROM grocery_item_sources WHERE item_id = ?", (item_id,))
+    }
+
+
+@pytest.fixture
+def recipes(write_conn):
+    return {
+        "tbsp": create_recipe(write_conn, "Grocery Test Dressing",
+                              ingredients=[("olive oil", "1", "tbsp"), ("garlic", "2", "cloves")]),
+        "cup": create_recipe(write_conn, "Grocery Test Confit",
+                             ingredients=[("olive oil", "1/2", "cup"), ("garlic cloves, minced", "3", None)]),
+        "none": create_recipe(write_conn, "Grocery Test Salad",
+                              ingredients=[("olive oil", None, None), ("salt, to taste", None, None)]),
+    }
+
+
+# -----------------------------------------
+# add_recipe() / remove_recipe()
+# -----------------------------------------
+
+def test_same_dimension_lines_merge(write_conn, recipes):
+    user = "grocery-test-merge"
+    grocery.add_recipe(write_conn, user, recipes["tbsp"])
+    grocery.add_recipe(write_conn, user, recipes["cup"])
+
+    rows = items(write_conn, user)
+    assert set(rows) == {"olive oil", "garlic"}
+    oil, garlic = rows["olive oil"], rows["garlic"]
+    assert oil["base_amount"] == pytest.approx(14.7868 + 118.294)
+    assert (oil["dimension"], oil["unit"]) == ("volume", "cup")
+    assert (garlic["base_amount"], garlic["quantity"], garlic["unit"]) == (5.0, "5", "clove")
+    assert sources(write_conn, oil["id"]) == pytest.approx({recipes["tbsp"]: 14.7868, recipes["cup"]: 118.294})
+
+
+@pytest.mark.parametrize("order", [("tbsp", "none"), ("none", "tbsp")])
+def test_amountless_line_joins_ingredient_row(write_conn, recipes, order):
+    user = f"grocery-test-amountless-{order[0]}"
+    for name in order:
+        grocery.add_recipe(write_conn, user, recipes[name])
+
+    rows = items(write_conn, user)
+    assert set(rows) == {"olive oil", "garlic", "salt"}
+    oil = rows["olive oil"]
+    # Added first, the amount-less row takes on the quantified line's dimension
+    assert (oil["dimension"], oil["base_amount"], oil["quantity"], oil["unit"]) == (
+        "volume", pytest.approx(14.7868), "1", "tbsp",
+    )
+    assert sources(write_conn, oil["id"]) == pytest.approx({recipes["tbsp"]: 14.7868, recipes["none"]: None})
+    assert (rows["salt"]["quantity"], rows["salt"]["base_amount"]) == (None, None)
+
+
+def test_remove_recipe_restores_remaining_totals(write_conn, recipes):
+    user = "grocery-test-remove"
+    for name in ("tbsp", "cup", "none"):
+        grocery.add_recipe(write_conn, user, recipes[name])
+    oil_id = items(write_conn, user)["olive oil"]["id"]
+
+    assert grocery.remove_recipe(write_conn, user, recipes["cup"]) == 2
+    rows = items(write_conn, user)
+    assert (rows["olive oil"]["base_amount"], rows["olive oil"]["quantity"], rows["olive oil"]["unit"]) == (
+        pytest.approx(14.7868), "1", "tbsp",
+    )
+    assert (rows["garlic"]["base_amount"], rows["garlic"]["quantity"]) == (2.0, "2")
+    assert recipes["cup"] not in sources(write_conn, oil_id)
+    assert write_conn.execute(
+        "SELECT count(*) FROM grocery_item_sources WHERE recipe_id = ?", (recipes["cup"],)
+    ).fetchone()[0] == 0
+
+    # Only an amount-less source left: no quantity shown rather than 0
+    grocery.remove_recipe(write_conn, user, recipes["tbsp"])
+    rows = items(write_conn, user)
+    assert set(rows) == {"olive oil", "salt"}
+    assert (rows["olive oil"]["base_amount"], rows["olive oil"]["quantity"], rows["olive oil"]["unit"]) == (
+        None, None, None,
+    )
+
+    grocery.remove_recipe(write_conn, user, recipes["none"])
+    assert items(write_conn, user) == {}
+
+
+# -----------------------------------------
+# Migration 19: merge_amountless()
+# -----------------------------------------
+
+def test_merge_amountless_folds_old_rows(write_conn):
+    user = "grocery-test-legacy"
+    oil = canonical_ids(write_conn, ["olive oil"])["olive oil"]
+
+    # As lists were built before amount-less lines merged: a second row
+    def row(dimension, base_amount, checked):
+        return write_conn.execute(
+            """
+            INSERT INTO grocery_items
+                (ingredient_name, quantity, unit, user_id, checked, canonical_id, dimension, base_amount)
+            VALUES ('olive oil', NULL, NULL, ?, ?, ?, ?, ?)
+            """,
+            (user, checked, oil, dimension, base_amount),
+        ).lastrowid
+
+    quantified, amountless = row("volume", 30.0, 1), row("count", None, 0)
+    write_conn.executemany(
+        "INSERT INTO grocery_item_sources (item_id, recipe_id, base_amount) VALUES (?, ?, ?)",
+        [(quantified, grocery.MANUAL, 30.0), (amountless, 999999, None)],
+    )
+
+    assert grocery.merge_amountless(write_conn) >= 1
+    rows = items(write_conn, user)
+    assert list(rows) == ["olive oil"]
+    assert (rows["olive oil"]["id"], rows["olive oil"]["base_amount"], rows["olive oil"]["checked"]) == (
+        quantified, 30.0, 0,
+    )
+    assert sources(write_conn, quantified) == {grocery.MANUAL: 30.0, 999999: None}
+    assert sources(write_conn, amountless) == {}
+
+
+def test_migration_19_on_existing_lists(write_conn):
+    migration = {version: apply for version, _, apply in MIGRATIONS}[19]
+    migration(write_conn)
+
+    # Nothing left to fold, and running it again changes nothing
+    assert migration(write_conn) == 0
+    assert write_conn.execute(
+        """
+        SELECT count(*) FROM grocery_items g
+        WHERE g.canonical_id IS NOT NULL AND g.base_amount IS NULL
+          AND EXISTS (SELECT 1 FROM grocery_items k
+                      WHERE k.user_id IS g.user_id AND k.canonical_id = g.canonical_id
+                        AND k.base_amount IS NOT NULL)
+        """
+    ).fetchone()[0] == 0
+
+
+# -----------------------------------------
+# POST /grocery/batch
+# -----------------------------------------
+
+def batch(client, user, ops):
+    return client.post("/grocery/batch", json={"ops": ops}, headers={"X-User-Id": user})
+
+
+def listed(client, user):
+    return {i["ingredient_name"]: i for i in client.get("/grocery/list", headers={"X-User-Id": user}).json()}
+
+
+@pytest.fixture
+def stocked(client, request):
+    user = f"grocery-test-{request.node.name}"
+    for name in ("milk", "cream", "flour", "butter"):
+        assert client.post("/grocery", json={"ingredient_name": name}, headers={"X-User-Id": user}).status_code == 200
+    return user, {name: i["id"] for name, i in listed(client, user).items()}
+
+
+def test_batch_applies_mixed_ops(client, stocked):
+    user, ids = stocked
+    with get_write_conn() as conn:
+        recipe_id = create_recipe(conn, "Grocery Test Batch Soup", ingredients=[("leeks", "2", None)])
+
+    response = batch(client, user, [
+        {"op": "check", "id": ids["milk"]},
+        {"op": "check", "id": ids["cream"]},
+        {"op": "clear_checked"},
+        {"op": "check", "id": ids["flour"]},
+        {"op": "uncheck", "id": ids["flour"]},
+        {"op": "delete", "id": ids["butter"]},
+        {"op": "add", "ingredient_name": "sugar", "quantity": "2", "unit": "cups"},
+        {"op": "add_recipes", "recipe_ids": [recipe_id, 999999]},
+    ])
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["checked"], body["unchecked"], body["deleted"], body["added"]) == (3, 1, 3, 1)
+    assert body["recipes_added"] == 1
+    returned = {i["ingredient_name"]: i for i in body["items"]}
+    assert returned == listed(client, user)
+    assert {"milk", "cream", "butter"}.isdisjoint(returned)
+    assert returned["flour"]["checked"] is False
+    assert (returned["sugar"]["quantity"], returned["sugar"]["unit"]) == ("2", "cup")
+    assert returned["leek"]["quantity"] == "2"
+
+
+@pytest.mark.parametrize(
+    "bad, status",
+    [({"op": "check"}, 400), ({"op": "add", "ingredient_name": "  "}, 400), ({"op": "restock"}, 422)],
+)
+def test_bad_op_rejects_whole_batch(client, stocked, bad, status):
+    user, ids = stocked
+    before = listed(client, user)
+
+    response = batch(client, user, [{"op": "delete", "id": ids["milk"]}, {"op": "add", "ingredient_name": "jam"}, bad])
+
+    assert response.status_code == status
+    assert listed(client, user) == before
+
+
+def test_batch_is_one_transaction(client, stocked, monkeypatch):
+    user, ids = stocked
+    before = listed(client, user)
+
+    def fail(*args):
+        raise RuntimeError("clear_checked failed")
+
+    monkeypatch.setattr(grocery, "clear_checked", fail)
+    with pytest.raises(RuntimeError):
+        batch(client, user, [
+            {"op": "delete", "id": ids["milk"]},
+            {"op": "add", "ingredient_name": "jam"},
+            {"op": "clear_checked"},
+        ])
+
+    # The ops before the failure were rolled back with it
+    assert listed(client, user) == before
@@ -0,0 +1,36 @@
+import json
+import sqlite3
+
+import import_recipes
+import recipe_pipeline
+
+
+def test_failed_record_leaves_no_rows(client, read_conn, tmp_path, monkeypatch):
+    link_ingredients = recipe_pipeline.link_ingredients
+
+    def failing_link(conn, recipe_id, items):
+        # Fails after the recipe row and some ingredient rows are written
+        link_ingredients(conn, recipe_id, items)
+        if any("poison" in name for name, _, _ in items):
+            raise sqlite3.IntegrityError("simulated failure")
+
+    monkeypatch.setattr(recipe_pipeline, "link_ingredients", failing_link)
+    path = tmp_path / "recipes.json"
+    path.write_text(json.dumps([
+        {"title": "Savepoint Test Good", "ingredients": ["1 cup rice"]},
+        {"title": "Savepoint Test Bad", "ingredients": ["1 cup rice", "1 poison apple"]},
+        {"title": "Savepoint Test After", "ingredients": ["2 eggs"]},
+    ]))
+
+    stats = import_recipes.import_recipes(path)
+
+    assert stats["imported"] == 2
+    titles = {
+        row[0] for row in read_conn.execute("SELECT title FROM recipes WHERE title LIKE 'Savepoint Test %'")
+    }
+    assert titles == {"Savepoint Test Good", "Savepoint Test After"}
+    orphans = read_conn.execute(
+        "SELECT count(*) FROM recipe_ingredients WHERE recipe_id NOT IN (SELECT id FROM recipes)"
+    ).fetchone()[0]
+    assert orphans == 0
+    assert read_conn.execute("SELECT count(*) FROM ingredients WHERE name = '1 poison apple'").fetchone()[0] == 0
@@ -0,0 +1,52 @@
+import pytest
+
+from ingredient_parser import canonical_name, parse_ingredient
+
+
+@pytest.mark.parametrize(
+    "line, name, quantity, quantity_max, unit",
+    [
+        ("2 1/2 cups flour", "flour", 2.5, None, "cup"),
+        ("3-4 sprigs of fresh thyme", "thyme", 3.0, 4.0, "sprig"),
+        ("½ cup diced yellow onion", "yellow onion", 0.5, None, "cup"),
+        ("2 garlic cloves, chopped", "garlic", 2.0, None, "clove"),
+        ("Salt, to taste", "salt", None, None, None),
+        # A lone unit word is the ingredient
+        ("Cloves", "clove", None, None, None),
+        ("Cloves ", "clove", None, None, None),
+        # Pack count times pack size
+        ("2 x 400g tins tomatoes", "tomato", 800.0, None, "g"),
+        ("2×400g cans chickpeas", "chickpea", 800.0, None, "g"),
+        ("2 x lemons", "lemon", 2.0, None, None),
+        # Number formats
+        ("1 ⁄ 2 cup milk", "milk", 0.5, None, "cup"),
+        (".5 cup sugar", "sugar", 0.5, None, "cup"),
+        ("1,000 g flour", "flour", 1000.0, None, "g"),
+        # Qualifiers around the unit
+        ("1 scant teaspoon kosher salt", "kosher salt", 1.0, None, "tsp"),
+        ("Scant ½ teaspoon (2g) kosher salt", "kosher salt", 0.5, None, "tsp"),
+        ("3 large cloves garlic, grated", "garlic", 3.0, None, "clove"),
+        # Filler words never reach the canonical name
+        ("A few very generous cracks of black pepper", "black pepper", None, None, None),
+        ("Amount of black pepper", "black pepper", None, None, None),
+        ("good amount of cracked black pepper", "black pepper", None, None, None),
+        ("A few knobs unsalted butter", "unsalted butter", None, None, None),
+        ("Splash of red wine vinegar", "red wine vinegar", None, None, None),
+        ("120 Grams Self Rising Flour + additional to coat", "self rising flour", 120.0, None, "g"),
+    ],
+)
+def test_parse_ingredient(line, name, quantity, quantity_max, unit):
+    parsed = parse_ingredient(line)
+    assert (parsed.name, parsed.quantity, parsed.quantity_max, parsed.unit) == (
+        name, quantity, quantity_max, unit,
+    )
+
+
+def test_notes_after_comma_and_plus():
+    assert parse_ingredient("2 garlic cloves, chopped").note == "chopped"
+    assert parse_ingredient("2 cups (256g) flour + more for kneading").note == "more for kneading; 256g"
+
+
+def test_canonical_name():
+    assert canonical_name("8 each bone-in chicken thighs (about 3-4 pounds)") == "chicken thigh"
+    assert canonical_name("For serving") == ""
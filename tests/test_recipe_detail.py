@@ -0,0 +1,28 @@
+import pytest
+
+from db import get_write_conn
+from recipe_pipeline import create_recipe
+
+
+@pytest.fixture(scope="module")
+def recipe_id(client):
+    with get_write_conn() as conn:
+        return create_recipe(conn, "Detail Test Toast", ingredients=[("Bread", "2", "slices")])
+
+
+@pytest.mark.parametrize(
+    "include, ingredients",
+    [(None, ["Bread"]), ("ingredients,images", ["Bread"]), ("", []), ("images", []), ("base", [])],
+)
+def test_ingredients_key_always_present(client, recipe_id, include, ingredients):
+    params = {} if include is None else {"include": include}
+    body = client.get(f"/recipe/{recipe_id}", params=params).json()
+
+    assert [i["name"] for i in body["ingredients"]] == ingredients
+
+
+def test_recipe_without_ingredients(client):
+    with get_write_conn() as conn:
+        recipe_id = create_recipe(conn, "Detail Test Water")
+
+    assert client.get(f"/recipe/{recipe_id}").json()["ingredients"] == []
@@ -0,0 +1,166 @@
+import json
+
+import pytest
+
+import import_recipes
+from recipe_pipeline import InvalidRecipe, create_recipe, unique_slug
+
+
+def recipe_payload(title, **fields):
+    return {
+        "title": title,
+        "meal_type": "Dinner",
+        "prep_instructions": "",
+        "cook_instructions": "",
+        "ingredients": [],
+        **fields,
+    }
+
+
+def stored(conn, recipe_id):
+    recipe = conn.execute(
+        "SELECT title, slug, category, source_type, content_hash FROM recipes WHERE id = ?",
+        (recipe_id,),
+    ).fetchone()
+    ingredients = conn.execute(
+        """
+        SELECT i.name, c.name AS canonical, ri.amount, ri.std_unit
+        FROM recipe_ingredients ri
+        JOIN ingredients i ON i.id = ri.ingredient_id
+        LEFT JOIN canonical_ingredients c ON c.id = ri.canonical_id
+        WHERE ri.recipe_id = ?
+        ORDER BY ri.rowid
+        """,
+        (recipe_id,),
+    ).fetchall()
+    return recipe, [tuple(row) for row in ingredients]
+
+
+# -----------------------------------------
+# create_recipe()
+# -----------------------------------------
+
+def test_unique_slug_numbers_collisions(write_conn):
+    ids = [create_recipe(write_conn, "Slug Collision Pie") for _ in range(3)]
+    # Shares the prefix but is a different slug; must not count as taken
+    create_recipe(write_conn, "Slug Collision Pie Deluxe")
+
+    slugs = [stored(write_conn, recipe_id)[0]["slug"] for recipe_id in ids]
+    assert slugs == ["slug-collision-pie", "slug-collision-pie-2", "slug-collision-pie-3"]
+    assert unique_slug(write_conn, "slug collision pie") == "slug-collision-pie-4"
+    assert unique_slug(write_conn, "   ") is None
+
+
+@pytest.mark.parametrize("title", ["", "   ", None])
+def test_title_required(write_conn, title):
+    with pytest.raises(InvalidRecipe):
+        create_recipe(write_conn, title)
+
+
+def test_categorized_from_title_unless_given(write_conn):
+    guessed = create_recipe(write_conn, "Pipeline Test Chowder")
+    given = create_recipe(write_conn, "Pipeline Test Chowder Two", category="Brunch")
+
+    assert stored(write_conn, guessed)[0]["category"] == "Soups & Stews"
+    assert stored(write_conn, given)[0]["category"] == "Brunch"
+
+
+def test_ingredients_linked_and_parsed(write_conn):
+    recipe_id = create_recipe(
+        write_conn,
+        "Pipeline Test Garlic Noodles",
+        ingredients=[
+            ("2 garlic cloves, chopped", None, None),
+            ("noodles", "200", "g"),
+            "  ",
+            "Salt, to taste",
+        ],
+    )
+    _, ingredients = stored(write_conn, recipe_id)
+    assert ingredients == [
+        ("2 garlic cloves, chopped", "garlic", 2.0, "clove"),
+        ("noodles", "noodle", 200.0, "g"),
+        ("Salt, to taste", "salt", None, None),
+    ]
+
+
+# -----------------------------------------
+# POST /recipes
+# -----------------------------------------
+
+def test_post_recipes(client, read_conn):
+    response = client.post(
+        "/recipes",
+        json=recipe_payload(
+            "Api Test Chicken Soup",
+            ingredients=[{"name": "chicken thighs", "quantity": "4", "unit": None},
+                         {"name": "carrot", "quantity": "2", "unit": "cups"}],
+        ),
+    )
+    assert response.status_code == 200
+    recipe, ingredients = stored(read_conn, response.json()["id"])
+
+    assert recipe["slug"] == "api-test-chicken-soup"
+    assert recipe["category"] == "Soups & Stews"
+    assert recipe["source_type"] == "chef"
+    assert ingredients == [("chicken thighs", "chicken thigh", 4.0, None), ("carrot", "carrot", 2.0, "cup")]
+
+
+def test_post_recipes_same_title_gets_next_slug(client, read_conn):
+    first = client.post("/recipes", json=recipe_payload("Api Test Twice")).json()["id"]
+    second = client.post("/recipes", json=recipe_payload("Api Test Twice")).json()["id"]
+
+    assert stored(read_conn, first)[0]["slug"] == "api-test-twice"
+    assert stored(read_conn, second)[0]["slug"] == "api-test-twice-2"
+
+
+@pytest.mark.parametrize("title", ["", "   "])
+def test_post_recipes_rejects_blank_title(client, title):
+    response = client.post("/recipes", json=recipe_payload(title))
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Recipe title is required"
+
+
+# -----------------------------------------
+# Importer
+# -----------------------------------------
+
+def test_importer_goes_through_pipeline(client, read_conn, tmp_path):
+    path = tmp_path / "recipes.json"
+    path.write_text(json.dumps([
+        {"title": "Import Test Beef Stew", "instructions": ["Brown.", "Simmer."],
+         "ingredients": ["1 lb beef chuck", "2 x 400g tins tomatoes"]},
+        {"title": "Import Test Cake", "category": "Baking", "ingredients": ["3 eggs"]},
+        {"title": "   ", "ingredients": ["1 egg"]},
+    ]))
+
+    stats = import_recipes.import_recipes(path)
+    assert (stats["imported"], stats["invalid"]) == (2, 1)
+
+    rows = {
+        row["title"]: row["id"]
+        for row in read_conn.execute("SELECT id, title FROM recipes WHERE title LIKE 'Import Test %'")
+    }
+    stew, stew_ingredients = stored(read_conn, rows["Import Test Beef Stew"])
+    assert stew["slug"] == "import-test-beef-stew"
+    assert stew["category"] == "Soups & Stews"
+    assert stew["source_type"] == "chef"
+    assert stew["content_hash"]
+    assert stew_ingredients == [
+        ("1 lb beef chuck", "beef chuck", 1.0, "lb"),
+        ("2 x 400g tins tomatoes", "tomato", 800.0, "g"),
+    ]
+    assert stored(read_conn, rows["Import Test Cake"])[0]["category"] == "Baking"
+
+    # Same file again: nothing new
+    assert import_recipes.import_recipes(path)["imported"] == 0
+
+
+def test_category_projection(client, read_conn):
+    response = client.get("/recipes", params={"fields": "category", "limit": 5})
+
+    assert response.status_code == 200
+    rows = response.json()
+    assert rows and all(set(r) == {"category"} for r in rows)
+    stored = {row[0] for row in read_conn.execute("SELECT category FROM recipes")}
+    assert {r["category"] for r in rows} <= stored
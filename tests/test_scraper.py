@@ -0,0 +1,216 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+import scrape_ramsay_recipes as scraper
+
+PAGE = """
+<html><body>
+  <h2>Ingredients</h2>
+  <ul><li>2 garlic cloves</li><li>{ingredient}</li></ul>
+  <h2>Cooking Instructions</h2>
+  <p>Chop.</p><p>Cook.</p>
+</body></html>
+"""
+LAST_MODIFIED = "Wed, 01 May 2024 10:00:00 GMT"
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """
+    Local recipe site. /etag/<name> pages carry an ETag, /dated/<name> a
+    Last-Modified; both answer 304 to a matching validator. /flaky/<name>
+    fails with 503 the first time it is asked for.
+    """
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, dict(self.headers), time.monotonic()))
+            attempts = server.attempts[self.path] = server.attempts.get(self.path, 0) + 1
+
+        name = self.path.rsplit("/", 1)[-1]
+        headers = {}
+        if self.path.startswith("/etag/"):
+            headers["ETag"] = f'"{name}-v1"'
+            if self.headers.get("If-None-Match") == headers["ETag"]:
+                return self._send(304, "", headers)
+        elif self.path.startswith("/dated/"):
+            headers["Last-Modified"] = LAST_MODIFIED
+            if self.headers.get("If-Modified-Since") == LAST_MODIFIED:
+                return self._send(304, "", headers)
+        elif self.path.startswith("/flaky/") and attempts == 1:
+            return self._send(503, "try again", {"Retry-After": "0"})
+        elif not self.path.startswith("/flaky/"):
+            return self._send(404, "not found", {})
+        self._send(200, PAGE.format(ingredient=name), headers)
+
+    def _send(self, status, body, headers):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def site():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.attempts = {}
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    server.base = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def run_scrape(recipes, tmp_path, **options):
+    options = {"rate": 1000.0, "burst": 100, "parser": "html.parser", **options}
+    return asyncio.run(
+        scraper.scrape(
+            recipes,
+            cache_dir=tmp_path / "cache",
+            checkpoint_path=tmp_path / "scraped.ndjson",
+            **options,
+        )
+    )
+
+
+def checkpoint(tmp_path):
+    lines = (tmp_path / "scraped.ndjson").read_text(encoding="utf-8").splitlines()
+    return [json.loads(line) for line in lines if line.strip()]
+
+
+def test_fetch_and_parse(site, tmp_path):
+    recipes = [
+        {"title": "Soup", "url": f"{site.base}/etag/leek"},
+        {"title": "Stew", "url": f"{site.base}/dated/beef"},
+        {"title": "Done already", "url": f"{site.base}/etag/skip", "ingredients": ["1 egg"]},
+    ]
+    stats = run_scrape(recipes, tmp_path)
+
+    assert (stats["fetched"], stats["cached"], stats["failed"]) == (2, 0, 0)
+    assert stats["scraped"][f"{site.base}/etag/leek"]["ingredients"] == ["2 garlic cloves", "leek"]
+    assert stats["scraped"][f"{site.base}/dated/beef"]["instructions"] == ["Chop.", "Cook."]
+    assert sorted(r["title"] for r in checkpoint(tmp_path)) == ["Soup", "Stew"]
+    assert all(headers["User-Agent"] == scraper.USER_AGENT for _, headers, _ in site.requests)
+
+
+@pytest.mark.parametrize(
+    "path, validator, value",
+    [("/etag/leek", "If-None-Match", '"leek-v1"'), ("/dated/beef", "If-Modified-Since", LAST_MODIFIED)],
+)
+def test_revalidates_from_cache(site, tmp_path, path, validator, value):
+    url = site.base + path
+    cache = scraper.HttpCache(tmp_path / "cache")
+    limiter = scraper.HostLimiter(1000.0, 100)
+
+    async def twice():
+        async with httpx.AsyncClient() as client:
+            return (
+                await scraper.fetch(client, url, limiter, cache),
+                await scraper.fetch(client, url, limiter, cache),
+            )
+
+    (first, first_cached), (second, second_cached) = asyncio.run(twice())
+
+    assert (first_cached, second_cached) == (False, True)
+    assert second == first
+    (_, first_headers, _), (_, second_headers, _) = site.requests
+    assert validator not in first_headers
+    assert second_headers[validator] == value
+
+
+def test_retries_server_errors(site, tmp_path):
+    stats = run_scrape([{"title": "Flaky", "url": f"{site.base}/flaky/ham"}], tmp_path)
+
+    assert (stats["fetched"], stats["failed"]) == (1, 0)
+    assert site.attempts["/flaky/ham"] == 2
+
+
+def test_failed_fetch_is_not_checkpointed(site, tmp_path):
+    stats = run_scrape([{"title": "Missing", "url": f"{site.base}/gone/pie"}], tmp_path)
+
+    assert stats["failed"] == 1
+    assert checkpoint(tmp_path) == []
+
+
+def test_token_bucket_per_host():
+    rate = 20.0
+
+    async def timed(urls):
+        limiter = scraper.HostLimiter(rate, burst=1)
+        start = time.monotonic()
+        await asyncio.gather(*(limiter.wait(url) for url in urls))
+        return time.monotonic() - start
+
+    one_host = asyncio.run(timed(["http://a.test/x"] * 5))
+    two_hosts = asyncio.run(timed(["http://a.test/x", "http://b.test/x"] * 2))
+
+    # One token up front, then one every 1/rate seconds per host
+    assert one_host >= 4 / rate * 0.9
+    assert two_hosts < 4 / rate * 0.9
+
+
+def test_requests_respect_rate_limit(site, tmp_path, monkeypatch):
+    # When the scraper is let through, not when requests reach the server:
+    # connection setup can bunch those together
+    granted = []
+    acquire = scraper.TokenBucket.acquire
+
+    async def recorded(bucket):
+        await acquire(bucket)
+        granted.append(time.monotonic())
+
+    monkeypatch.setattr(scraper.TokenBucket, "acquire", recorded)
+    rate = 20.0
+    recipes = [{"title": f"R{i}", "url": f"{site.base}/etag/r{i}"} for i in range(5)]
+    run_scrape(recipes, tmp_path, rate=rate, burst=1, concurrency=5)
+
+    assert len(granted) == len(site.requests) == 5
+    assert granted[-1] - granted[0] >= 4 / rate * 0.9
+
+
+def test_resumes_from_checkpoint(site, tmp_path):
+    done_url = f"{site.base}/etag/leek"
+    earlier = {"title": "Soup", "url": done_url, "ingredients": ["leek"], "instructions": ["Cook."]}
+    # The torn last line of an interrupted run is ignored
+    (tmp_path / "scraped.ndjson").write_text(json.dumps(earlier) + "\n" + '{"title": "St', encoding="utf-8")
+
+    recipes = [{"title": "Soup", "url": done_url}, {"title": "Stew", "url": f"{site.base}/dated/beef"}]
+    stats = run_scrape(recipes, tmp_path)
+
+    assert stats["resumed"] == 1
+    assert [path for path, _, _ in site.requests] == ["/dated/beef"]
+    assert set(stats["scraped"]) == {done_url, f"{site.base}/dated/beef"}
+    assert stats["scraped"][done_url] == earlier
+
+
+def test_merge_into(tmp_path):
+    path = tmp_path / "recipes.json"
+    path.write_text(json.dumps([
+        {"title": "Soup", "url": "u1"},
+        {"title": "Kept", "url": "u2", "ingredients": ["1 egg"]},
+    ]))
+    scraped = {
+        "u1": {"ingredients": ["leek"], "instructions": ["Cook."]},
+        "u2": {"ingredients": ["other"], "instructions": []},
+    }
+
+    assert scraper.merge_into(path, scraped) == 1
+    soup, kept = json.loads(path.read_text())
+    assert (soup["ingredients"], soup["instructions"]) == (["leek"], ["Cook."])
+    assert kept["ingredients"] == ["1 egg"]
@@ -0,0 +1,53 @@
+import similarity
+from db import get_conn, get_write_conn
+from recipe_pipeline import create_recipe
+
+
+def queued(recipe_ids):
+    with get_conn() as conn:
+        return {
+            row[0] for row in conn.execute(
+                f"SELECT recipe_id FROM minhash_pending WHERE recipe_id IN ({', '.join('?' * len(recipe_ids))})",
+                recipe_ids,
+            )
+        }
+
+
+def test_similar_refreshes_only_the_requested_recipe(client):
+    ingredients = [("Leeks", "2", None), ("Potatoes", "500", "g"), ("Butter", "1", "tbsp")]
+    with get_write_conn() as conn:
+        # As an importer leaves them until the end of its run
+        ids = [create_recipe(conn, f"Similar Test Soup {n}", ingredients=ingredients) for n in range(2)]
+    assert queued(ids) == set(ids)
+
+    response = client.get(f"/recipe/{ids[0]}/similar")
+
+    assert response.status_code == 200
+    assert queued(ids) == {ids[1]}
+    assert ids[1] not in [r["id"] for r in response.json()]
+
+    # The run that queued it catches up
+    with get_write_conn() as conn:
+        similarity.refresh(conn)
+    similar = client.get(f"/recipe/{ids[0]}/similar").json()
+    assert ids[1] in [r["id"] for r in similar]
+
+
+def test_write_endpoints_leave_other_runs_backlog(client):
+    with get_write_conn() as conn:
+        # Left queued by an importer that hasn't refreshed yet
+        backlog = create_recipe(conn, "Similar Test Backlog", ingredients=[("Leeks", "2", None)])
+
+    created = client.post("/recipes", json={
+        "title": "Similar Test Posted", "meal_type": "Dinner", "prep_instructions": "", "cook_instructions": "",
+        "ingredients": [{"name": "Leeks", "quantity": "2", "unit": None}],
+    }).json()["id"]
+    assert queued([backlog, created]) == {backlog}
+
+    assert client.delete(f"/recipe/{created}").status_code == 200
+    assert queued([backlog, created]) == {backlog}
+    with get_conn() as conn:
+        assert conn.execute("SELECT 1 FROM recipe_minhash WHERE recipe_id = ?", (created,)).fetchone() is None
+
+    with get_write_conn() as conn:
+        similarity.refresh(conn)
@@ -0,0 +1,31 @@
+import json
+
+import sync_recipes
+from db import get_conn, get_write_conn
+from recipe_pipeline import create_recipe
+
+
+def test_ingredient_lines_stripped_like_the_importer(client, tmp_path):
+    with get_write_conn() as conn:
+        recipe_id = create_recipe(conn, "Sync Test Leek Soup", ingredients=["2 leeks"])
+    path = tmp_path / "recipes.json"
+    path.write_text(json.dumps([
+        {"title": "sync test leek soup", "ingredients": ["  2 leeks ", "   ", "1 onion\n"]},
+    ]))
+
+    summary = sync_recipes.sync(path, source_url=False)
+
+    assert (summary["matched"], summary["links_added"]) == (1, 1)
+    with get_conn() as conn:
+        names = [row[0] for row in conn.execute(
+            """
+            SELECT i.name FROM recipe_ingredients ri JOIN ingredients i ON i.id = ri.ingredient_id
+            WHERE ri.recipe_id = ? ORDER BY ri.rowid
+            """,
+            (recipe_id,),
+        )]
+        assert names == ["2 leeks", "1 onion"]
+        assert conn.execute("SELECT count(*) FROM ingredients WHERE name != trim(name)").fetchone()[0] == 0
+
+    # Nothing new the second time
+    assert sync_recipes.sync(path, source_url=False)["links_added"] == 0
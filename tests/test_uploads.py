@@ -0,0 +1,129 @@
+import io
+import json
+import struct
+import time
+import zlib
+
+import pytest
+
+import image_variants
+from db import get_write_conn
+from recipe_pipeline import create_recipe
+
+
+def png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def png(width=4, height=3, extra=b""):
+    rows = b"".join(b"\x00" + b"\xff\x00\x00" * width for _ in range(height))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + extra
+        + png_chunk(b"IDAT", zlib.compress(rows))
+        + png_chunk(b"IEND", b"")
+    )
+
+
+def jpeg_segment(marker, data):
+    return bytes([0xFF, marker]) + struct.pack(">H", len(data) + 2) + data
+
+
+@pytest.fixture(scope="module")
+def recipe_id(client):
+    with get_write_conn() as conn:
+        return create_recipe(conn, "Upload Test Tart")
+
+
+def upload(client, recipe_id, filename, content):
+    return client.post(f"/recipe/{recipe_id}/upload_image", files={"file": (filename, content)})
+
+
+def finished(client, response):
+    assert response.status_code == 202
+    for _ in range(200):
+        job = client.get(response.json()["status_url"]).json()
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"upload still {job['status']}")
+
+
+@pytest.mark.parametrize(
+    "filename, content",
+    [
+        ("photo.html", b"<html><script>alert(1)</script></html>"),
+        ("photo.jpg", b"<svg xmlns='http://www.w3.org/2000/svg'><script>alert(1)</script></svg>"),
+        ("photo.png", b""),
+    ],
+)
+def test_rejects_non_images(client, recipe_id, filename, content):
+    response = upload(client, recipe_id, filename, content)
+    assert response.status_code == 415
+
+
+def test_extension_comes_from_content(client, recipe_id):
+    job = finished(client, upload(client, recipe_id, "photo.html", png()))
+
+    assert job["status"] == "done"
+    assert job["url"].endswith(".png")
+    served = client.get(job["url"])
+    assert served.status_code == 200
+    assert served.headers["content-type"] == "image/png"
+    assert served.headers["x-content-type-options"] == "nosniff"
+
+
+@pytest.mark.parametrize(
+    "source, kept, dropped",
+    [
+        (
+            b"\xff\xd8" + jpeg_segment(0xE0, b"JFIF\x00")
+            + jpeg_segment(0xE1, b"Exif\x00\x00GPS") + jpeg_segment(0xE2, b"ICC_PROFILE\x00")
+            + jpeg_segment(0xFE, b"<html>") + b"\xff\xda\x00\x02scan\xff\xd9",
+            [b"JFIF", b"ICC_PROFILE", b"scan\xff\xd9"],
+            [b"Exif", b"<html>"],
+        ),
+        (
+            png(extra=png_chunk(b"eXIf", b"GPS") + png_chunk(b"tEXt", b"Comment\x00<html>")),
+            [b"IHDR", b"IDAT", b"IEND"],
+            [b"eXIf", b"GPS", b"<html>"],
+        ),
+    ],
+)
+def test_strip_metadata(tmp_path, source, kept, dropped):
+    (tmp_path / "in").write_bytes(source)
+    image_variants.strip_metadata(tmp_path / "in", tmp_path / "out")
+
+    stripped = (tmp_path / "out").read_bytes()
+    assert all(part in stripped for part in kept)
+    assert not any(part in stripped for part in dropped)
+
+
+def test_stored_original_has_no_exif(client, recipe_id):
+    Image = pytest.importorskip("PIL.Image")
+    exif = Image.Exif()
+    exif[0x8825] = {2: (51.0, 30.0, 0.0)}  # GPSInfo: latitude
+    photo = io.BytesIO()
+    Image.new("RGB", (40, 30), "red").save(photo, "JPEG", exif=exif)
+    assert b"Exif" in photo.getvalue()
+
+    job = finished(client, upload(client, recipe_id, "photo.jpg", photo.getvalue()))
+
+    assert job["status"] == "done"
+    stored = client.get(job["url"]).content
+    assert stored.startswith(b"\xff\xd8") and b"Exif" not in stored
+
+
+def test_deleting_recipe_removes_its_files(client):
+    with get_write_conn() as conn:
+        recipe_id = create_recipe(conn, "Upload Test Doomed Pie")
+    job = finished(client, upload(client, recipe_id, "pie.png", png(400, 300)))
+    with get_write_conn() as conn:
+        variants = conn.execute("SELECT variants FROM recipe_images WHERE id = ?", (job["image_id"],)).fetchone()[0]
+    urls = [job["url"]] + [v["url"] for v in json.loads(variants or "[]")]
+    assert all(client.get(url).status_code == 200 for url in urls)
+
+    assert client.delete(f"/recipe/{recipe_id}").status_code == 200
+
+    assert all(client.get(url).status_code == 404 for url in urls)
@@ -0,0 +1,317 @@
+# -----------------------------------------
+# Ovens Lovin's – recipe photo uploads
+# -----------------------------------------
+#
+# POST /recipe/{id}/upload_image only copies the file to a spool directory
+# and records a job; it answers 202 straight away. A small, bounded thread
+# pool then stores the file (with retries) and inserts the recipe_images
+# row, so a slow Cloudinary round trip never holds up other requests.
+#
+# Jobs live in the upload_jobs table, so GET /upload_jobs/{job_id} works from
+# any uvicorn worker, whichever one accepted the upload:
+#
+#   queued -> resizing -> storing -> saving -> done
+#                                         \-> failed   (error says why)
+#
+# "resizing" makes the responsive variants and the full-size original
+# that is actually stored (image_variants.py) in a process pool; without
+# Pillow it is skipped and the upload is stored with its metadata stripped.
+# Either way no photo is published with its EXIF (GPS) intact.
+#
+# Where files go is a pluggable backend, picked by IMAGE_STORAGE:
+#
+#   local        UPLOAD_DIR on disk, served by the app under /uploads
+#   cloudinary   the Cloudinary account from CLOUDINARY_* (the default
+#                when CLOUDINARY_CLOUD_NAME is set)
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import image_variants
+from db import get_conn, get_write_conn
+
+BASE_DIR = Path(__file__).parent
+UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR") or BASE_DIR / "uploads")
+SPOOL_DIR = Path(os.getenv("UPLOAD_SPOOL_DIR") or Path(tempfile.gettempdir()) / "ovens-lovins-spool")
+UPLOAD_URL_PREFIX = "/uploads"
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(15 * 1024 * 1024)))
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "2"))
+# Jobs accepted but not finished; beyond this uploads are refused (503)
+MAX_PENDING = int(os.getenv("UPLOAD_MAX_PENDING", "32"))
+MAX_ATTEMPTS = 3
+CHUNK_SIZE = 1 << 20
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS upload_jobs (
+        id TEXT PRIMARY KEY,
+        recipe_id INTEGER NOT NULL,
+        filename TEXT,
+        caption TEXT,
+        status TEXT NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        bytes INTEGER,
+        image_id INTEGER,
+        url TEXT,
+        error TEXT,
+        created_at TEXT NOT NULL DEFAULT (datetime('now')),
+        updated_at TEXT NOT NULL DEFAULT (datetime('now'))
+    )
+    """,
+]
+
+
+def ensure_schema(conn):
+    for statement in SCHEMA:
+        conn.execute(statement)
+
+
+class UploadTooLarge(ValueError):
+    """The file is bigger than MAX_UPLOAD_BYTES."""
+
+
+class UploadsBusy(RuntimeError):
+    """MAX_PENDING uploads are already waiting."""
+
+
+NotAnImage = image_variants.NotAnImage
+
+
+# -----------------------------------------
+# STORAGE BACKENDS
+# -----------------------------------------
+
+class LocalStorage:
+    """Files under UPLOAD_DIR/<recipe_id>/, served from /uploads."""
+
+    name = "local"
+
+    def __init__(self, directory: Path = UPLOAD_DIR, url_prefix: str = UPLOAD_URL_PREFIX):
+        self.directory = Path(directory)
+        self.url_prefix = url_prefix
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def save(self, path: Path, recipe_id: int, filename: str) -> str:
+        # Never the client's extension: StaticFiles picks the Content-Type from it
+        name = f"{uuid.uuid4().hex}.{image_variants.sniff(path)}"
+        target = self.directory / str(recipe_id) / name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(path, target)
+        return f"{self.url_prefix}/{recipe_id}/{name}"
+
+    def delete(self, url: str):
+        if url and url.startswith(self.url_prefix + "/"):
+            target = (self.directory / url[len(self.url_prefix) + 1:]).resolve()
+            if self.directory.resolve() in target.parents:
+                target.unlink(missing_ok=True)
+
+
+class CloudinaryStorage:
+    """Cloudinary, configured from CLOUDINARY_* on first use."""
+
+    name = "cloudinary"
+
+    def __init__(self):
+        self._configured = False
+
+    def _uploader(self):
+        import cloudinary
+        import cloudinary.uploader
+
+        if not self._configured:
+            cloudinary.config(
+                cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
+                api_key=os.getenv("CLOUDINARY_API_KEY"),
+                api_secret=os.getenv("CLOUDINARY_API_SECRET"),
+                secure=True,
+            )
+            self._configured = True
+        return cloudinary.uploader
+
+    def save(self, path: Path, recipe_id: int, filename: str) -> str:
+        result = self._uploader().upload(str(path), folder=f"recipes/{recipe_id}", overwrite=False)
+        return result["secure_url"]
+
+    def delete(self, url: str):
+        # Images have always been left in Cloudinary when their row is deleted
+        pass
+
+
+def make_storage(kind: Optional[str] = None):
+    kind = kind or os.getenv("IMAGE_STORAGE") or ("cloudinary" if os.getenv("CLOUDINARY_CLOUD_NAME") else "local")
+    if kind == "local":
+        return LocalStorage()
+    if kind == "cloudinary":
+        return CloudinaryStorage()
+    raise ValueError(f"Unknown IMAGE_STORAGE: {kind}")
+
+
+# -----------------------------------------
+# JOBS
+# -----------------------------------------
+
+def _update(job_id: str, **fields):
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+    with get_write_conn() as conn:
+        conn.execute(
+            f"UPDATE upload_jobs SET {assignments}, updated_at = datetime('now') WHERE id = ?",
+            (*fields.values(), job_id),
+        )
+
+
+def get_job(job_id: str) -> Optional[dict]:
+    with get_conn() as conn:
+        row = conn.execute(
+            """
+            SELECT id, recipe_id, status, attempts, bytes, image_id, url, error, created_at, updated_at
+            FROM upload_jobs WHERE id = ?
+            """,
+            (job_id,),
+        ).fetchone()
+    return dict(row) if row else None
+
+
+class Uploader:
+    def __init__(self, storage=None, workers: int = UPLOAD_WORKERS, max_pending: int = MAX_PENDING):
+        self._storage = storage
+        self.workers = workers
+        self.max_pending = max_pending
+        self._pool = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def storage(self):
+        if self._storage is None:
+            self._storage = make_storage()
+        return self._storage
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="upload")
+            return self._pool
+
+    def submit(self, recipe_id: int, fileobj, filename: str, caption: str = "") -> str:
+        """
+        Spool `fileobj` to disk and queue it; returns the job id. Raises
+        UploadTooLarge / NotAnImage / UploadsBusy. Blocking: call from a
+        worker thread.
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise UploadsBusy("Too many uploads in progress, try again shortly")
+            self._pending += 1
+
+        try:
+            SPOOL_DIR.mkdir(parents=True, exist_ok=True)
+            job_id = uuid.uuid4().hex
+            spool = SPOOL_DIR / job_id
+            size = 0
+            with open(spool, "wb") as out:
+                while chunk := fileobj.read(CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > MAX_UPLOAD_BYTES:
+                        raise UploadTooLarge(f"Image is larger than {MAX_UPLOAD_BYTES // (1024 * 1024)} MB")
+                    out.write(chunk)
+            image_variants.sniff(spool)
+
+            with get_write_conn() as conn:
+                conn.execute(
+                    """
+                    INSERT INTO upload_jobs (id, recipe_id, filename, caption, status, bytes)
+                    VALUES (?, ?, ?, ?, 'queued', ?)
+                    """,
+                    (job_id, recipe_id, filename, caption, size),
+                )
+            self._executor().submit(self._run, job_id, spool, recipe_id, filename, caption)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            if "spool" in locals():
+                spool.unlink(missing_ok=True)
+            raise
+        return job_id
+
+    def _store(self, job_id, path, recipe_id, filename) -> str:
+        """storage.save() with retries and exponential backoff."""
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                return self.storage.save(path, recipe_id, filename)
+            except Exception as e:
+                if attempt == MAX_ATTEMPTS:
+                    raise
+                _update(job_id, attempts=attempt + 1, error=f"attempt {attempt}: {e}")
+                time.sleep(2 ** attempt)
+
+    def _run(self, job_id, spool: Path, recipe_id, filename, caption):
+        workdir = Path(tempfile.mkdtemp(dir=SPOOL_DIR, prefix=f"{job_id}-"))
+        try:
+            # The upload itself is never stored: its EXIF can carry GPS
+            processed = None
+            if image_variants.available():
+                _update(job_id, status="resizing")
+                processed = image_variants.generate(spool, workdir)
+                original = processed["original"]["path"]
+            else:
+                original = workdir / "original"
+                image_variants.strip_metadata(spool, original)
+
+            _update(job_id, status="storing", attempts=1)
+            url = self._store(job_id, original, recipe_id, filename)
+            variants = []
+            stem = Path(filename or "photo").stem
+            for v in processed["variants"] if processed else []:
+                name = f"{stem}-{v['width']}{Path(v['path']).suffix}"
+                variants.append({
+                    "url": self._store(job_id, v["path"], recipe_id, name),
+                    "width": v["width"],
+                    "height": v["height"],
+                    "type": v["type"],
+                })
+
+            _update(job_id, status="saving", url=url)
+            with get_write_conn() as conn:
+                image_id = conn.execute(
+                    """
+                    INSERT INTO recipe_images (recipe_id, url, caption, created_at, width, height, variants)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        recipe_id, url, caption, datetime.utcnow(),
+                        processed and processed["width"],
+                        processed and processed["height"],
+                        json.dumps(variants) if variants else None,
+                    ),
+                ).lastrowid
+            _update(job_id, status="done", image_id=image_id, error=None)
+        except Exception as e:
+            _update(job_id, status="failed", error=str(e) or type(e).__name__)
+        finally:
+            spool.unlink(missing_ok=True)
+            shutil.rmtree(workdir, ignore_errors=True)
+            with self._lock:
+                self._pending -= 1
+
+    def discard(self, url: str, variants: Optional[str] = None):
+        """Remove a deleted image's files (original and variants) from storage."""
+        for v in json.loads(variants) if variants else []:
+            self.storage.delete(v["url"])
+        self.storage.delete(url)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"storage": self.storage.name, "workers": self.workers, "pending": self._pending}
+
+
+uploader = Uploader()
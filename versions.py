@@ -0,0 +1,82 @@
+# -----------------------------------------
+# Ovens Lovin's – data version counters
+# -----------------------------------------
+#
+# data_versions holds one monotonically increasing counter per scope:
+#
+#   recipes               any write to recipes / recipe_ingredients /
+#                         recipe_images
+#   favorites:<user_id>   that user's user_favorites rows
+#   grocery:<user_id>     that user's grocery_items rows
+#
+# Triggers bump them, so every write path (API, importers, sync scripts,
+# migrations) counts without knowing about it. Reading a handful of
+# counters is one primary-key lookup each, which is what lets the API
+# build ETags and answer If-None-Match without reading the data itself.
+
+SCOPE_RECIPES = "recipes"
+
+
+def _bump(scope_sql):
+    return f"""
+        INSERT INTO data_versions (scope, version) VALUES ({scope_sql}, 1)
+        ON CONFLICT (scope) DO UPDATE SET version = version + 1;
+    """
+
+
+def _triggers(table, scope_new, scope_old):
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {table}_version_ai AFTER INSERT ON {table} BEGIN"
+        f"{_bump(scope_new)} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_version_au AFTER UPDATE ON {table} BEGIN"
+        f"{_bump(scope_old)}{_bump(scope_new) if scope_new != scope_old else ''} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_version_ad AFTER DELETE ON {table} BEGIN"
+        f"{_bump(scope_old)} END",
+    ]
+
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS data_versions (
+        scope TEXT PRIMARY KEY NOT NULL,
+        version INTEGER NOT NULL
+    )
+    """,
+    *_triggers("recipes", f"'{SCOPE_RECIPES}'", f"'{SCOPE_RECIPES}'"),
+    *_triggers("recipe_ingredients", f"'{SCOPE_RECIPES}'", f"'{SCOPE_RECIPES}'"),
+    *_triggers("recipe_images", f"'{SCOPE_RECIPES}'", f"'{SCOPE_RECIPES}'"),
+    *_triggers(
+        "user_favorites",
+        "'favorites:' || coalesce(new.user_id, '')",
+        "'favorites:' || coalesce(old.user_id, '')",
+    ),
+    *_triggers(
+        "grocery_items",
+        "'grocery:' || coalesce(new.user_id, '')",
+        "'grocery:' || coalesce(old.user_id, '')",
+    ),
+]
+
+
+def ensure_schema(conn):
+    for statement in SCHEMA:
+        conn.execute(statement)
+
+
+def favorites_scope(user_id: str) -> str:
+    return f"favorites:{user_id}"
+
+
+def grocery_scope(user_id: str) -> str:
+    return f"grocery:{user_id}"
+
+
+def get_versions(conn, *scopes) -> tuple:
+    """Current counter for each scope, in order; 0 if it was never written."""
+    placeholders = ", ".join("?" for _ in scopes)
+    found = dict(
+        conn.execute(
+            f"SELECT scope, version FROM data_versions WHERE scope IN ({placeholders})", scopes
+        ).fetchall()
+    )
+    return tuple(found.get(scope, 0) for scope in scopes)